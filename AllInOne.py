@@ -1,392 +1,840 @@
 import os
+import contextvars
+import json
 import logging
 import time
-import random
-from selenium import webdriver
-from selenium.webdriver import ActionChains
+import shutil
+import tempfile
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, ElementNotInteractableException
-from webdriver_manager.firefox import GeckoDriverManager
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from launcher import build_options, start_firefox
+from browser_pool import BrowserPool, BrowserUsageMonitor
+from profiles import clone_profile, is_template
+from http_upload import HTTP_ENDPOINTS, UploadError, upload_for_platform
+from metadata import load_metadata
+from ledger import DEFAULT_ACCOUNT, already_published, record_published
+from preflight import is_youtube_short, preflight
+from transcode import cached_rendition, prepare_renditions
+from readiness import is_ready, snapshot, wait_until_ready
+from dom_watch import wait_for, wait_for_selector, wait_for_text
+from steps import Step, StepFailed, new_checkpoint, run_steps, step_runner
+from text_entry import enter_text
+from locators import locate, log_stats, present, union_xpath
+from result_capture import ResultCapture
+from tracing import span
+from delays import delay_budget, pause, start_delay_account
+from failures import TRANSIENT, LOGIN_EXPIRED, PERMANENT, breakers, classify
+from sessions import check_sessions, session_problem
 
 # Constants
 PROFILE_PATH = r"C:\Users\user\AppData\Roaming\Mozilla\Firefox\Profiles\me97qgzd.default-release"
 VIDEO_PATH = r"C:\Users\user\Desktop\ups\V2\video.mp4"
 METADATA_PATH = r"C:\Users\user\Desktop\ups\V2\1.txt"
+# Profile the concurrent workers copy; point UPS_SESSION_TEMPLATE at a template
+# made with `python profiles.py build` to start workers from a slim profile
+WORKER_PROFILE_PATH = os.environ.get("UPS_SESSION_TEMPLATE", PROFILE_PATH)
+FAN_OUT = True  # Run every platform at the same time, each in its own browser
+TAB_MODE = False  # Instead, run every platform in its own tab of a single browser
+MAX_CONCURRENT_UPLOADS = 3  # Upper bound on browsers running at once in fan-out mode
+TAB_POLL_INTERVAL = 0.5  # Pause when every tab is waiting on its platform
+UPLOAD_RESUMES = 1  # Times a failed upload is resumed from its last good step
+POOL_CHECKOUT_TIMEOUT = 600  # Seconds an upload waits for a pooled browser before failing
+PREPARE_RENDITIONS = False  # Render a per-platform version of videos that break its limits with ffmpeg first
+CHECK_SESSIONS = True  # Hold back uploads to platforms the profile is signed out of (see sessions.py)
+# Origins rewritten before every navigation, e.g. to run the uploaders against
+# the mock sites of mock_sites.py: {"https://twitter.com": "http://127.0.0.1:8800/twitter.com"}
+URL_OVERRIDES = json.loads(os.environ.get("UPS_URL_OVERRIDES") or "{}")
+PROFILE_COPY_IGNORE = shutil.ignore_patterns(
+    "lock", ".parentlock", "parent.lock", "cache2", "startupCache", "thumbnails",
+    "crashes", "minidumps", "saved-telemetry-pings", "datareporting",
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def read_metadata(file_path):
-    """Read and parse the metadata from the given file."""
-    logger.info(f"Reading metadata from {file_path}")
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-        
-        title = lines[0].strip()
-        description = ''.join(lines[1:-1]).strip()
-        tags = lines[-1].strip()
-        
-        logger.info(f"Title: {title}")
-        logger.info(f"Description: {description[:50]}...")
-        logger.info(f"Tags: {tags}")
-        
-        return title, description, tags
-    except FileNotFoundError:
-        logger.error(f"Metadata file not found: {file_path}")
-        return "", "", ""
-    except Exception as e:
-        logger.error(f"Error reading metadata: {e}")
-        return "", "", ""
+# Account the upload running in the current context is made as
+_account = contextvars.ContextVar("ups_upload_account", default=DEFAULT_ACCOUNT)
 
-def setup_browser(profile_path):
-    """Set up and return a Firefox browser instance with the given profile."""
+def setup_browser(profile_path, platform=None):
+    """Set up and return a Firefox browser instance with the given profile.
+
+    The launch mode (desktop or worker) comes from launcher.LAUNCH_MODE; the
+    platform, if known, decides whether worker mode may turn images off.
+    """
     logger.info(f"Setting up Firefox browser with profile: {profile_path}")
     try:
-        options = Options()
-        options.add_argument("-profile")
-        options.add_argument(profile_path)
-        service = Service(GeckoDriverManager().install())
-        driver = webdriver.Firefox(service=service, options=options)
+        options = build_options(profile_path, platform=platform)
+        driver = start_firefox(options)
         logger.info("Firefox browser initialized successfully")
         return driver
     except Exception as e:
         logger.error(f"Error setting up browser: {e}")
         return None
 
-def click_element(driver, xpath, timeout=20):
-    """Wait for an element to be clickable and then click it."""
-    try:
-        element = WebDriverWait(driver, timeout).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
-        )
-        time.sleep(random.uniform(0.5, 1))
+def _click(driver, platform, name, timeout):
+    with span("click", name, platform):
+        element = locate(driver, platform, name, timeout, clickable=True)
+        pause("click", platform)
         element.click()
+
+def click_element(driver, platform, name, timeout=20):
+    """Wait for a registered element (see locators.LOCATORS) to be clickable and then click it."""
+    try:
+        _click(driver, platform, name, timeout)
         return True
     except TimeoutException:
-        logger.error(f"Timeout waiting for element: {xpath}")
+        logger.error(f"Timeout waiting for element: {platform}.{name}")
         return False
     except Exception as e:
-        logger.error(f"Error clicking element {xpath}: {e}")
+        logger.error(f"Error clicking element {platform}.{name}: {e}")
 
 
 
-def upload_to_x(driver, video_path, title, description, tags):
-    """Upload a video to X (Twitter) with the given title, description, and tags."""
-    logger.info("Starting X (Twitter) upload process")
-    try:
-        driver.get("https://twitter.com/compose/tweet")
-        logger.info("Navigated to X (Twitter) compose page")
-
-        file_input = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//input[@type="file"]'))
-        )
-        file_input.send_keys(video_path)
-        logger.info(f"Video file uploaded: {video_path}")
+def navigate(driver, url):
+    """Load a page in the browser, traced as a navigation to its host.
 
-        tweet_input = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//div[@role="textbox"]'))
-        )
-        full_tweet = f"{title}\n\n{description}\n\n{tags}"[:280]  # Twitter character limit
-        tweet_input.send_keys(full_tweet)
-        logger.info("Tweet text entered")
+    The URL's origin is swapped for its URL_OVERRIDES entry, if it has one.
+    """
+    host = urlsplit(url).netloc
+    for origin, replacement in URL_OVERRIDES.items():
+        if url.startswith(origin):
+            url = replacement + url[len(origin):]
+            break
+    with span("navigate", host):
+        driver.get(url)
 
-        if not click_element(driver, "//span[text()='Tweet']"):
-            raise Exception("Failed to click 'Tweet' button")
-
-        WebDriverWait(driver, 120).until(
-            EC.presence_of_element_located((By.XPATH, "//span[contains(text(), 'Your Tweet was sent')]"))
-        )
-        logger.info("Upload success message detected")
-
-    except Exception as e:
-        logger.error(f"Error during X (Twitter) upload: {e}")
+def http_transfer(driver, platform, video_path):
+    """Send the video over HTTP when the platform has an endpoint; returns True if it did.
 
+    The browser's session cookies are reused for the transfer and the browser
+    is then pointed at the metadata form the server hands back.
+    """
+    if platform not in HTTP_ENDPOINTS:
         return False
-
-
-
-def upload_to_linkedin(driver, video_path, title, description, tags):
-    """Upload a video to LinkedIn with the given title, description, and tags."""
-    logger.info("Starting LinkedIn upload process")
+    cookies = {cookie["name"]: cookie["value"] for cookie in driver.get_cookies()}
     try:
-        driver.get("https://www.linkedin.com/feed/")
-        logger.info("Navigated to LinkedIn feed")
-
-        if not click_element(driver, "//span[text()='Start a post']"):
-            raise Exception("Failed to click 'Start a post' button")
-
-        file_input = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//input[@type="file"]'))
-        )
+        upload = upload_for_platform(platform, video_path, cookies, account=_account.get())
+    except UploadError as e:
+        logger.warning(f"[{platform}] HTTP upload failed, falling back to the browser file input: {e}")
+        return False
+    if upload.get("form_url"):
+        navigate(driver, upload["form_url"])
+    logger.info(f"Video file uploaded over HTTP: {video_path}")
+    return True
+
+def send_file(driver, platform, video_path, timeout):
+    """Wait for the platform's file input and hand it the video, or push it over HTTP if configured."""
+    with span("file_transfer", platform=platform):
+        if http_transfer(driver, platform, video_path):
+            return
+        file_input = locate(driver, platform, "file_input", timeout)
         file_input.send_keys(video_path)
-        logger.info(f"Video file uploaded: {video_path}")
+    logger.info(f"Video file uploaded: {video_path}")
+
+def require_click(driver, platform, name, timeout):
+    """Click a registered element, raising what went wrong so the step can be retried or classified."""
+    _click(driver, platform, name, timeout)
+
+def publish_step(driver, platform, capture, name="publish"):
+    """Return a step function that starts capturing the post's URL and clicks the publish button."""
+    def publish(timeout):
+        capture.arm()
+        require_click(driver, platform, name, timeout)
+    return publish
+
+def platform_video(video_path, platform):
+    """Return the cached rendition of the video for the platform, or the video itself."""
+    rendition = cached_rendition(video_path, platform)
+    if rendition:
+        logger.info(f"[{platform}] Using cached rendition {rendition}")
+    return rendition or video_path
+
+def run_upload_steps(platform, steps, checkpoint, result_step, name):
+    """Run a platform's steps and return the value of result_step, True, or False on failure.
+
+    The StepFailed of a failed run is kept in the checkpoint under "error".
+    """
+    try:
+        results = run_steps(platform, steps, checkpoint)
+        checkpoint.pop("error", None)
+        return results.get(result_step) or True
+    except StepFailed as e:
+        logger.error(f"Error during {name} upload: {e}")
+        checkpoint["error"] = e
+        return False
 
-        post_input = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//div[@role="textbox"]'))
-        )
-        full_post = f"{title}\n\n{description}\n\n{tags}"
-        post_input.send_keys(full_post)
-        logger.info("Post text entered")
+def x_steps(driver, video_path, caption, capture):
+    """Build the checkpointed steps of an X (Twitter) upload."""
+    def open_compose(timeout):
+        navigate(driver, "https://twitter.com/compose/tweet")
+        logger.info("Navigated to X (Twitter) compose page")
 
-        if not click_element(driver, "//span[text()='Post']"):
-            raise Exception("Failed to click 'Post' button")
+    def fill_caption(timeout):
+        tweet_input = locate(driver, "x", "caption", timeout)
+        enter_text(driver, tweet_input, caption, "x", "caption", clear=True)
+        logger.info("Tweet text entered")
 
-        WebDriverWait(driver, 120).until(
-            EC.presence_of_element_located((By.XPATH, "//span[contains(text(), 'Post successful')]"))
-        )
+    def confirm(timeout):
+        wait_for_selector(driver, xpath=union_xpath("x", "success"), timeout=timeout, name="success")
         logger.info("Upload success message detected")
+        return capture.url()
+
+    return [
+        Step("open", open_compose, retries=1),
+        Step("upload_file", lambda timeout: send_file(driver, "x", video_path, timeout)),
+        Step("fill_caption", fill_caption, retries=1),
+        Step("publish", publish_step(driver, "x", capture), retries=1),
+        Step("confirm", confirm, timeout=120, ready=lambda: present(driver, "x", "success")),
+    ]
+
+def upload_to_x(driver, video_path, metadata, checkpoint=None):
+    """Upload a video to X (Twitter) with the caption rendered from metadata."""
+    logger.info("Starting X (Twitter) upload process")
+    return run_platform_steps(driver, "x", video_path, metadata, checkpoint)
 
-    except Exception as e:
-        logger.error(f"Error during LinkedIn upload: {e}")
-
+def linkedin_steps(driver, video_path, caption, capture):
+    """Build the checkpointed steps of a LinkedIn upload."""
+    def open_feed(timeout):
+        navigate(driver, "https://www.linkedin.com/feed/")
+        logger.info("Navigated to LinkedIn feed")
 
+    def fill_caption(timeout):
+        post_input = locate(driver, "linkedin", "caption", timeout)
+        enter_text(driver, post_input, caption, "linkedin", "caption", clear=True)
+        logger.info("Post text entered")
 
+    def confirm(timeout):
+        wait_for_selector(driver, xpath=union_xpath("linkedin", "success"), timeout=timeout, name="success")
+        logger.info("Upload success message detected")
+        return capture.url()
+
+    return [
+        Step("open", open_feed, retries=1),
+        Step("start_post", lambda timeout: require_click(driver, "linkedin", "start_post", timeout), retries=1),
+        Step("upload_file", lambda timeout: send_file(driver, "linkedin", video_path, timeout)),
+        Step("fill_caption", fill_caption, retries=1),
+        Step("publish", publish_step(driver, "linkedin", capture), retries=1),
+        Step("confirm", confirm, timeout=120, ready=lambda: present(driver, "linkedin", "success")),
+    ]
+
+def upload_to_linkedin(driver, video_path, metadata, checkpoint=None):
+    """Upload a video to LinkedIn with the caption rendered from metadata."""
+    logger.info("Starting LinkedIn upload process")
+    return run_platform_steps(driver, "linkedin", video_path, metadata, checkpoint)
 
-def upload_to_instagram(driver, video_path, title, description, tags):
-    """Upload a video to Instagram with the given title, description, and tags."""
-    logger.info("Starting Instagram upload process")
-    try:
-        driver.get("https://www.instagram.com/")
+def instagram_steps(driver, video_path, caption, capture):
+    """Build the checkpointed steps of an Instagram upload."""
+    def open_home(timeout):
+        navigate(driver, "https://www.instagram.com/")
         logger.info("Navigated to Instagram homepage")
 
-        if not click_element(driver, "//*[@aria-label='New post']"):
-            raise Exception("Failed to click 'New post' button")
+    def set_crop(timeout):
+        require_click(driver, "instagram", "crop_button", timeout)
+        require_click(driver, "instagram", "crop_portrait", timeout)
 
-        file_input = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//input[@type="file"]'))
-        )
-        file_input.send_keys(video_path)
-        logger.info(f"Video file uploaded: {video_path}")
-
-        time.sleep(15)  # Wait for video processing
-
-        if not click_element(driver, "//*[name()='svg' and @aria-label='Select crop']"):
-            raise Exception("Failed to click crop button")
-
-        if not click_element(driver, "//*[name()='svg' and @aria-label='Crop portrait icon']"):
-            raise Exception("Failed to select portrait crop")
-
-        for _ in range(2):
-            if not click_element(driver, "//*[text()='Next']"):
-                raise Exception("Failed to click 'Next' button")
-
-        description_input = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[@aria-label='Write a caption...']"))
-        )
-        full_description = f"{title}\n\n{description}\n\n{tags}"
-        description_input.send_keys(full_description)
+    def fill_caption(timeout):
+        description_input = locate(driver, "instagram", "caption", timeout, clickable=True)
+        enter_text(driver, description_input, caption, "instagram", "caption", clear=True)
         logger.info("Description entered")
 
-        if not click_element(driver, "//*[text()='Share']"):
-            raise Exception("Failed to click 'Share' button")
-
-        WebDriverWait(driver, 120).until(
-            lambda d: "Your reel has been shared." in d.page_source
-        )
+    def confirm(timeout):
+        wait_for_text(driver, "Your reel has been shared.", timeout=timeout, name="success")
         logger.info("Upload success message detected")
 
-        time.sleep(10)  # Wait for the page to update
+    def fetch_link(timeout):
+        url = capture.url()
+        if url:
+            return url
+        wait_until_ready(driver, "instagram", "post_link", deadline=timeout)
         try:
-            profile_link = driver.find_element(By.XPATH, "//a[contains(@href, '/reel/')]").get_attribute('href')
+            profile_link = locate(driver, "instagram", "post_link", timeout=0).get_attribute('href')
             logger.info(f"Uploaded video link: {profile_link}")
             print(f"Uploaded video link: {profile_link}")
-        except NoSuchElementException:
+            return profile_link
+        except TimeoutException:
             logger.error("Could not find the uploaded video link")
+            return None
+
+    return [
+        Step("open", open_home, retries=1),
+        Step("new_post", lambda timeout: require_click(driver, "instagram", "new_post", timeout), retries=1),
+        Step("upload_file", lambda timeout: send_file(driver, "instagram", video_path, timeout)),
+        Step("wait_processing", lambda timeout: wait_until_ready(driver, "instagram", "media_processed", deadline=timeout),
+             timeout=180, ready=lambda: is_ready(driver, "instagram", "media_processed")),
+        Step("set_crop", set_crop, retries=1),
+        Step("next_crop", lambda timeout: require_click(driver, "instagram", "next", timeout), retries=1),
+        Step("next_edit", lambda timeout: require_click(driver, "instagram", "next", timeout), retries=1),
+        Step("fill_caption", fill_caption, retries=1),
+        Step("publish", publish_step(driver, "instagram", capture, "share"), retries=1),
+        Step("confirm", confirm, timeout=120, ready=lambda: present(driver, "instagram", "success")),
+        Step("fetch_link", fetch_link, timeout=30, required=False),
+    ]
+
+def upload_to_instagram(driver, video_path, metadata, checkpoint=None):
+    """Upload a video to Instagram with the caption rendered from metadata."""
+    logger.info("Starting Instagram upload process")
+    return run_platform_steps(driver, "instagram", video_path, metadata, checkpoint)
 
-    except Exception as e:
-        logger.error(f"Error during Instagram upload: {e}")
-
-def upload_to_tiktok(driver, video_path, title, description, tags):
-    """Upload a video to TikTok with the given title, description, and tags."""
-    logger.info("Starting TikTok upload process")
-    try:
-        driver.get("https://www.tiktok.com/upload")
+def tiktok_steps(driver, video_path, caption, capture):
+    """Build the checkpointed steps of a TikTok upload."""
+    def open_upload(timeout):
+        navigate(driver, "https://www.tiktok.com/upload")
         logger.info("Navigated to TikTok upload page")
 
-        file_input = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, "//input[@type='file']"))
-        )
-        file_input.send_keys(video_path)
-        logger.info(f"Video file uploaded: {video_path}")
-
-        caption_input = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'DraftEditor-editorContainer')]//div[contains(@class, 'public-DraftEditor-content')]"))
-        )
-        full_description = f"{title}\n\n{description}\n\n{tags}"
-        try:
-            caption_input.click()
-            ActionChains(driver).move_to_element(caption_input).send_keys(full_description).perform()
-        except ElementNotInteractableException:
-            driver.execute_script("arguments[0].textContent = arguments[1];", caption_input, full_description)
+    def fill_caption(timeout):
+        caption_input = locate(driver, "tiktok", "caption", timeout, clickable=True)
+        pause("click", "tiktok")
+        caption_input.click()
+        enter_text(driver, caption_input, caption, "tiktok", "caption", clear=True)
         logger.info("Description entered")
 
-        WebDriverWait(driver, 60).until(
-            EC.presence_of_element_located((By.XPATH, "//span[text()='Uploaded']"))
-        )
+    def wait_uploaded(timeout):
+        wait_for_selector(driver, xpath=union_xpath("tiktok", "uploaded"), timeout=timeout, name="uploaded")
         logger.info("Upload completed")
 
-        if not click_element(driver, "//button[contains(@class, 'TUXButton') and .//div[text()='Post']]"):
-            raise Exception("Failed to click 'Post' button")
-
-        WebDriverWait(driver, 120).until(
-            EC.presence_of_element_located((By.XPATH, "//div[text()='Your video has been uploaded']"))
-        )
+    def confirm(timeout):
+        wait_for_selector(driver, xpath=union_xpath("tiktok", "success"), timeout=timeout, name="success")
         logger.info("Upload success message detected")
+        return capture.url()
+
+    return [
+        Step("open", open_upload, retries=1),
+        Step("upload_file", lambda timeout: send_file(driver, "tiktok", video_path, timeout)),
+        Step("fill_caption", fill_caption, timeout=30, retries=1),
+        Step("wait_uploaded", wait_uploaded, timeout=60, ready=lambda: present(driver, "tiktok", "uploaded")),
+        Step("publish", publish_step(driver, "tiktok", capture), retries=1),
+        Step("confirm", confirm, timeout=120, ready=lambda: present(driver, "tiktok", "success")),
+    ]
+
+def upload_to_tiktok(driver, video_path, metadata, checkpoint=None):
+    """Upload a video to TikTok with the caption rendered from metadata."""
+    logger.info("Starting TikTok upload process")
+    return run_platform_steps(driver, "tiktok", video_path, metadata, checkpoint)
 
-    except Exception as e:
-        logger.error(f"Error during TikTok upload: {e}")
-
-def upload_to_snapchat(driver, video_path, title, description, tags):
-    """Upload a video to Snapchat with the given title, description, and tags."""
-    logger.info("Starting Snapchat upload process")
-    try:
-        driver.get('https://my.snapchat.com/')
+def snapchat_steps(driver, video_path, caption, capture):
+    """Build the checkpointed steps of a Snapchat upload."""
+    def open_home(timeout):
+        navigate(driver, 'https://my.snapchat.com/')
         logger.info("Navigated to Snapchat")
 
-        file_input = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='file'][accept='video/mp4,video/quicktime,video/webm,image/jpeg,image/png']"))
-        )
-        file_input.send_keys(video_path)
-        logger.info("Video file uploaded")
-        time.sleep(10)
-
-        post_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/div/main/div[2]/div[2]/div[2]/div[5]/div[1]/div[1]/div/div[2]/div/div/div/div[1]/div/div/div/div[1]"))
-        )
-        post_button.click()
-        logger.info("Clicked post button")
-
-        description_textarea = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//textarea[@placeholder='Add a description and #topics']"))
-        )
-        full_description = f"{title}\n\n{description}\n\n{tags}"
-        description_textarea.send_keys(full_description)
+    def fill_caption(timeout):
+        description_textarea = locate(driver, "snapchat", "caption", timeout)
+        enter_text(driver, description_textarea, caption, "snapchat", "caption", clear=True)
         logger.info("Added description")
 
-        accept_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/div[2]/div/div[2]/div/div[2]/div[3]/div/button[2]"))
-        )
-        accept_button.click()
-        logger.info("Accepted terms")
-
-        post_final_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Post to Snapchat')]"))
-        )
-        post_final_button.click()
-        logger.info("Clicked final post button")
-
-        WebDriverWait(driver, 120).until(
-            EC.presence_of_element_located((By.XPATH, "//div[text()='Yay! Your post is now live!']"))
-        )
+    def confirm(timeout):
+        wait_for_selector(driver, xpath=union_xpath("snapchat", "success"), timeout=timeout, name="success")
+        logger.info("Upload success message detected")
+        return capture.url()
+
+    return [
+        Step("open", open_home, retries=1),
+        Step("upload_file", lambda timeout: send_file(driver, "snapchat", video_path, timeout), timeout=10),
+        Step("wait_processing", lambda timeout: wait_until_ready(driver, "snapchat", "media_processed", deadline=timeout),
+             timeout=180, ready=lambda: is_ready(driver, "snapchat", "media_processed")),
+        Step("open_post", lambda timeout: require_click(driver, "snapchat", "post_option", timeout), timeout=10, retries=1),
+        Step("fill_caption", fill_caption, timeout=10, retries=1),
+        Step("accept_terms", lambda timeout: require_click(driver, "snapchat", "accept_terms", timeout), timeout=10, retries=1),
+        Step("publish", publish_step(driver, "snapchat", capture), timeout=10, retries=1),
+        Step("confirm", confirm, timeout=120, ready=lambda: present(driver, "snapchat", "success")),
+    ]
+
+def upload_to_snapchat(driver, video_path, metadata, checkpoint=None):
+    """Upload a video to Snapchat with the caption rendered from metadata."""
+    logger.info("Starting Snapchat upload process")
+    return run_platform_steps(driver, "snapchat", video_path, metadata, checkpoint)
+
+def youtube_steps(driver, video_path, title, description, capture):
+    """Build the checkpointed steps of a YouTube upload."""
+    def open_upload(timeout):
+        navigate(driver, "https://www.youtube.com/upload")
+        locate(driver, "youtube", "file_picker", timeout)
+        capture.arm()
+
+    def upload_file(timeout):
+        with span("file_transfer"):
+            if http_transfer(driver, "youtube", video_path):
+                return
+            locate(driver, "youtube", "file_input", timeout).send_keys(video_path)
+        wait_until_ready(driver, "youtube", "file_accepted")
+
+    def fill_title(timeout):
+        title_box = locate(driver, "youtube", "title", timeout)
+        enter_text(driver, title_box, title, "youtube", "title", clear=True)
+        wait_until_ready(driver, "youtube", "details_entered", text=title)
+
+    def fill_description(timeout):
+        description_box = locate(driver, "youtube", "description", timeout)
+        enter_text(driver, description_box, description, "youtube", "description", clear=True)
+        wait_until_ready(driver, "youtube", "details_entered", text=description)
+
+    def made_for_kids(timeout):
+        require_click(driver, "youtube", "not_for_kids", timeout)
+
+    def next_page(timeout):
+        before = snapshot(driver, "youtube", "wizard_step")
+        require_click(driver, "youtube", "next", timeout)
+        wait_until_ready(driver, "youtube", "wizard_step", before=before)
+
+    def visibility(timeout):
+        unlisted = locate(driver, "youtube", "unlisted", timeout, clickable=True)
+        driver.execute_script("arguments[0].scrollIntoView(true);", unlisted)
+        pause("click", "youtube")
+        unlisted.click()
+
+    def done(timeout):
+        require_click(driver, "youtube", "done", timeout)
+
+    def confirm(timeout):
+        wait_for(driver, text="Video published", css="ytcp-video-share-dialog", timeout=timeout, name="published")
         logger.info("Upload success message detected")
 
-    except Exception as e:
-        logger.error(f"An error occurred during Snapchat upload: {e}")
+    def fetch_url(timeout):
+        url = capture.url()
+        if url:
+            return url
+        # Nothing captured: fall back to the newest video in Studio
+        navigate(driver, "https://studio.youtube.com")
+        WebDriverWait(driver, timeout).until(EC.url_contains("studio.youtube.com"))
+        channel = driver.current_url.split("/")[-1]
+        logger.info(f"Retrieved Channel ID: {channel}")
+        listing = "short" if is_youtube_short(video_path) else "upload"
+        navigate(driver, f"https://studio.youtube.com/channel/{channel}/videos/{listing}")
+        wait_until_ready(driver, "youtube", "video_list", deadline=timeout)
+        first_video = locate(driver, "youtube", "video_row", timeout)
+        anchor_tag = first_video.find_element(By.TAG_NAME, "a")
+        href = anchor_tag.get_attribute("href")
+        video_id = href.split("/")[-2]
 
-def upload_to_youtube(driver, video_path, title, description, tags):
-    """Upload a video to YouTube with the given title, description, and tags."""
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        logger.info(f"Uploaded Video: {url}")
+        return url
+
+    return [
+        Step("open_upload", open_upload, retries=1),
+        Step("upload_file", upload_file),
+        Step("fill_title", fill_title, retries=1),
+        Step("fill_description", fill_description, retries=1),
+        Step("made_for_kids", made_for_kids, timeout=10, required=False),
+        Step("next_1", next_page, required=False),
+        Step("next_2", next_page, required=False),
+        Step("next_3", next_page, required=False),
+        Step("visibility", visibility, required=False),
+        Step("done", done, required=False),
+        Step("confirm", confirm, timeout=60, required=False, ready=lambda: present(driver, "youtube", "success")),
+        Step("fetch_url", fetch_url),
+    ]
+
+def upload_to_youtube(driver, video_path, metadata, checkpoint=None):
+    """Upload a video to YouTube with the caption rendered from metadata."""
     logger.info("Starting YouTube upload process")
+    return run_platform_steps(driver, "youtube", video_path, metadata, checkpoint)
+
+# Step builder, result step and display name of each platform's flow
+PLATFORM_FLOWS = {
+    "snapchat": (snapchat_steps, "confirm", "Snapchat"),
+    "linkedin": (linkedin_steps, "confirm", "LinkedIn"),
+    "x": (x_steps, "confirm", "X (Twitter)"),
+    "instagram": (instagram_steps, "fetch_link", "Instagram"),
+    "tiktok": (tiktok_steps, "confirm", "TikTok"),
+    "youtube": (youtube_steps, "fetch_url", "YouTube"),
+}
+
+def platform_steps(driver, platform, video_path, metadata, capture):
+    """Build a platform's upload steps for the video (or its cached rendition) and metadata.
+
+    The steps report the post's URL through capture, which the caller closes
+    once the flow is over; resumed runs can share it.
+    """
+    build = PLATFORM_FLOWS[platform][0]
+    video = platform_video(video_path, platform)
+    if platform == "youtube":
+        return build(driver, video, metadata.title_for("youtube"), metadata.caption("youtube"), capture)
+    return build(driver, video, metadata.caption(platform), capture)
+
+def run_platform_steps(driver, platform, video_path, metadata, checkpoint=None):
+    """Build and run a platform's upload steps; returns its result, True, or False on failure."""
+    if checkpoint is None:
+        checkpoint = new_checkpoint()
+    _, result_step, name = PLATFORM_FLOWS[platform]
+    capture = ResultCapture(driver, platform)
     try:
-        driver.get("https://studio.youtube.com")
-        WebDriverWait(driver, 20).until(EC.url_contains("studio.youtube.com"))
-        channel_id = driver.current_url.split("/")[-1]
-        logger.info(f"Retrieved Channel ID: {channel_id}")
-
-        driver.get("https://www.youtube.com/upload")
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "ytcp-uploads-file-picker")))
-
-        file_picker = driver.find_element(By.TAG_NAME, "ytcp-uploads-file-picker")
-        file_input = file_picker.find_element(By.TAG_NAME, "input")
-        file_input.send_keys(video_path)
-        time.sleep(5)  # Wait for the file to be uploaded
-
-        WebDriverWait(driver, 20).until(EC.presence_of_all_elements_located((By.ID, "textbox")))
-        textboxes = driver.find_elements(By.ID, "textbox")
-        
-        title_box = textboxes[0]
-        title_box.clear()
-        title_box.send_keys(title)
-        time.sleep(3)  # Short wait after setting the title
-        
-        description_box = textboxes[1]
-        description_box.send_keys(f"{description}\n\n{tags}")
-        time.sleep(3)  # Short wait after setting the description
+        steps = platform_steps(driver, platform, video_path, metadata, capture)
+        return run_upload_steps(platform, steps, checkpoint, result_step, name)
+    finally:
+        capture.close()
+
+PLATFORM_UPLOADERS = {
+    "snapchat": upload_to_snapchat,
+    "linkedin": upload_to_linkedin,
+    "x": upload_to_x,
+    "instagram": upload_to_instagram,
+    "tiktok": upload_to_tiktok,
+    "youtube": upload_to_youtube,
+}
+
+def isolated_profile(profile_path):
+    """Copy the profile into a temporary directory so a worker gets its own Firefox lock."""
+    worker_dir = tempfile.mkdtemp(prefix="ups-profile-")
+    worker_profile = os.path.join(worker_dir, "profile")
+    ignore = None if is_template(profile_path) else PROFILE_COPY_IGNORE
+    clone_profile(profile_path, worker_profile, ignore=ignore)
+    return worker_profile
+
+def setup_isolated_browser(profile_path, platform=None):
+    """Set up a browser on a private copy of the profile; quit it with close_isolated_browser."""
+    with span("profile_clone", platform=platform):
+        worker_profile = isolated_profile(profile_path)
+    driver = setup_browser(worker_profile, platform)
+    if not driver:
+        shutil.rmtree(os.path.dirname(worker_profile), ignore_errors=True)
+        return None
+    driver.ups_profile_dir = worker_profile
+    return driver
 
-        try:
-            is_not_for_kids_checkbox = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.NAME, "VIDEO_MADE_FOR_KIDS_NOT_MFK"))
-            )
-            is_not_for_kids_checkbox.click()
-        except TimeoutException:
-            logger.warning("Could not find 'NOT_MADE_FOR_KIDS' checkbox. Trying alternative method.")
-            try:
-                not_for_kids_label = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, "//tp-yt-paper-radio-button[@name='VIDEO_MADE_FOR_KIDS_NOT_MFK']"))
-                )
-                not_for_kids_label.click()
-            except TimeoutException:
-                logger.error("Failed to set 'made for kids' option. Continuing with upload.")
-
-        for _ in range(3):
-            try:
-                next_button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, "next-button")))
-                next_button.click()
-                time.sleep(3)
-            except TimeoutException:
-                logger.warning(f"Next button not found on step {_+1}. Continuing to next step.")
+def close_isolated_browser(driver):
+    """Quit a browser from setup_isolated_browser and delete its profile copy."""
+    try:
+        driver.quit()
+    finally:
+        worker_profile = getattr(driver, "ups_profile_dir", None)
+        if worker_profile:
+            shutil.rmtree(os.path.dirname(worker_profile), ignore_errors=True)
+
+def create_browser_pool(profile_path=WORKER_PROFILE_PATH, size=MAX_CONCURRENT_UPLOADS, **kwargs):
+    """Create a pool of warm browsers, each running on its own copy of the profile."""
+    pool = BrowserPool(
+        lambda: setup_isolated_browser(profile_path),
+        size=size,
+        destroy=close_isolated_browser,
+        **kwargs,
+    )
+    pool.profile_path = profile_path
+    return pool
+
+def session_profile(profile_path=None, pool=None):
+    """Return the profile whose login state decides an upload, or None when it is not checked."""
+    if not CHECK_SESSIONS:
+        return None
+    return getattr(pool, "profile_path", None) if pool else profile_path
 
+def hold_back(platform, profile_path, result):
+    """Mark the result blocked if the profile is signed out of the platform; returns True if it did."""
+    signed_out = session_problem(profile_path, platform)
+    if not signed_out:
+        return False
+    logger.warning(f"[{platform}] Not uploading, signed out: {signed_out}")
+    result.update(blocked=True, failure=LOGIN_EXPIRED, error=f"Signed out: {signed_out}")
+    return True
+
+def new_result(platform):
+    """Return an empty result record for an upload to the platform."""
+    return {"platform": platform, "ok": False, "result": None, "error": None, "skipped": False,
+            "rejected": False, "blocked": False, "failure": None, "peak_rss_mb": None, "cpu_seconds": None,
+            "delay_seconds": 0.0}
+
+def screen_upload(video_path, platform, account, result, prepare=False):
+    """Settle uploads that need no browser; returns True if the result is final.
+
+    The result is marked skipped when the ledger already has the video for
+    this platform and account, and rejected when it breaks the platform's
+    limits. With prepare set, a rendition is rendered first if the video
+    breaks limits one can fix and none is cached yet. Preflight checks the
+    file that will be sent, with the duration of the source.
+    """
+    existing = already_published(video_path, platform, account)
+    if existing:
+        result.update(ok=True, skipped=True, result=existing["url"] or True)
+        return True
+    if prepare:
+        prepare_renditions(video_path, [platform])
+    rendition = cached_rendition(video_path, platform)
+    problems = preflight(rendition or video_path, platform, source=video_path if rendition else None)
+    if problems:
+        result.update(rejected=True, failure=PERMANENT, error=f"Preflight failed: {'; '.join(problems)}")
+        return True
+    return False
+
+def settle_failure(driver, platform, account, result, error):
+    """Classify a finished upload's failure into the result and report its outcome to the circuit breakers."""
+    if result["ok"]:
+        breakers.record(platform, account)
+        return
+    result["failure"] = classify(platform, error, driver)
+    result["error"] = result["error"] or str(error or "upload failed")
+    breakers.record(platform, account, result["failure"])
+
+def run_platform_upload(platform, video_path, metadata, profile_path=WORKER_PROFILE_PATH, pool=None,
+                        account=DEFAULT_ACCOUNT):
+    """Upload to a single platform in a dedicated browser and return a result record.
+
+    When a pool is given the browser is borrowed from it instead of launched.
+    Videos the ledger already has for this platform and account are skipped,
+    and videos that break the platform's limits are rejected, before any
+    browser is touched. With PREPARE_RENDITIONS set, a rendition is rendered
+    first for videos that need one; the ledger keeps tracking the source file.
+
+    Failures are classified (see failures.classify) into result["failure"]
+    and only transient ones are resumed. While the platform's or account's
+    circuit breaker is open, or the profile is signed out of the platform,
+    the upload is refused at once and marked blocked.
+    """
+    with span("upload", platform=platform, account=account) as trace, delay_budget() as delays:
+        started = time.monotonic()
+        result = new_result(platform)
+        if screen_upload(video_path, platform, account, result, prepare=PREPARE_RENDITIONS):
+            result["elapsed"] = time.monotonic() - started
+            trace.set(skipped=result["skipped"], rejected=result["rejected"])
+            return result
+        if hold_back(platform, session_profile(profile_path, pool), result):
+            result["elapsed"] = time.monotonic() - started
+            trace.set(blocked=True)
+            return result
+        blocked = breakers.acquire(platform, account)
+        if blocked:
+            logger.warning(f"[{platform}] Not uploading, circuit breaker: {blocked}")
+            result.update(blocked=True, error=f"Circuit open: {blocked}", elapsed=time.monotonic() - started)
+            trace.set(blocked=True)
+            return result
+        driver = None
+        settled = False
+        account_token = _account.set(account)
         try:
-            WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.XPATH, "//*[@id=\"radioLabel\"]")))
-            radio_buttons = driver.find_elements(By.XPATH, "//*[@id=\"radioLabel\"]")
-            if len(radio_buttons) >= 2:
-                driver.execute_script("arguments[0].scrollIntoView(true);", radio_buttons[1])
-                radio_buttons[1].click()  # Select the second radio button for unlisted
+            if pool:
+                driver = pool.checkout(POOL_CHECKOUT_TIMEOUT)
             else:
-                logger.warning("Could not find the correct radio button for unlisted visibility.")
-        except TimeoutException:
-            logger.error("Failed to set video visibility. Continuing with upload.")
+                driver = setup_isolated_browser(profile_path, platform)
+            if not driver:
+                raise Exception("Failed to initialize browser")
+            checkpoint = new_checkpoint()
+            with BrowserUsageMonitor(driver) as usage:
+                outcome = PLATFORM_UPLOADERS[platform](driver, video_path, metadata, checkpoint)
+                for _ in range(UPLOAD_RESUMES):
+                    if outcome or classify(platform, checkpoint.get("error"), driver) != TRANSIENT:
+                        break
+                    logger.info(f"[{platform}] Resuming upload after step(s): {', '.join(checkpoint['done']) or 'none'}")
+                    outcome = PLATFORM_UPLOADERS[platform](driver, video_path, metadata, checkpoint)
+            result["peak_rss_mb"] = usage.peak_rss_mb
+            result["cpu_seconds"] = usage.cpu_seconds
+            result["ok"] = bool(outcome)
+            result["result"] = outcome
+            trace.set(ok=bool(outcome))
+            if outcome:
+                record_published(video_path, platform, outcome if isinstance(outcome, str) else None, account)
+            settle_failure(driver, platform, account, result, checkpoint.get("error"))
+            settled = True
+        except Exception as e:
+            logger.error(f"[{platform}] Worker failed: {e}")
+            result["error"] = str(e)
+            if driver:
+                settle_failure(driver, platform, account, result, e)
+                settled = True
+        finally:
+            _account.reset(account_token)
+            if not settled:
+                # The browser never started, which says nothing about the platform
+                breakers.release(platform, account)
+            if result["failure"]:
+                trace.set(failure=result["failure"])
+            if driver and pool:
+                pool.checkin(driver, pool.is_healthy(driver))
+            elif driver:
+                close_isolated_browser(driver)
+            result["elapsed"] = time.monotonic() - started
+            result["delay_seconds"] = delays.spent
+            trace.set(delay_seconds=round(delays.spent, 3))
+        return result
+
+def fan_out_upload(video_path, metadata, platforms=None,
+                   max_workers=MAX_CONCURRENT_UPLOADS, profile_path=WORKER_PROFILE_PATH, pool=None):
+    """Run the platform uploaders concurrently and collect one result per platform."""
+    platforms = list(platforms or PLATFORM_UPLOADERS)
+    max_workers = max(1, min(max_workers, len(platforms)))
+    profile = session_profile(profile_path, pool)
+    if profile:
+        # One parallel check up front; the uploads then read the cached results
+        check_sessions(profile, platforms)
+    if PREPARE_RENDITIONS:
+        prepare_renditions(video_path, platforms)
+    logger.info(f"Fanning out upload to {', '.join(platforms)} with {max_workers} concurrent workers")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload") as executor:
+        futures = {
+            executor.submit(run_platform_upload, platform, video_path, metadata, profile_path, pool): platform
+            for platform in platforms
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["platform"]] = result
+            logger.info(f"[{result['platform']}] Finished in {result['elapsed']:.1f}s (ok={result['ok']})")
+    return {platform: results[platform] for platform in platforms}
+
+def upload_in_tabs(driver, video_path, metadata, platforms=None, account=DEFAULT_ACCOUNT, profile_path=None):
+    """Upload to several platforms from one browser, each platform in its own tab.
+
+    The flows take turns: each runs in its tab until its next step would sit
+    waiting on the platform (processing, publishing), then the next tab gets
+    the browser. Uploads overlap like in fan-out mode, but share a single
+    Firefox process. Returns one result record per platform, as
+    fan_out_upload does; the browser's usage is reported on every record.
+    Platforms the browser's profile_path is signed out of get no tab.
+    """
+    platforms = list(platforms or PLATFORM_UPLOADERS)
+    profile = session_profile(profile_path)
+    if profile:
+        check_sessions(profile, platforms)
+    if PREPARE_RENDITIONS:
+        prepare_renditions(video_path, platforms)
+    results = {platform: new_result(platform) for platform in platforms}
+    flows = {}
+    with span("upload_tabs", account=account), BrowserUsageMonitor(driver) as usage:
+        for platform in platforms:
+            result = results[platform]
+            result["started"] = time.monotonic()
+            if screen_upload(video_path, platform, account, result) or hold_back(platform, profile, result):
+                result["elapsed"] = time.monotonic() - result["started"]
+                continue
+            blocked = breakers.acquire(platform, account)
+            if blocked:
+                logger.warning(f"[{platform}] Not uploading, circuit breaker: {blocked}")
+                result.update(blocked=True, error=f"Circuit open: {blocked}", elapsed=0.0)
+                continue
+            if flows:
+                driver.switch_to.new_window("tab")
+            checkpoint = new_checkpoint()
+            capture = ResultCapture(driver, platform)
+            # Each flow runs in its own context, so its pauses are charged to its own budget
+            context = contextvars.copy_context()
+            context.run(_account.set, account)
+            flows[platform] = {
+                "handle": driver.current_window_handle,
+                "checkpoint": checkpoint,
+                "runner": step_runner(platform, platform_steps(driver, platform, video_path, metadata, capture),
+                                      checkpoint),
+                "capture": capture,
+                "resumes": UPLOAD_RESUMES,
+                "context": context,
+                "delays": context.run(start_delay_account),
+            }
+        logger.info(f"Running {', '.join(flows) or 'no uploads'} in {len(flows)} tabs of one browser")
 
         try:
-            done_button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, "done-button")))
-            done_button.click()
-            time.sleep(5)  # Wait for the upload to finalize
-        except TimeoutException:
-            logger.error("Could not find the 'Done' button. Upload may not have completed successfully.")
+            while flows:
+                waiting = 0
+                for platform, flow in list(flows.items()):
+                    result = results[platform]
+                    error = None
+                    try:
+                        driver.switch_to.window(flow["handle"])
+                        step = flow["context"].run(next, flow["runner"])
+                        logger.debug(f"[{platform}] Waiting to run '{step}'")
+                        waiting += 1
+                        continue
+                    except StopIteration as finished:
+                        outcome = finished.value.get(PLATFORM_FLOWS[platform][1]) or True
+                    except StepFailed as e:
+                        if flow["resumes"] and classify(platform, e, driver) == TRANSIENT:
+                            flow["resumes"] -= 1
+                            logger.info(f"[{platform}] Resuming upload after step(s): {', '.join(flow['checkpoint']['done']) or 'none'}")
+                            steps = platform_steps(driver, platform, video_path, metadata, flow["capture"])
+                            flow["runner"] = step_runner(platform, steps, flow["checkpoint"])
+                            continue
+                        logger.error(f"Error during {PLATFORM_FLOWS[platform][2]} upload: {e}")
+                        error = e
+                        outcome = False
+                    except WebDriverException as e:
+                        logger.error(f"[{platform}] Tab failed: {e}")
+                        error = e
+                        outcome = False
+                    result.update(ok=bool(outcome), result=outcome or None, elapsed=time.monotonic() - result["started"],
+                                  delay_seconds=flow["delays"].spent)
+                    settle_failure(driver, platform, account, result, error)
+                    if outcome:
+                        record_published(video_path, platform, outcome if isinstance(outcome, str) else None, account)
+                    logger.info(f"[{platform}] Finished in {result['elapsed']:.1f}s (ok={result['ok']})")
+                    flow["capture"].close()
+                    del flows[platform]
+                    if len(driver.window_handles) > 1:
+                        try:
+                            driver.switch_to.window(flow["handle"])
+                            driver.close()
+                        except WebDriverException:
+                            pass
+                if flows and waiting == len(flows):
+                    time.sleep(TAB_POLL_INTERVAL)
+        finally:
+            # Flows cut short by an error still stop listening for their results
+            for flow in flows.values():
+                flow["capture"].close()
+        driver.switch_to.window(driver.window_handles[0])
+    for result in results.values():
+        result.pop("started", None)
+        result["peak_rss_mb"] = usage.peak_rss_mb
+        result["cpu_seconds"] = usage.cpu_seconds
+    return results
+
+def log_upload_summary(results):
+    """Log one line per platform with the outcome of the upload."""
+    logger.info("Upload summary:")
+    for platform, result in results.items():
+        status = ("SKIPPED" if result.get("skipped") else "OK" if result["ok"]
+                  else "REJECTED" if result.get("rejected") else "BLOCKED" if result.get("blocked") else "FAILED")
+        detail = result["result"] if result["ok"] else result["error"]
+        if status == "FAILED" and result.get("failure"):
+            detail = f"({result['failure']}) {detail}"
+        usage = ""
+        if result.get("peak_rss_mb") is not None:
+            usage = f"  rss {result['peak_rss_mb']:.0f} MB"
+        if result.get("cpu_seconds") is not None:
+            usage += f"  cpu {result['cpu_seconds']:.1f}s"
+        if result.get("delay_seconds"):
+            usage += f"  delays {result['delay_seconds']:.1f}s"
+        logger.info(f"  {platform:<10} {status:<8} {result['elapsed']:7.1f}s{usage}  {detail or ''}")
 
-        driver.get(f"https://studio.youtube.com/channel/{channel_id}/videos/short")
-        time.sleep(2)
-        videos = driver.find_elements(By.TAG_NAME, "ytcp-video-row")
-        first_video = videos[0]
-        anchor_tag = first_video.find_element(By.TAG_NAME, "a")
-        href = anchor_tag.get_attribute("href")
-        video_id = href.split("/")[-2]
+def main():
+    metadata = load_metadata(METADATA_PATH)
 
-        url = f"https://www.youtube.com/watch?v={video_id}"
-        logger.info(f"Uploaded Video: {url}")
+    if TAB_MODE:
+        driver = setup_browser(PROFILE_PATH)
+        if not driver:
+            logger.error("Failed to initialize browser. Exiting.")
+            return
+        try:
+            results = upload_in_tabs(driver, VIDEO_PATH, metadata, profile_path=PROFILE_PATH)
+        finally:
+            driver.quit()
+        log_upload_summary(results)
+        log_stats()
+        return
 
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during YouTube upload: {e}")
+    if FAN_OUT:
+        pool = create_browser_pool().start()
+        try:
+            results = fan_out_upload(VIDEO_PATH, metadata, pool=pool)
+        finally:
+            pool.close()
+        log_upload_summary(results)
+        log_stats()
+        return
 
-def main():
-    title, description, tags = read_metadata(METADATA_PATH)
+    if PREPARE_RENDITIONS:
+        prepare_renditions(VIDEO_PATH)
     driver = setup_browser(PROFILE_PATH)
 
     if driver:
         try:
-            upload_to_snapchat(driver, VIDEO_PATH, title, description, tags)          
-            upload_to_linkedin(driver, VIDEO_PATH, title, description, tags)          
-            upload_to_x(driver, VIDEO_PATH, title, description, tags)
-            upload_to_instagram(driver, VIDEO_PATH, title, description, tags)
-            upload_to_tiktok(driver, VIDEO_PATH, title, description, tags)
-            upload_to_youtube(driver, VIDEO_PATH, title, description, tags)
-
-
+            for platform, uploader in PLATFORM_UPLOADERS.items():
+                # Same ledger and preflight screening as the other modes
+                if screen_upload(VIDEO_PATH, platform, DEFAULT_ACCOUNT, new_result(platform)):
+                    continue
+                outcome = uploader(driver, VIDEO_PATH, metadata)
+                if outcome:
+                    record_published(VIDEO_PATH, platform, outcome if isinstance(outcome, str) else None)
         except Exception as e:
             logger.error(f"An unexpected error occurred: {e}")
         finally:
@@ -397,4 +845,4 @@ def main():
 
 if __name__ == "__main__":
     main()
-    logger.info("Script execution completed")
+    logger.info("Script execution completed")
\ No newline at end of file
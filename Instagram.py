@@ -1,44 +1,32 @@
 import os
 import logging
-import time
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.firefox import GeckoDriverManager
+from launcher import build_options, start_firefox
+from locators import locate
+from ledger import already_published, record_published
+from metadata import load_metadata
+from text_entry import enter_text
+from preflight import preflight
+from readiness import wait_until_ready
+from dom_watch import wait_for_text
+from result_capture import ResultCapture
+from delays import pause
+from transcode import cached_rendition
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def remove_non_bmp_characters(text):
-    return ''.join(c for c in text if ord(c) <= 0xFFFF)
-
-def read_description(file_path):
-    logger.info(f"Reading description from {file_path}")
-    with open(file_path, 'r', encoding='utf-8') as file:
-        text = file.read()
-    cleaned_text = remove_non_bmp_characters(text)
-    logger.info(f"Description read and cleaned: {cleaned_text[:50]}...")
-    return cleaned_text
-
 def setup_firefox_profile(profile_path):
     logger.info(f"Setting up Firefox profile from {profile_path}")
-    options = Options()
-    options.add_argument("-profile")
-    options.add_argument(profile_path)
-    service = Service(GeckoDriverManager().install())
-    driver = webdriver.Firefox(service=service, options=options)
+    options = build_options(profile_path, platform="instagram")
+    driver = start_firefox(options)
     logger.info("Firefox browser initialized with custom profile")
     return driver
 
 def click_next_button(driver):
     try:
-        next_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[text()='Next']"))
-        )
+        next_button = locate(driver, "instagram", "next", 10, clickable=True)
+        pause("click", "instagram")
         next_button.click()
         logger.info("'Next' button clicked successfully")
         return True
@@ -48,14 +36,14 @@ def click_next_button(driver):
 
 def upload_video(driver, video_path, description):
     logger.info("Starting video upload process")
+    video_path = cached_rendition(video_path, "instagram") or video_path
     driver.get("https://www.instagram.com/")
     logger.info("Navigated to Instagram homepage")
 
     try:
         logger.info("Attempting to click 'New post' button")
-        new_post_button = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[@aria-label='New post']"))
-        )
+        new_post_button = locate(driver, "instagram", "new_post", 20, clickable=True)
+        pause("click", "instagram")
         new_post_button.click()
         logger.info("'New post' button clicked successfully")
     except Exception as e:
@@ -64,78 +52,87 @@ def upload_video(driver, video_path, description):
     
     try:
         logger.info(f"Attempting to upload video file: {video_path}")
-        file_input = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, '//input[@type="file"]'))
-        )
+        file_input = locate(driver, "instagram", "file_input", 20)
         file_input.send_keys(video_path)
         logger.info("Video file uploaded successfully")
     except Exception as e:
         logger.error(f"File input send keys failed: {e}")
         return
     
-    time.sleep(15)  # Wait for video processing
+    wait_until_ready(driver, "instagram", "media_processed")
 
     try:
         logger.info("Attempting to select crop options")
-        crop_button = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[name()='svg' and @aria-label='Select crop']"))
-        )
+        crop_button = locate(driver, "instagram", "crop_button", 20, clickable=True)
+        pause("click", "instagram")
         crop_button.click()
         logger.info("Crop button clicked")
 
-        portrait_button = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[name()='svg' and @aria-label='Crop portrait icon']"))
-        )
+        portrait_button = locate(driver, "instagram", "crop_portrait", 20, clickable=True)
+        pause("click", "instagram")
         portrait_button.click()
         logger.info("Portrait crop option selected")
     except Exception as e:
         logger.error(f"Crop selection failed: {e}")
 
+    capture = ResultCapture(driver, "instagram")
     try:
         logger.info("Proceeding to next steps")
         if not click_next_button(driver) or not click_next_button(driver):
             raise Exception("Failed to click 'Next' buttons")
         
         logger.info("Entering video description")
-        description_input = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[@aria-label='Write a caption...']"))
-        )
-        description_input.send_keys(description)
+        description_input = locate(driver, "instagram", "caption", 20, clickable=True)
+        enter_text(driver, description_input, description, "instagram", "caption", clear=True)
         logger.info("Description entered successfully")
         
         logger.info("Attempting to share the post")
-        share_button = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, "//*[text()='Share']"))
-        )
+        share_button = locate(driver, "instagram", "share", 20, clickable=True)
+        capture.arm()
+        pause("click", "instagram")
         share_button.click()
         logger.info("Share button clicked")
     except Exception as e:
         logger.error(f"Post sharing failed: {e}")
+        capture.close()
         return
     
     try:
         logger.info("Waiting for upload success message")
-        WebDriverWait(driver, 120).until(
-            lambda driver: driver.execute_script(
-                "return document.body.innerText.includes('Your reel has been shared.');"
-            )
-        )
+        wait_for_text(driver, "Your reel has been shared.", timeout=120, name="success")
         logger.info("Upload success message detected. Upload process completed.")
+        return capture.url() or True
     except Exception as e:
         logger.error(f"Failed to detect upload success message: {e}")
+    finally:
+        capture.close()
 
-def main(profile_path, video_path, metadata_path):
+def main(profile_path, video_path, metadata_path, pool=None):
     logger.info("Starting main process")
-    description = read_description(metadata_path)
-    driver = setup_firefox_profile(profile_path)
+    description = load_metadata(metadata_path).caption("instagram")
+    if already_published(video_path, "instagram"):
+        return
+    if preflight(video_path, "instagram"):
+        return
+    if pool:
+        logger.info("Borrowing a warm browser from the pool")
+        driver = pool.checkout()
+    else:
+        driver = setup_firefox_profile(profile_path)
 
     try:
-        upload_video(driver, video_path, description)
+        url = upload_video(driver, video_path, description)
+        if url:
+            record_published(video_path, "instagram", url if isinstance(url, str) else None)
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
     finally:
-        logger.info("Closing the browser")
-        driver.quit()
+        if pool:
+            logger.info("Returning the browser to the pool")
+            pool.checkin(driver, pool.is_healthy(driver))
+        else:
+            logger.info("Closing the browser")
+            driver.quit()
 
 if __name__ == "__main__":
     profile_path = r"C:\Users\user\AppData\Roaming\Mozilla\Firefox\Profiles\me97qgzd.default-release"
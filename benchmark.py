@@ -0,0 +1,175 @@
+import os
+import argparse
+import json
+import logging
+import math
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import AllInOne
+import delays
+import failures
+import ledger
+import locators
+import tracing
+from http_upload import HTTP_ENDPOINTS
+from launcher import build_options, start_firefox
+from browser_pool import BrowserPool
+from metadata import Metadata
+from mock_sites import FAILURE_POINTS, MockSites, start_mock_sites
+
+# Constants
+DEFAULT_CONCURRENCY = (1, 2, 4)
+DEFAULT_ROUNDS = 2  # Uploads per platform at each concurrency level
+BENCH_METADATA = Metadata(
+    "Benchmark upload",
+    "Uploaded by benchmark.py to a local mock site.",
+    ["benchmark", "ups"],
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def percentile(values, q):
+    """Nearest-rank percentile of the values, or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def headless_browser(work_dir):
+    """Launch a headless worker-mode Firefox on a fresh, empty profile."""
+    profile = os.path.join(tempfile.mkdtemp(prefix="ups-bench-", dir=work_dir), "profile")
+    os.makedirs(profile)
+    driver = start_firefox(build_options(profile, mode="worker"))
+    driver.ups_profile_dir = profile
+    return driver
+
+def run_level(concurrency, platforms, rounds, video_path, work_dir):
+    """Run rounds uploads per platform with concurrency browsers; returns the level's result records."""
+    # Circuits opened by injected failures at an earlier level would block this one's uploads
+    failures.breakers.reset()
+    pool = BrowserPool(lambda: headless_browser(work_dir), size=concurrency, destroy=AllInOne.close_isolated_browser)
+    pool.start()
+    jobs = [(platform, f"bench-c{concurrency}-r{round_}") for round_ in range(rounds) for platform in platforms]
+    try:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+            results = list(executor.map(
+                lambda job: AllInOne.run_platform_upload(job[0], video_path, BENCH_METADATA, pool=pool, account=job[1]),
+                jobs,
+            ))
+        wall = time.monotonic() - started
+    finally:
+        pool.close()
+    ok = sum(1 for result in results if result["ok"])
+    logger.info(f"Concurrency {concurrency}: {ok}/{len(results)} uploads succeeded in {wall:.1f}s")
+    return {"concurrency": concurrency, "wall_seconds": wall, "uploads": len(results), "succeeded": ok,
+            "uploads_per_minute": ok / wall * 60 if wall else 0.0,
+            "delay_seconds": sum(result.get("delay_seconds") or 0 for result in results)}
+
+def summarize(trace_file, levels):
+    """Aggregate the traced spans into end-to-end and per-step latency per concurrency level."""
+    spans = []
+    with open(trace_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            spans.append(json.loads(line))
+    # Each upload's root span carries the benchmark account, which names its level
+    level_of = {}
+    for record in spans:
+        account = record.get("attrs", {}).get("account", "")
+        if record["kind"] == "upload" and account.startswith("bench-c"):
+            level_of[record["trace_id"]] = int(account[len("bench-c"):].split("-")[0])
+
+    report = []
+    for level in levels:
+        end_to_end = {}
+        steps = {}
+        for record in spans:
+            if level_of.get(record["trace_id"]) != level["concurrency"]:
+                continue
+            seconds = record["duration_ms"] / 1000
+            if record["kind"] == "upload":
+                end_to_end.setdefault(record["platform"], []).append(seconds)
+            elif record["kind"] == "step":
+                steps.setdefault(f"{record['platform']}.{record['name']}", []).append(seconds)
+        stats = lambda values: {"n": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95)}
+        report.append(dict(level,
+                           end_to_end={platform: stats(values) for platform, values in sorted(end_to_end.items())},
+                           steps={name: stats(values) for name, values in sorted(steps.items())}))
+    return report
+
+def print_report(report):
+    for level in report:
+        print(f"\n== concurrency {level['concurrency']}: {level['succeeded']}/{level['uploads']} ok, "
+              f"{level['wall_seconds']:.1f}s, {level['uploads_per_minute']:.1f} uploads/min, "
+              f"{level['delay_seconds']:.1f}s in deliberate delays ==")
+        print(f"  {'end to end':<32} {'n':>4} {'p50':>8} {'p95':>8}")
+        for platform, stats in level["end_to_end"].items():
+            print(f"  {platform:<32} {stats['n']:>4} {stats['p50']:>7.2f}s {stats['p95']:>7.2f}s")
+        print(f"  {'step':<32} {'n':>4} {'p50':>8} {'p95':>8}")
+        for name, stats in level["steps"].items():
+            print(f"  {name:<32} {stats['n']:>4} {stats['p50']:>7.2f}s {stats['p95']:>7.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the uploaders against local mock platform sites")
+    parser.add_argument("video_path")
+    parser.add_argument("--platforms", nargs="+", choices=sorted(AllInOne.PLATFORM_UPLOADERS),
+                        default=sorted(AllInOne.PLATFORM_UPLOADERS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="uploads per platform at each level")
+    parser.add_argument("--processing", type=float, help="seconds the mocks take to process a video")
+    parser.add_argument("--publish", type=float, help="seconds the mocks take to publish")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of page loads with an injected failure")
+    parser.add_argument("--fail-at", choices=FAILURE_POINTS, default="publish")
+    parser.add_argument("--config", help="JSON file with per-platform mock settings (see mock_sites.MockSites)")
+    parser.add_argument("--seed", type=int, help="seed for failure injection")
+    parser.add_argument("--delay-profile", choices=sorted(delays.PROFILES), default=delays.DELAY_PROFILE,
+                        help="humanization delay profile the uploaders use")
+    parser.add_argument("--renditions", action="store_true", help="render per-platform versions first, as real runs do")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    platforms_config = {}
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as file:
+            platforms_config = json.load(file)
+    defaults = platforms_config.setdefault("*", {})
+    defaults.setdefault("fail_rate", args.fail_rate)
+    defaults.setdefault("fail_at", args.fail_at)
+    for name in ("processing", "publish"):
+        if getattr(args, name) is not None:
+            defaults.setdefault("delays", {})[name] = getattr(args, name)
+
+    # Keep the run away from the real ledger, locator stats, traces and upload endpoints
+    work_dir = tempfile.mkdtemp(prefix="ups-bench-")
+    trace_file = os.path.join(work_dir, "traces.jsonl")
+    ledger._ledger = ledger.Ledger(os.path.join(work_dir, "ledger.db"))
+    locators.stats = locators.LocatorStats(os.path.join(work_dir, "locators.json"))
+    tracing.TRACING = True
+    tracing.tracer = tracing.Tracer(trace_file=trace_file, metrics_file=None)
+    HTTP_ENDPOINTS.clear()
+    AllInOne.PREPARE_RENDITIONS = args.renditions
+    delays.DELAY_PROFILE = args.delay_profile
+
+    server = start_mock_sites(MockSites(platforms_config, seed=args.seed))
+    AllInOne.URL_OVERRIDES.clear()
+    AllInOne.URL_OVERRIDES.update(server.url_overrides)
+    try:
+        levels = [run_level(concurrency, args.platforms, args.rounds, os.path.abspath(args.video_path), work_dir)
+                  for concurrency in args.concurrency]
+        tracing.tracer.flush()
+        report = summarize(trace_file, levels)
+    finally:
+        server.shutdown()
+    print_report(report)
+    print(f"\nmock site counters: {json.dumps(server.sites.counters, sort_keys=True)}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({"levels": report, "mock": server.sites.counters}, file, indent=1)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
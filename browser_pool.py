@@ -0,0 +1,337 @@
+import os
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, /proc is used on Linux without it
+    psutil = None
+
+# Constants
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_USES = 20  # Recycle a browser after this many uploads
+DEFAULT_MAX_RSS_MB = 1500  # Recycle a browser once its process tree grows past this
+RESET_URL = "about:blank"
+
+logger = logging.getLogger(__name__)
+
+def _proc_children(pid):
+    """Return the child pids of a process using /proc (Linux only)."""
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    try:
+        for tid in os.listdir(task_dir):
+            with open(os.path.join(task_dir, tid, "children")) as file:
+                children.extend(int(child) for child in file.read().split())
+    except OSError:
+        pass
+    return children
+
+def _proc_rss_bytes(pid):
+    """Return the resident set size of a process using /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def browser_pids(driver):
+    """Return the pids of the Firefox process tree behind a driver."""
+    root = driver.capabilities.get("moz:processID")
+    if not root:
+        return []
+    if psutil:
+        try:
+            process = psutil.Process(root)
+            return [root] + [child.pid for child in process.children(recursive=True)]
+        except psutil.Error:
+            return []
+    pids, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(_proc_children(pid))
+    return pids
+
+def browser_rss_mb(driver):
+    """Return the combined RSS of the browser process tree in MB, or None if unknown."""
+    pids = browser_pids(driver)
+    if not pids:
+        return None
+    total = 0
+    for pid in pids:
+        if psutil:
+            try:
+                total += psutil.Process(pid).memory_info().rss
+            except psutil.Error:
+                pass
+        else:
+            total += _proc_rss_bytes(pid)
+    return total / (1024 * 1024) if total else None
+
+def _proc_cpu_seconds(pid):
+    """Return user + system CPU time of a process using /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            fields = file.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+def browser_cpu_seconds(driver):
+    """Return the CPU seconds used so far by the live browser processes, or None if unknown."""
+    pids = browser_pids(driver)
+    if not pids:
+        return None
+    total = 0.0
+    for pid in pids:
+        if psutil:
+            try:
+                times = psutil.Process(pid).cpu_times()
+                total += times.user + times.system
+            except psutil.Error:
+                pass
+        else:
+            total += _proc_cpu_seconds(pid)
+    return total
+
+class BrowserUsageMonitor:
+    """Sample the peak RSS and CPU time of a browser while a job runs on it."""
+
+    def __init__(self, driver, interval=1.0):
+        self.driver = driver
+        self.interval = interval
+        self.peak_rss_mb = None
+        self.cpu_seconds = None
+        self._cpu_start = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._cpu_start = browser_cpu_seconds(self.driver)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        cpu_end = browser_cpu_seconds(self.driver)
+        if self._cpu_start is not None and cpu_end is not None:
+            self.cpu_seconds = max(0.0, cpu_end - self._cpu_start)
+        return False
+
+    def _sample(self):
+        try:
+            rss = browser_rss_mb(self.driver)
+        except Exception:
+            return
+        if rss and (self.peak_rss_mb is None or rss > self.peak_rss_mb):
+            self.peak_rss_mb = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+class PooledBrowser:
+    """A pooled driver and the bookkeeping needed to decide when to recycle it."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created = time.monotonic()
+
+class BrowserPool:
+    """A fixed-size pool of long-lived Firefox drivers shared across uploads.
+
+    Browsers are created through ``factory`` and destroyed through ``destroy``
+    (``driver.quit()`` by default). Between jobs a browser is health-checked and
+    reset to a single blank tab; it is replaced once it has served ``max_uses``
+    uploads or its process tree exceeds ``max_rss_mb``.
+    """
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, max_uses=DEFAULT_MAX_USES,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB, destroy=None):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.destroy = destroy or (lambda driver: driver.quit())
+        self._idle = []  # Most recently returned last, so warm browsers are reused first
+        self._checked_out = {}
+        self._created = 0
+        # Guards the fields above; notified whenever a browser or a launch slot frees up
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def start(self):
+        """Pre-warm the pool by launching every browser up front, in parallel."""
+        threads = [threading.Thread(target=self._warm_one, daemon=True) for _ in range(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info(f"Browser pool warmed with {len(self._idle)} browsers")
+        return self
+
+    def _warm_one(self):
+        with self._cond:
+            if not self._reserve():
+                return
+        try:
+            entry = self._launch()
+        except Exception:
+            return
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify_all()
+
+    def _reserve(self):
+        """Claim a launch slot if the pool is not full; the caller holds the condition."""
+        if self._created >= self.size:
+            return False
+        self._created += 1
+        return True
+
+    def _launch(self):
+        """Launch a browser into a reserved slot; on failure the slot is released and the error raised."""
+        started = time.monotonic()
+        try:
+            driver = self.factory()
+            if not driver:
+                raise Exception("Browser factory returned no driver")
+        except Exception as e:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify_all()
+            logger.error(f"Failed to launch pooled browser: {e}")
+            raise
+        logger.info(f"Launched pooled browser in {time.monotonic() - started:.1f}s")
+        return PooledBrowser(driver)
+
+    def _discard(self, entry, reason):
+        logger.info(f"Recycling pooled browser after {entry.uses} uploads: {reason}")
+        try:
+            self.destroy(entry.driver)
+        except Exception as e:
+            logger.warning(f"Error closing pooled browser: {e}")
+        with self._cond:
+            self._created -= 1
+            self._cond.notify_all()
+
+    def is_healthy(self, driver):
+        """Return True if the browser still answers WebDriver commands."""
+        try:
+            driver.execute_script("return document.readyState")
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled browser failed health check: {e}")
+            return False
+
+    def reset(self, driver):
+        """Close extra tabs and park the browser on a blank page for the next job."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get(RESET_URL)
+
+    def _needs_recycle(self, entry):
+        if entry.uses >= self.max_uses:
+            return f"reached {self.max_uses} uploads"
+        rss = browser_rss_mb(entry.driver)
+        if rss and rss > self.max_rss_mb:
+            return f"RSS {rss:.0f} MB exceeds {self.max_rss_mb} MB"
+        return None
+
+    def checkout(self, timeout=None):
+        """Borrow a healthy browser, launching one if the pool is not yet full.
+
+        Waits for a browser to be checked in or a slot to free up, at most
+        timeout seconds (TimeoutError). If a launch fails while no browser is
+        checked out, nothing would ever be returned, so the error is raised.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        launch_failed = False
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise Exception("Browser pool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    # After a failed launch, wait for a checkin or discard instead of relaunching at once
+                    if not launch_failed and self._reserve():
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a pooled browser")
+                    self._cond.wait(remaining)
+                    launch_failed = False
+            if entry is None:
+                try:
+                    entry = self._launch()
+                except Exception as e:
+                    with self._cond:
+                        idle = not self._checked_out
+                    if idle:
+                        raise Exception(f"Could not launch a pooled browser: {e}") from e
+                    launch_failed = True
+                    continue
+            if not self.is_healthy(entry.driver):
+                self._discard(entry, "unhealthy")
+                continue
+            with self._cond:
+                self._checked_out[id(entry.driver)] = entry
+            return entry.driver
+
+    def checkin(self, driver, healthy=True):
+        """Return a borrowed browser, resetting or recycling it as needed."""
+        with self._cond:
+            entry = self._checked_out.pop(id(driver), None)
+        if entry is None:
+            logger.warning("Checked in a browser that does not belong to this pool")
+            return
+        entry.uses += 1
+        if self._closed or not healthy:
+            self._discard(entry, "pool closed" if self._closed else "marked unhealthy")
+            return
+        reason = self._needs_recycle(entry)
+        if reason:
+            self._discard(entry, reason)
+            return
+        try:
+            self.reset(driver)
+        except Exception as e:
+            self._discard(entry, f"reset failed: {e}")
+            return
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify_all()
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        """Context manager that checks a browser out and always checks it back in."""
+        driver = self.checkout(timeout)
+        healthy = True
+        try:
+            yield driver
+        except Exception:
+            healthy = self.is_healthy(driver)
+            raise
+        finally:
+            self.checkin(driver, healthy)
+
+    def close(self):
+        """Quit every idle browser; browsers still checked out are quit on checkin."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry, "pool closed")
@@ -0,0 +1,84 @@
+import os
+import contextvars
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from tracing import span
+
+# Deliberate pauses before actions, as (low, high) seconds drawn uniformly.
+#   fast:  no artificial delay
+#   human: jittered pauses like a person's, before clicks and typing
+PROFILES = {
+    "fast": {},
+    "human": {"click": (0.5, 1.0), "type": (0.2, 0.5)},
+}
+DELAY_PROFILE = os.environ.get("UPS_DELAY_PROFILE", "human")
+# Per-platform profile name or action ranges, e.g. from UPS_DELAY_OVERRIDES:
+#   {"x": "fast", "instagram": {"click": [1, 2]}}
+PLATFORM_DELAYS = json.loads(os.environ.get("UPS_DELAY_OVERRIDES") or "{}")
+DELAY_BUDGET = float(os.environ.get("UPS_DELAY_BUDGET", 60))  # Seconds of deliberate delay allowed per job
+
+logger = logging.getLogger(__name__)
+
+class DelayAccount:
+    """The deliberate delay one job has spent, against its budget."""
+
+    def __init__(self, budget=DELAY_BUDGET):
+        self.budget = budget
+        self.spent = 0.0
+        self.pauses = 0
+        self.skipped = 0
+
+_account = contextvars.ContextVar("ups_delay_account", default=None)
+
+def delay_range(action, platform=None):
+    """Return the (low, high) pause before the action on the platform under the current policy."""
+    ranges = PROFILES[DELAY_PROFILE]
+    override = PLATFORM_DELAYS.get(platform)
+    if isinstance(override, str):
+        ranges = PROFILES[override]
+    elif override:
+        ranges = dict(ranges, **{name: tuple(bounds) for name, bounds in override.items()})
+    return ranges.get(action, (0, 0))
+
+def pause(action, platform=None):
+    """Sleep for the policy's delay before an action; returns the seconds slept.
+
+    Inside a job (see delay_budget) the pause is skipped once it would take
+    the job over its budget.
+    """
+    low, high = delay_range(action, platform)
+    if high <= 0:
+        return 0.0
+    seconds = random.uniform(low, high)
+    account = _account.get()
+    if account and account.spent + seconds > account.budget:
+        if not account.skipped:
+            logger.info(f"[{platform}] Delay budget of {account.budget:.0f}s spent, skipping further pauses")
+        account.skipped += 1
+        return 0.0
+    with span("delay", action, platform):
+        time.sleep(seconds)
+    if account:
+        account.spent += seconds
+        account.pauses += 1
+    return seconds
+
+def start_delay_account(budget=DELAY_BUDGET):
+    """Charge the current context's pauses to a new account; returns it."""
+    account = DelayAccount(budget)
+    _account.set(account)
+    return account
+
+@contextmanager
+def delay_budget(budget=DELAY_BUDGET):
+    """Charge the pauses of the enclosed job to a new DelayAccount, which is yielded."""
+    account = DelayAccount(budget)
+    token = _account.set(account)
+    try:
+        yield account
+    finally:
+        _account.reset(token)
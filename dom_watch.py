@@ -0,0 +1,139 @@
+import logging
+import time
+from selenium.common.exceptions import (InvalidSessionIdException, NoSuchWindowException, TimeoutException,
+                                        WebDriverException)
+from tracing import span
+
+# How long a single async script call may block before it is re-armed.
+# Keeps each WebDriver round trip well inside the driver's HTTP timeout.
+SLICE_SECONDS = 30
+DEFAULT_SCRIPT_TIMEOUT = 30  # WebDriver's default, restored when the driver cannot report its own
+
+logger = logging.getLogger(__name__)
+
+# Resolves with the first node matching the text or selector, checking the
+# current DOM first and then every mutation, so nothing is serialized across
+# the wire until a match is found.
+WATCH_SCRIPT = """
+const [text, css, xpath, timeoutMs, done] = arguments;
+
+function describe(node) {
+    const el = node.nodeType === Node.ELEMENT_NODE ? node : node.parentElement;
+    if (!el) { return null; }
+    const link = el.closest('a[href]');
+    return {
+        tag: el.tagName.toLowerCase(),
+        text: (el.innerText || el.textContent || '').trim().slice(0, 500),
+        href: el.getAttribute('href') || (link ? link.href : null),
+        id: el.id || null,
+        ariaLabel: el.getAttribute('aria-label'),
+        url: location.href,
+    };
+}
+
+function findMatch() {
+    if (css) {
+        const el = document.querySelector(css);
+        if (el) { return el; }
+    }
+    if (xpath) {
+        const el = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        if (el) { return el; }
+    }
+    if (text && document.body && document.body.textContent.includes(text)) {
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+        let node;
+        while ((node = walker.nextNode())) {
+            if (node.nodeValue.includes(text)) { return node; }
+        }
+        return document.body;
+    }
+    return null;
+}
+
+const first = findMatch();
+if (first) { done(describe(first)); return; }
+
+let settled = false;
+let scheduled = false;
+const observer = new MutationObserver(() => {
+    if (settled || scheduled) { return; }
+    scheduled = true;
+    queueMicrotask(() => {
+        scheduled = false;
+        const match = findMatch();
+        if (match) { finish(describe(match)); }
+    });
+});
+const timer = setTimeout(() => finish(null), timeoutMs);
+function finish(value) {
+    if (settled) { return; }
+    settled = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done(value);
+}
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true, attributes: !!css || !!xpath});
+"""
+
+def wait_for(driver, text=None, css=None, xpath=None, timeout=120, name=None):
+    """Wait in the page for a node containing text or matching a selector.
+
+    A MutationObserver is installed through an async script so the browser
+    does the watching; returns a dict describing the matched node (tag, text,
+    href, id, ariaLabel, url). Navigations simply re-arm the watcher.
+    Raises TimeoutException if nothing matched within timeout seconds.
+    name is the logical element waited for (e.g. "success"), used as the
+    span name so selectors never end up in metric labels.
+    """
+    if not (text or css or xpath):
+        raise ValueError("wait_for needs text, css or xpath")
+    target = text or css or xpath
+    with span("wait", name or ("text" if text else "selector")):
+        return _watch(driver, text, css, xpath, target, timeout)
+
+def _watch(driver, text, css, xpath, target, timeout):
+    try:
+        previous = driver.timeouts.script
+    except (AttributeError, WebDriverException):
+        previous = DEFAULT_SCRIPT_TIMEOUT
+    try:
+        return _watch_slices(driver, text, css, xpath, target, timeout)
+    finally:
+        try:
+            driver.set_script_timeout(previous)
+        except WebDriverException:
+            pass  # The session is gone; nothing left to restore
+
+def _watch_slices(driver, text, css, xpath, target, timeout):
+    started = time.monotonic()
+    deadline = started + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutException(f"Timed out after {timeout}s waiting for {target!r}")
+        slice_seconds = min(remaining, SLICE_SECONDS)
+        driver.set_script_timeout(slice_seconds + 5)
+        try:
+            match = driver.execute_async_script(WATCH_SCRIPT, text, css, xpath, int(slice_seconds * 1000))
+        except TimeoutException:
+            match = None
+        except (InvalidSessionIdException, NoSuchWindowException):
+            # The browser or its window is gone; no new document will come
+            raise
+        except WebDriverException as e:
+            # The document was replaced mid-wait (navigation); watch the new one
+            logger.debug(f"Re-arming DOM watch for {target!r}: {e}")
+            time.sleep(0.25)
+            continue
+        if match:
+            logger.info(f"Matched {target!r} after {time.monotonic() - started:.1f}s")
+            return match
+
+def wait_for_text(driver, text, timeout=120, name=None):
+    """Wait for text to appear anywhere in the page."""
+    return wait_for(driver, text=text, timeout=timeout, name=name)
+
+def wait_for_selector(driver, css=None, xpath=None, timeout=120, name=None):
+    """Wait for an element matching a CSS selector or XPath to appear."""
+    return wait_for(driver, css=css, xpath=xpath, timeout=timeout, name=name)
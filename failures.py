@@ -0,0 +1,215 @@
+import os
+import json
+import logging
+import re
+import threading
+import time
+
+# Constants
+TRANSIENT, LOGIN_EXPIRED, PERMANENT = "transient", "login_expired", "permanent"
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Pages each platform sends a browser without a valid session to
+LOGIN_PAGES = {
+    "youtube": r"accounts\.google\.com|/ServiceLogin",
+    "tiktok": r"tiktok\.com/login",
+    "instagram": r"instagram\.com/accounts/login",
+    "x": r"(twitter|x)\.com/(i/flow/)?login",
+    "linkedin": r"linkedin\.com/(login|uas/login|authwall|checkpoint)",
+    "snapchat": r"accounts\.snapchat\.com",
+}
+
+# Consecutive failures of a kind that open a circuit, and how long it then
+# stays open before a single probe upload is let through (half-open). Each
+# failed probe doubles the wait, up to MAX_OPEN_SECONDS. A login-expired
+# failure only opens the account's circuit, since it says nothing about
+# the platform. Override with UPS_BREAKER, e.g. {"thresholds": {"transient": 6}}.
+FAILURE_THRESHOLDS = {TRANSIENT: 4, LOGIN_EXPIRED: 1, PERMANENT: 2}
+OPEN_SECONDS = {TRANSIENT: 120, LOGIN_EXPIRED: 900, PERMANENT: 1800}
+MAX_OPEN_SECONDS = 4 * 3600
+_overrides = json.loads(os.environ.get("UPS_BREAKER") or "{}")
+FAILURE_THRESHOLDS.update(_overrides.get("thresholds", {}))
+OPEN_SECONDS.update(_overrides.get("open_seconds", {}))
+# Lookups of an element in a row that must find nothing before its locators
+# count as broken; a single miss is as likely a page that was still loading
+LOCATOR_MISS_STREAK = int(_overrides.get("locator_miss_streak", 2))
+
+logger = logging.getLogger(__name__)
+
+def on_login_page(platform, url):
+    """Return True if the URL is one of the platform's sign-in pages."""
+    return bool(url and re.search(LOGIN_PAGES.get(platform, r"(?!)"), url))
+
+def classify(platform, error, driver=None):
+    """Return the kind of an upload failure: TRANSIENT, LOGIN_EXPIRED or PERMANENT.
+
+    A browser left on the platform's sign-in page means the session expired.
+    Otherwise an upload the server refused is permanent, and so is an
+    element none of whose locators matched in LOCATOR_MISS_STREAK lookups
+    in a row (e.g. again on the resume after a transient first miss, or in
+    the previous run too): retrying the same flow will not help until the
+    locators or the video change. A single missed element, timeouts on
+    other waits, stale elements, browser errors and anything unrecognised
+    are transient.
+    """
+    from selenium.common.exceptions import WebDriverException
+    from http_upload import UploadRejected
+    from locators import LocatorMissing
+    from steps import StepFailed
+
+    if driver is not None:
+        try:
+            url = driver.current_url
+        except WebDriverException:
+            url = None
+        if on_login_page(platform, url):
+            return LOGIN_EXPIRED
+    cause = error.cause if isinstance(error, StepFailed) else error
+    if isinstance(cause, UploadRejected):
+        return PERMANENT
+    if isinstance(cause, LocatorMissing) and cause.streak >= LOCATOR_MISS_STREAK:
+        return PERMANENT
+    return TRANSIENT
+
+class CircuitBreaker:
+    """Failure state of one platform, or one account on a platform.
+
+    Not thread-safe on its own; Breakers only touches it under its lock.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.failures = dict.fromkeys(FAILURE_THRESHOLDS, 0)
+        self.kind = None  # Failure kind that opened the circuit
+        self.opened_at = None
+        self.open_for = 0
+        self.probing = False
+
+    def retry_in(self, now):
+        """Seconds until the circuit lets a probe through; 0 if it would now."""
+        if self.state == CLOSED or (self.state == HALF_OPEN and not self.probing):
+            return 0.0
+        if self.state == HALF_OPEN:
+            return None  # Until the running probe finishes
+        return max(0.0, self.opened_at + self.open_for - now)
+
+    def acquire(self, now):
+        """Return True if an upload may run; past its wait an open circuit lets one probe through."""
+        if self.state == OPEN and now >= self.opened_at + self.open_for:
+            self.state = HALF_OPEN
+            self.probing = False
+            logger.info(f"[{self.name}] Circuit half-open, probing with the next upload")
+        if self.state == HALF_OPEN:
+            if self.probing:
+                return False
+            self.probing = True
+        return self.state != OPEN
+
+    def release(self):
+        """Give back a probe that ended without telling anything about the platform."""
+        self.probing = False
+
+    def success(self):
+        if self.state != CLOSED:
+            logger.info(f"[{self.name}] Circuit closed after a successful upload")
+        self.state = CLOSED
+        self.failures = dict.fromkeys(FAILURE_THRESHOLDS, 0)
+        self.kind = None
+        self.open_for = 0
+        self.probing = False
+
+    def failure(self, kind, now):
+        if self.state == HALF_OPEN:
+            self._open(kind, now, min(MAX_OPEN_SECONDS, max(self.open_for * 2, OPEN_SECONDS[kind])))
+            return
+        self.failures[kind] += 1
+        if self.state == CLOSED and self.failures[kind] >= FAILURE_THRESHOLDS[kind]:
+            self._open(kind, now, OPEN_SECONDS[kind])
+
+    def _open(self, kind, now, seconds):
+        self.state = OPEN
+        self.kind = kind
+        self.opened_at = now
+        self.open_for = seconds
+        self.probing = False
+        logger.warning(f"[{self.name}] Circuit open for {seconds:.0f}s after {kind} failure(s)")
+
+class Breakers:
+    """Circuit breakers for each platform and each account on a platform.
+
+    acquire() before an upload and record() its outcome after; while either
+    circuit of a job is open, acquire() fast-fails it instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def _get(self, platform, account=None):
+        key = (platform, account)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(platform if account is None else f"{platform}/{account}")
+        return self._breakers[key]
+
+    def blocked(self, platform, account):
+        """Return why uploads to the platform as the account would be refused now, or None."""
+        now = time.monotonic()
+        with self._lock:
+            for breaker in (self._get(platform), self._get(platform, account)):
+                wait = breaker.retry_in(now)
+                if wait is None:
+                    return f"{breaker.name} is being probed"
+                if wait > 0:
+                    return f"{breaker.name} is open after {breaker.kind} failures, retry in {wait:.0f}s"
+        return None
+
+    def acquire(self, platform, account):
+        """Claim the right to upload; returns None, or the reason the job is refused."""
+        reason = self.blocked(platform, account)
+        if reason:
+            return reason
+        now = time.monotonic()
+        with self._lock:
+            breakers = (self._get(platform), self._get(platform, account))
+            granted = []
+            for breaker in breakers:
+                if not breaker.acquire(now):
+                    for held in granted:
+                        held.release()
+                    return f"{breaker.name} is being probed"
+                granted.append(breaker)
+        return None
+
+    def record(self, platform, account, failure=None):
+        """Record the outcome of an acquired upload: None for success, else its failure kind."""
+        now = time.monotonic()
+        with self._lock:
+            platform_breaker, account_breaker = self._get(platform), self._get(platform, account)
+            if failure is None:
+                platform_breaker.success()
+                account_breaker.success()
+                return
+            account_breaker.failure(failure, now)
+            if failure == LOGIN_EXPIRED:
+                platform_breaker.release()
+            else:
+                platform_breaker.failure(failure, now)
+
+    def release(self, platform, account):
+        """End an acquired upload that never reached the platform."""
+        with self._lock:
+            self._get(platform).release()
+            self._get(platform, account).release()
+
+    def reset(self):
+        """Forget every circuit, closing them all."""
+        with self._lock:
+            self._breakers.clear()
+
+    def states(self):
+        """Return {name: state} of every circuit that is not closed."""
+        with self._lock:
+            return {breaker.name: breaker.state for breaker in self._breakers.values() if breaker.state != CLOSED}
+
+breakers = Breakers()
@@ -0,0 +1,285 @@
+import os
+import argparse
+import hashlib
+import http.client
+import json
+import logging
+import mimetypes
+import sqlite3
+import tempfile
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from profiles import PLATFORM_DOMAINS, copy_sqlite
+from tracing import span
+
+# Constants
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024  # Multiple of 256 KiB, as resumable-upload servers expect
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+MAX_CONNECTIONS_PER_HOST = 4
+REQUEST_TIMEOUT = 60
+
+# Platforms with a resumable-upload endpoint, e.g. from a JSON file given in UPS_HTTP_ENDPOINTS:
+#   {"youtube": {"init_url": "http://127.0.0.1:8765/upload/init"}}
+# The server answers the finished upload with JSON whose "form_url" is the
+# page where the Selenium flow fills in the metadata form.
+HTTP_ENDPOINTS = {}
+
+logger = logging.getLogger(__name__)
+
+def load_endpoints(path):
+    """Return the endpoints in a JSON file; an unreadable file leaves every platform on the browser."""
+    try:
+        with open(path, 'r', encoding='utf-8') as endpoints_file:
+            return dict(json.load(endpoints_file))
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Ignoring HTTP upload endpoints in {path}: {e}")
+        return {}
+
+if os.environ.get("UPS_HTTP_ENDPOINTS"):
+    HTTP_ENDPOINTS.update(load_endpoints(os.environ["UPS_HTTP_ENDPOINTS"]))
+
+class UploadError(Exception):
+    """Raised when a resumable upload cannot be completed."""
+
+class UploadRejected(UploadError):
+    """Raised when the server refuses the upload; retrying will not help."""
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections reused across requests, per host."""
+
+    def __init__(self, max_per_host=MAX_CONNECTIONS_PER_HOST, timeout=REQUEST_TIMEOUT):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _get(self, scheme, netloc):
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return connection_class(netloc, timeout=self.timeout)
+
+    def _put(self, scheme, netloc, connection):
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(self, method, url, body=None, headers=None):
+        """Send a request and return (status, lower-cased headers, body bytes)."""
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        connection = self._get(parts.scheme, parts.netloc)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            raise
+        response_headers = {name.lower(): value for name, value in response.getheaders()}
+        if response.will_close:
+            connection.close()
+        else:
+            self._put(parts.scheme, parts.netloc, connection)
+        return response.status, response_headers, data
+
+    def close(self):
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+def load_profile_cookies(profile_path, platform):
+    """Return {name: value} of the platform's unexpired cookies stored in a Firefox profile."""
+    domains = PLATFORM_DOMAINS[platform]
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, "cookies.sqlite")
+        copy_sqlite(os.path.join(profile_path, "cookies.sqlite"), copy)
+        with sqlite3.connect(copy) as conn:
+            rows = conn.execute("SELECT host, name, value, expiry FROM moz_cookies").fetchall()
+    now = time.time()
+    cookies = {}
+    for host, name, value, expiry in rows:
+        # Older Firefox versions store expiry in seconds, newer ones in milliseconds
+        if expiry and (expiry / 1000 if expiry > 10 ** 11 else expiry) <= now:
+            continue
+        host = host.lstrip(".")
+        if any(host == domain or host.endswith("." + domain) for domain in domains):
+            cookies[name] = value
+    return cookies
+
+def _received_until(range_header):
+    """Parse a "Range: bytes=0-N" response header into the next offset to send."""
+    if not range_header:
+        return 0
+    return int(range_header.split("=", 1)[1].split("-", 1)[1]) + 1
+
+class ResumableUploader:
+    """Upload a file in chunks over the resumable-upload protocol.
+
+    1. POST the init URL with X-Upload-Content-Length/-Type; the Location
+       header of the answer is the upload session URL.
+    2. PUT chunks with "Content-Range: bytes start-end/total". The server
+       answers 308 with "Range: bytes=0-N" until the last chunk, then 200/201.
+    3. After an error, PUT "Content-Range: bytes */total" with no body to ask
+       how much the server has and continue from there.
+    The session URL can be kept in a state file, so a restarted process
+    resumes the same session instead of sending the file again.
+    """
+
+    def __init__(self, pool=None, chunk_size=DEFAULT_CHUNK_SIZE, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, cookies=None, headers=None):
+        self.pool = pool or ConnectionPool()
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.headers = dict(headers or {})
+        if cookies:
+            self.headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+    def _request(self, method, url, body=None, headers=None):
+        return self.pool.request(method, url, body=body, headers=dict(self.headers, **(headers or {})))
+
+    def start(self, init_url, path, metadata=None):
+        """Open an upload session and return its URL."""
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        body = json.dumps(metadata or {"name": os.path.basename(path)}).encode()
+        status, headers, data = self._request("POST", init_url, body, {
+            "Content-Type": "application/json; charset=UTF-8",
+            "X-Upload-Content-Length": str(os.path.getsize(path)),
+            "X-Upload-Content-Type": content_type,
+        })
+        if status not in (200, 201) or "location" not in headers:
+            raise UploadError(f"Could not start upload session ({status}): {data[:200]!r}")
+        return urljoin(init_url, headers["location"])
+
+    def query(self, session_url, total):
+        """Ask the server how far the session got; returns (next offset, final response or None)."""
+        status, headers, data = self._request("PUT", session_url, b"", {"Content-Range": f"bytes */{total}"})
+        if status in (200, 201):
+            return total, json.loads(data or b"{}")
+        if status == 308:
+            return _received_until(headers.get("range")), None
+        if status in (404, 410):
+            raise UploadError(f"Upload session expired ({status})")
+        raise UploadError(f"Unexpected status {status} while querying upload session")
+
+    def _load_state(self, state_path, path):
+        try:
+            with open(state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(path)
+        if state.get("size") != stat.st_size or state.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        return state.get("session_url")
+
+    def _save_state(self, state_path, path, session_url):
+        stat = os.stat(path)
+        with open(state_path, 'w', encoding='utf-8') as file:
+            json.dump({"session_url": session_url, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, file)
+
+    def upload(self, init_url, path, metadata=None, state_path=None):
+        """Upload the whole file, resuming after errors; returns the server's final JSON."""
+        total = os.path.getsize(path)
+        started = time.monotonic()
+        session_url = self._load_state(state_path, path) if state_path else None
+        offset, result = 0, None
+        if session_url:
+            try:
+                offset, result = self.query(session_url, total)
+                logger.info(f"Resuming upload session at byte {offset} of {total}")
+            except (UploadError, OSError, http.client.HTTPException) as e:
+                logger.warning(f"Could not resume saved upload session, starting over: {e}")
+                session_url = None
+        if not session_url:
+            session_url = self.start(init_url, path, metadata)
+            if state_path:
+                self._save_state(state_path, path, session_url)
+
+        failures = 0
+        with open(path, 'rb') as file:
+            while result is None:
+                try:
+                    if failures:
+                        offset, result = self.query(session_url, total)
+                        if result is not None:
+                            break
+                    file.seek(offset)
+                    chunk = file.read(self.chunk_size)
+                    end = offset + len(chunk) - 1
+                    status, headers, data = self._request("PUT", session_url, chunk, {
+                        "Content-Length": str(len(chunk)),
+                        "Content-Range": f"bytes {offset}-{end}/{total}",
+                    })
+                    if status in (200, 201):
+                        result = json.loads(data or b"{}")
+                    elif status == 308:
+                        offset = _received_until(headers.get("range"))
+                        failures = 0
+                    elif status >= 500 or status == 429:
+                        raise UploadError(f"Server error {status}")
+                    else:
+                        raise UploadRejected(f"Upload rejected ({status}): {data[:200]!r}")
+                except UploadRejected:
+                    raise
+                except (OSError, http.client.HTTPException, UploadError) as e:
+                    failures += 1
+                    if failures > self.max_retries:
+                        raise UploadError(f"Giving up after {self.max_retries} retries: {e}") from e
+                    delay = self.backoff * 2 ** (failures - 1)
+                    logger.warning(f"Chunk at byte {offset} failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+
+        if state_path and os.path.exists(state_path):
+            os.remove(state_path)
+        elapsed = time.monotonic() - started
+        logger.info(f"Uploaded {total / (1024 * 1024):.1f} MB in {elapsed:.1f}s over HTTP")
+        return result
+
+def upload_for_platform(platform, video_path, cookies, pool=None, account=None):
+    """Push a video to the platform's configured endpoint and return the server's JSON.
+
+    The upload session is kept in a state file per platform, account and
+    source file, so an interrupted upload resumes its own session only.
+    """
+    endpoint = HTTP_ENDPOINTS[platform]
+    uploader = ResumableUploader(
+        pool=pool,
+        chunk_size=endpoint.get("chunk_size", DEFAULT_CHUNK_SIZE),
+        cookies=cookies,
+    )
+    key = hashlib.sha256(f"{platform}\0{account or ''}\0{os.path.abspath(video_path)}".encode()).hexdigest()[:16]
+    state_path = os.path.join(tempfile.gettempdir(), f"ups-{platform}-{key}.upload.json")
+    with span("http_upload", platform=platform, bytes=os.path.getsize(video_path)):
+        return uploader.upload(endpoint["init_url"], video_path, state_path=state_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload a file over the resumable-upload protocol")
+    parser.add_argument("init_url")
+    parser.add_argument("video_path")
+    parser.add_argument("--profile", help="Firefox profile to take session cookies from")
+    parser.add_argument("--platform", choices=sorted(PLATFORM_DOMAINS), help="Platform whose cookies to send")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    cookies = load_profile_cookies(args.profile, args.platform) if args.profile and args.platform else None
+    uploader = ResumableUploader(chunk_size=args.chunk_size, cookies=cookies)
+    result = uploader.upload(args.init_url, args.video_path)
+    logger.info(f"Upload result: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,399 @@
+import os
+import argparse
+import logging
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, os.kill is used on POSIX without it
+    psutil = None
+
+from failures import PERMANENT
+from ledger import DEFAULT_ACCOUNT
+from metadata import load_metadata
+from tracing import span
+
+# Constants
+DB_PATH = os.environ.get("UPS_QUEUE_DB", "ups_jobs.db")
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60  # Seconds before a failed job with attempts left can be claimed again
+# Seconds after which a running job is presumed abandoned even if its owner
+# cannot be checked, e.g. because it ran on another host
+RUNNING_LEASE = float(os.environ.get("UPS_QUEUE_LEASE", 2 * 3600))
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_path TEXT NOT NULL,
+    metadata_path TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    account TEXT NOT NULL DEFAULT 'default',
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_url TEXT,
+    last_error TEXT,
+    owner TEXT,
+    not_before REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (video_path, platform, account)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+"""
+
+# Queues created before jobs had an account are rebuilt with the new
+# uniqueness constraint; their jobs belong to the default account.
+MIGRATE_ACCOUNTS = """
+INSERT INTO jobs (id, video_path, metadata_path, platform, account, state, attempts, result_url, last_error,
+                  created_at, updated_at)
+    SELECT id, video_path, metadata_path, platform, ?, state, attempts, result_url, last_error, created_at, updated_at
+    FROM jobs_old
+"""
+
+logger = logging.getLogger(__name__)
+
+def _owner():
+    """Identify the running process as host:pid, the owner of the jobs it claims."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _owner_alive(owner):
+    """Return whether the process that claimed a job still runs; None when that cannot be told."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    pid = int(pid)
+    if pid == os.getpid():
+        return True
+    if psutil:
+        return psutil.pid_exists(pid)
+    if os.name != "posix":
+        return None  # os.kill would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobQueue:
+    """A durable queue with one row per video x platform x account, stored in SQLite."""
+
+    def __init__(self, path=DB_PATH, max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if columns and "account" not in columns:
+            self._migrate()
+        self._conn.executescript(SCHEMA)
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        if "not_before" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+
+    def _migrate(self):
+        # The old index moves with the renamed table and is dropped with it; __init__ recreates it
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("ALTER TABLE jobs RENAME TO jobs_old")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._conn.execute(MIGRATE_ACCOUNTS, (DEFAULT_ACCOUNT,))
+            self._conn.execute("DROP TABLE jobs_old")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Migrated {self.path} to per-account jobs")
+
+    def close(self):
+        self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def enqueue(self, video_path, metadata_path, platforms, account=DEFAULT_ACCOUNT, priority=0):
+        """Add one pending job per platform; jobs that already exist are left alone."""
+        now = time.time()
+        video_path = os.path.abspath(video_path)
+        metadata_path = os.path.abspath(metadata_path)
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for platform in platforms:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO jobs (video_path, metadata_path, platform, account, priority, "
+                        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (video_path, metadata_path, platform, account, priority, now, now),
+                    )
+                    added += cursor.rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Queued {added} new job(s) for {video_path}")
+        return added
+
+    def recover(self, lease=RUNNING_LEASE):
+        """Return jobs left running by a dead process to pending so they resume.
+
+        A running job is recovered when the process that claimed it on this
+        host has exited, or when it has not been updated for lease seconds;
+        jobs of live processes, such as another worker draining the same
+        queue, are left alone.
+        """
+        now = time.time()
+        recovered = 0
+        rows = self._execute("SELECT id, owner, updated_at FROM jobs WHERE state = ?", (RUNNING,)).fetchall()
+        for row in rows:
+            if _owner_alive(row["owner"]) is False or row["updated_at"] < now - lease:
+                # Guarded by the old owner and timestamp, in case the job moved on meanwhile
+                cursor = self._execute(
+                    "UPDATE jobs SET state = ?, owner = NULL, updated_at = ? "
+                    "WHERE id = ? AND state = ? AND owner IS ? AND updated_at = ?",
+                    (PENDING, now, row["id"], RUNNING, row["owner"], row["updated_at"]),
+                )
+                recovered += cursor.rowcount
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted job(s)")
+        return recovered
+
+    def _pending(self, columns, platforms, exclude):
+        sql = f"SELECT {columns} FROM jobs WHERE state = ?"
+        params = [PENDING]
+        if platforms:
+            sql += f" AND platform IN ({', '.join('?' for _ in platforms)})"
+            params.extend(platforms)
+        for platform, account in exclude:
+            sql += " AND NOT (platform = ? AND account = ?)"
+            params.extend((platform, account))
+        return sql, params
+
+    def claim(self, platforms=None, exclude=()):
+        """Atomically mark the most urgent, then oldest, pending job as running and return it, or None.
+
+        Jobs of the (platform, account) pairs in exclude are passed over, and
+        so are failed jobs whose retry delay has not passed yet.
+        """
+        sql, params = self._pending("*", platforms, exclude)
+        sql += " AND (not_before IS NULL OR not_before <= ?) ORDER BY priority DESC, id LIMIT 1"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(sql, params + [time.time()]).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = ?, attempts = attempts + 1, owner = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, _owner(), time.time(), row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        job = dict(row)
+        job["state"] = RUNNING
+        job["attempts"] += 1
+        job["owner"] = _owner()
+        return job
+
+    def retry_wait(self, platforms=None, exclude=()):
+        """Return the seconds until the next delayed retry claim would take, or None if there is none."""
+        sql, params = self._pending("MIN(not_before) AS due", platforms, exclude)
+        row = self._execute(sql + " AND not_before > ?", params + [time.time()]).fetchone()
+        return None if row["due"] is None else max(0.0, row["due"] - time.time())
+
+    def start(self, job_id):
+        """Mark a pending job picked by the caller (rather than by claim) as running; returns it."""
+        self._execute(
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, owner = ?, updated_at = ? WHERE id = ? AND state = ?",
+            (RUNNING, _owner(), time.time(), job_id, PENDING),
+        )
+        return self.get(job_id)
+
+    def complete(self, job_id, result_url=None):
+        """Mark a job done and store the URL of the published post."""
+        self._execute(
+            "UPDATE jobs SET state = ?, result_url = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+            (DONE, result_url, time.time(), job_id),
+        )
+
+    def fail(self, job_id, error, permanent=False, delay=None):
+        """Record a failed attempt; the job goes back to pending until it runs out of attempts.
+
+        A job that goes back to pending is not claimed again for delay
+        seconds, the queue's retry_delay by default. Permanent failures (e.g. a video the platform would never
+        accept) fail the job at once.
+        """
+        max_attempts = 0 if permanent else self.max_attempts
+        delay = self.retry_delay if delay is None else delay
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "last_error = ?, not_before = ?, updated_at = ? WHERE id = ?",
+            (max_attempts, FAILED, PENDING, str(error), now + delay, now, job_id),
+        )
+
+    def defer(self, job_id, reason):
+        """Put a claimed job back to pending without counting the attempt, e.g. while its circuit is open."""
+        self._execute(
+            "UPDATE jobs SET state = ?, attempts = attempts - 1, last_error = ?, updated_at = ? WHERE id = ?",
+            (PENDING, str(reason), time.time(), job_id),
+        )
+
+    def retry_failed(self):
+        """Move failed jobs back to pending with a fresh attempt count."""
+        cursor = self._execute(
+            "UPDATE jobs SET state = ?, attempts = 0, not_before = NULL, updated_at = ? WHERE state = ?",
+            (PENDING, time.time(), FAILED),
+        )
+        return cursor.rowcount
+
+    def get(self, job_id):
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, video_path, account=DEFAULT_ACCOUNT):
+        """Return the jobs of a video for the account, one per platform."""
+        rows = self._execute("SELECT * FROM jobs WHERE video_path = ? AND account = ? ORDER BY id",
+                             (os.path.abspath(video_path), account)).fetchall()
+        return [dict(row) for row in rows]
+
+    def jobs(self, state=None):
+        if state:
+            rows = self._execute("SELECT * FROM jobs WHERE state = ? ORDER BY id", (state,)).fetchall()
+        else:
+            rows = self._execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self):
+        rows = self._execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+def run_job(job, pool=None):
+    """Execute one queued job with the AllInOne uploaders and return its result record."""
+    import AllInOne
+
+    metadata = load_metadata(job["metadata_path"])
+    return AllInOne.run_platform_upload(job["platform"], job["video_path"], metadata, pool=pool,
+                                        account=job["account"])
+
+def drain(job_queue, executor=run_job, max_workers=1, platforms=None, pool=None):
+    """Run jobs until the queue has nothing pending left; returns the number processed.
+
+    ``executor(job, pool)`` must return a dict with ``ok``, ``result`` and
+    ``error`` keys, like AllInOne.run_platform_upload. Permanent failures
+    fail the job at once. A job refused by an open circuit breaker, or held
+    back because its account is signed out, stays pending, and no more jobs
+    of its platform and account are claimed during this drain. Failed jobs
+    with attempts left are waited for and retried once their delay passes.
+    """
+    job_queue.recover()
+    processed = 0
+    processed_lock = threading.Lock()
+    blocked = set()
+
+    def worker():
+        nonlocal processed
+        while True:
+            with processed_lock:
+                exclude = sorted(blocked)
+            job = job_queue.claim(platforms, exclude)
+            if not job:
+                wait = job_queue.retry_wait(platforms, exclude)
+                if wait is None:
+                    return
+                time.sleep(wait)
+                continue
+            logger.info(f"[{job['platform']}] Job {job['id']} attempt {job['attempts']}: {job['video_path']}")
+            with span("job", platform=job["platform"], job_id=job["id"], attempt=job["attempts"]) as trace:
+                try:
+                    result = executor(job, pool)
+                except Exception as e:
+                    result = {"ok": False, "result": None, "error": str(e)}
+                trace.set(ok=result["ok"])
+            if result["ok"]:
+                url = result["result"] if isinstance(result["result"], str) else None
+                job_queue.complete(job["id"], url)
+                logger.info(f"[{job['platform']}] Job {job['id']} done {url or ''}")
+            elif result.get("blocked"):
+                job_queue.defer(job["id"], result["error"])
+                logger.warning(f"[{job['platform']}] Job {job['id']} deferred: {result['error']}")
+                with processed_lock:
+                    blocked.add((job["platform"], job["account"]))
+                continue
+            else:
+                permanent = result.get("rejected", False) or result.get("failure") == PERMANENT
+                job_queue.fail(job["id"], result.get("error") or "upload failed", permanent)
+                logger.warning(f"[{job['platform']}] Job {job['id']} failed: {result.get('error')}")
+            with processed_lock:
+                processed += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="queue") as threads:
+        for _ in range(max_workers):
+            threads.submit(worker)
+    logger.info(f"Queue drained after {processed} job(s): {job_queue.counts()}")
+    return processed
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent upload job queue")
+    parser.add_argument("--db", default=DB_PATH, help="Path of the SQLite queue database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Queue a video for one or more platforms")
+    add.add_argument("video_path")
+    add.add_argument("metadata_path")
+    add.add_argument("--platforms", nargs="+", help="Defaults to every AllInOne platform")
+    add.add_argument("--account", default=DEFAULT_ACCOUNT)
+    add.add_argument("--priority", type=int, default=0, help="Higher runs first")
+
+    work = commands.add_parser("work", help="Drain the queue, resuming unfinished jobs")
+    work.add_argument("--workers", type=int, default=1)
+    work.add_argument("--platforms", nargs="+")
+
+    commands.add_parser("status", help="Show job counts and failed jobs")
+    commands.add_parser("retry", help="Requeue failed jobs")
+
+    args = parser.parse_args()
+    job_queue = JobQueue(args.db)
+    try:
+        if args.command == "add":
+            if not args.platforms:
+                import AllInOne
+                args.platforms = list(AllInOne.PLATFORM_UPLOADERS)
+            job_queue.enqueue(args.video_path, args.metadata_path, args.platforms, args.account, args.priority)
+        elif args.command == "work":
+            import AllInOne
+            pool = AllInOne.create_browser_pool(size=args.workers).start()
+            try:
+                drain(job_queue, max_workers=args.workers, platforms=args.platforms, pool=pool)
+            finally:
+                pool.close()
+        elif args.command == "status":
+            logger.info(f"Jobs: {job_queue.counts()}")
+            for job in job_queue.jobs(FAILED):
+                logger.info(f"  #{job['id']} {job['platform']} {job['account']} {job['video_path']}: {job['last_error']}")
+        elif args.command == "retry":
+            logger.info(f"Requeued {job_queue.retry_failed()} failed job(s)")
+    finally:
+        job_queue.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,187 @@
+import os
+import glob
+import json
+import logging
+import shutil
+import threading
+import time
+from selenium import webdriver
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.firefox.service import Service
+from selenium.common.exceptions import WebDriverException
+from tracing import span
+
+# Constants
+GECKODRIVER_NAME = "geckodriver.exe" if os.name == "nt" else "geckodriver"
+MANIFEST_PATH = os.environ.get(
+    "UPS_DRIVER_MANIFEST", os.path.join(os.path.expanduser("~"), ".cache", "ups", "geckodriver.json")
+)
+# Resolution never touches the network unless UPS_DRIVER_DOWNLOAD=1 allows
+# webdriver_manager to download a driver when none is found locally
+DRIVER_DOWNLOAD = os.environ.get("UPS_DRIVER_DOWNLOAD", "0") not in ("", "0")
+# "desktop" launches a normal headed Firefox, "worker" a lean headless one for worker nodes
+LAUNCH_MODE = os.environ.get("UPS_LAUNCH_MODE", "desktop")
+# Open a WebDriver BiDi connection alongside the session, used to read network responses
+BIDI = os.environ.get("UPS_BIDI", "1") != "0"
+
+# Preferences applied in worker mode
+WORKER_PREFS = {
+    # No media autoplay
+    "media.autoplay.default": 5,
+    "media.autoplay.blocking_policy": 2,
+    # No telemetry, studies or health reports
+    "toolkit.telemetry.enabled": False,
+    "toolkit.telemetry.unified": False,
+    "toolkit.telemetry.archive.enabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "app.normandy.enabled": False,
+    "app.shield.optoutstudies.enabled": False,
+    "browser.ping-centre.telemetry": False,
+    # No browser, add-on or search engine updates
+    "app.update.auto": False,
+    "app.update.enabled": False,
+    "extensions.update.enabled": False,
+    "browser.search.update": False,
+    # Capped caches and session history
+    "browser.cache.disk.enable": False,
+    "browser.cache.memory.capacity": 65536,
+    "browser.sessionhistory.max_entries": 5,
+    "browser.sessionstore.max_tabs_undo": 0,
+    "browser.sessionstore.resume_from_crash": False,
+    # Capped content process count
+    "dom.ipc.processCount": 2,
+    "dom.ipc.processCount.webIsolated": 1,
+    "fission.autostart": False,
+    # Quiet startup
+    "browser.shell.checkDefaultBrowser": False,
+    "browser.startup.page": 0,
+}
+# Whether images are loaded in worker mode; platforms not listed keep images on
+WORKER_IMAGE_LOADING = {
+    "x": False,
+    "linkedin": False,
+    "tiktok": False,
+    "youtube": False,
+    "instagram": True,  # The crop and edit screens are laid out around image previews
+    "snapchat": True,
+}
+
+logger = logging.getLogger(__name__)
+
+_resolved_path = None
+_resolve_lock = threading.Lock()
+
+def _is_executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as file:
+            return json.load(file).get("geckodriver")
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(path):
+    try:
+        os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+        with open(MANIFEST_PATH, 'w', encoding='utf-8') as file:
+            json.dump({"geckodriver": path, "resolved_at": time.time()}, file)
+    except OSError as e:
+        logger.warning(f"Could not write driver manifest {MANIFEST_PATH}: {e}")
+
+def _find_in_wdm_cache():
+    """Return the newest geckodriver already downloaded by webdriver_manager, if any."""
+    roots = [os.path.join(os.path.expanduser("~"), ".wdm"), os.path.join(os.getcwd(), ".wdm")]
+    candidates = []
+    for root in roots:
+        candidates.extend(glob.glob(os.path.join(root, "drivers", "geckodriver", "**", GECKODRIVER_NAME), recursive=True))
+    candidates = [path for path in candidates if _is_executable(path)]
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+def _resolve():
+    path = os.environ.get("GECKODRIVER_PATH")
+    if path:
+        if not _is_executable(path):
+            raise WebDriverException(f"GECKODRIVER_PATH does not point to an executable: {path}")
+        return path, "GECKODRIVER_PATH"
+
+    path = _read_manifest()
+    if _is_executable(path):
+        return path, "manifest"
+
+    for source, finder in (("PATH", lambda: shutil.which(GECKODRIVER_NAME)), ("webdriver_manager cache", _find_in_wdm_cache)):
+        path = finder()
+        if _is_executable(path):
+            _write_manifest(path)
+            return path, source
+
+    if not DRIVER_DOWNLOAD:
+        raise WebDriverException(
+            f"No local geckodriver found: GECKODRIVER_PATH is unset, the manifest {MANIFEST_PATH} "
+            f"does not name an executable, and none is on PATH or in the webdriver_manager cache. "
+            f"Set GECKODRIVER_PATH, or set UPS_DRIVER_DOWNLOAD=1 to allow a download"
+        )
+    from webdriver_manager.firefox import GeckoDriverManager
+
+    path = GeckoDriverManager().install()
+    _write_manifest(path)
+    return path, "download"
+
+def resolve_geckodriver():
+    """Return the geckodriver path, resolved once per process without touching the network.
+
+    Resolution order: GECKODRIVER_PATH, the per-host manifest, PATH, the
+    webdriver_manager cache. Nothing is downloaded unless
+    UPS_DRIVER_DOWNLOAD is set; otherwise a missing driver is an error.
+    Whatever is found is pinned in the manifest so later processes on the
+    host skip the search.
+    """
+    global _resolved_path
+    if _resolved_path:
+        return _resolved_path
+    with _resolve_lock:
+        if not _resolved_path:
+            started = time.monotonic()
+            path, source = _resolve()
+            logger.info(f"Resolved geckodriver from {source} in {(time.monotonic() - started) * 1000:.0f} ms: {path}")
+            _resolved_path = path
+    return _resolved_path
+
+def build_options(profile_path, mode=None, platform=None, headless=None):
+    """Build Firefox options for a profile in "desktop" or "worker" launch mode.
+
+    Worker mode is headless and applies WORKER_PREFS; images are turned off
+    for platforms that allow it in WORKER_IMAGE_LOADING. headless overrides
+    the mode's default.
+    """
+    mode = mode or LAUNCH_MODE
+    options = Options()
+    options.add_argument("-profile")
+    options.add_argument(profile_path)
+    if BIDI:
+        options.set_capability("webSocketUrl", True)
+    if headless is None:
+        headless = mode == "worker"
+    if headless:
+        options.add_argument("--headless")
+    if mode == "worker":
+        for name, value in WORKER_PREFS.items():
+            options.set_preference(name, value)
+        if not WORKER_IMAGE_LOADING.get(platform, True):
+            options.set_preference("permissions.default.image", 2)
+    return options
+
+def start_firefox(options):
+    """Launch Firefox with the resolved geckodriver and log how long startup took."""
+    with span("driver_start"):
+        started = time.monotonic()
+        service = Service(resolve_geckodriver())
+        resolved = time.monotonic()
+        driver = webdriver.Firefox(service=service, options=options)
+        launched = time.monotonic()
+    logger.info(
+        f"Firefox started in {launched - started:.2f}s "
+        f"(driver resolution {(resolved - started) * 1000:.0f} ms, browser launch {launched - resolved:.2f}s)"
+    )
+    return driver
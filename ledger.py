@@ -0,0 +1,143 @@
+import os
+import hashlib
+import json
+import logging
+import mmap
+import sqlite3
+import threading
+import time
+
+# Constants
+LEDGER_DB = os.environ.get("UPS_LEDGER_DB", "ups_ledger.db")
+DEFAULT_ACCOUNT = os.environ.get("UPS_ACCOUNT", "default")
+HASH_CHUNK_SIZE = 16 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS published (
+    sha256 TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    account TEXT NOT NULL,
+    url TEXT,
+    video_path TEXT,
+    published_at REAL NOT NULL,
+    PRIMARY KEY (sha256, platform, account)
+);
+CREATE TABLE IF NOT EXISTS probes (
+    sha256 TEXT PRIMARY KEY,
+    probe TEXT NOT NULL
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    """Return the SHA-256 of a file, streamed over a memory map so it never sits in RAM whole."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(mapped), chunk_size):
+                    digest.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+class Ledger:
+    """Record of what was published where, keyed by the video's content hash."""
+
+    def __init__(self, path=LEDGER_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def content_hash(self, video_path):
+        """Return the video's SHA-256, reusing the cached value while path, size and mtime match."""
+        path = os.path.abspath(video_path)
+        stat = os.stat(path)
+        row = self._execute(
+            "SELECT sha256 FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        if row:
+            return row[0]
+        started = time.monotonic()
+        sha256 = hash_file(path)
+        logger.info(f"Hashed {path} ({stat.st_size / (1024 * 1024):.1f} MB) in {time.monotonic() - started:.2f}s")
+        self._execute(
+            "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, sha256),
+        )
+        return sha256
+
+    def lookup(self, video_path, platform, account=DEFAULT_ACCOUNT):
+        """Return the published record for this video on the platform and account, or None."""
+        row = self._execute(
+            "SELECT url, video_path, published_at FROM published WHERE sha256 = ? AND platform = ? AND account = ?",
+            (self.content_hash(video_path), platform, account),
+        ).fetchone()
+        if not row:
+            return None
+        return {"url": row[0], "video_path": row[1], "published_at": row[2]}
+
+    def record(self, video_path, platform, url=None, account=DEFAULT_ACCOUNT):
+        """Remember that the video was published on the platform and account."""
+        self._execute(
+            "INSERT OR REPLACE INTO published (sha256, platform, account, url, video_path, published_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.content_hash(video_path), platform, account, url, os.path.abspath(video_path), time.time()),
+        )
+
+    def cached_probe(self, sha256):
+        """Return the stored container probe of a file hash, or None."""
+        row = self._execute("SELECT probe FROM probes WHERE sha256 = ?", (sha256,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_probe(self, sha256, probe):
+        self._execute("INSERT OR REPLACE INTO probes (sha256, probe) VALUES (?, ?)", (sha256, json.dumps(probe)))
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+def get_ledger():
+    """Return the process-wide ledger, opening it on first use."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = Ledger()
+        return _ledger
+
+def already_published(video_path, platform, account=DEFAULT_ACCOUNT):
+    """Return the existing record if this exact video is already on the platform, else None."""
+    try:
+        existing = get_ledger().lookup(video_path, platform, account)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"[{platform}] Could not check the upload ledger: {e}")
+        return None
+    if existing:
+        logger.info(f"[{platform}] Already published as {existing['url'] or '(no URL recorded)'}, skipping upload")
+    return existing
+
+def record_published(video_path, platform, url=None, account=DEFAULT_ACCOUNT):
+    """Record a successful upload; failures to write the ledger are logged, not raised."""
+    try:
+        get_ledger().record(video_path, platform, url, account)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"[{platform}] Could not record upload in the ledger: {e}")
@@ -0,0 +1,271 @@
+import os
+import atexit
+import json
+import logging
+import threading
+import time
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from failures import LOCATOR_MISS_STREAK
+from tracing import span
+
+# Constants
+STATS_PATH = os.environ.get("UPS_LOCATOR_STATS", os.path.join(os.path.expanduser("~"), ".cache", "ups", "locators.json"))
+DEFAULT_TIMEOUT = 20
+POLL_INTERVAL = 0.2
+BROKEN_TIMEOUT = 2  # Seconds given to an element that missed LOCATOR_MISS_STREAK lookups in a row
+XPATH, CSS = "xpath", "css selector"  # Same strings as selenium's By.XPATH and By.CSS_SELECTOR
+
+# UI elements of each platform, each with its candidate locators in order
+# of preference. A lookup probes all candidates in one script call, so a
+# broken candidate costs nothing as long as a later one still matches; the
+# candidate that matched last time is tried first on the next lookup.
+LOCATORS = {
+    "x": {
+        "file_input": [(XPATH, '//input[@type="file"]'), (CSS, "input[data-testid='fileInput']")],
+        "caption": [(XPATH, '//div[@role="textbox"]'), (CSS, "div[data-testid='tweetTextarea_0']")],
+        "publish": [(XPATH, "//span[text()='Tweet']"), (CSS, "button[data-testid='tweetButton']"),
+                    (CSS, "button[data-testid='tweetButtonInline']")],
+        "success": [(XPATH, "//span[contains(text(), 'Your Tweet was sent')]"),
+                    (XPATH, "//span[contains(text(), 'Your post was sent')]")],
+    },
+    "linkedin": {
+        "start_post": [(XPATH, "//span[text()='Start a post']"), (CSS, "button.share-box-feed-entry__trigger")],
+        "file_input": [(XPATH, '//input[@type="file"]')],
+        "caption": [(XPATH, '//div[@role="textbox"]'), (CSS, "div.ql-editor[contenteditable='true']")],
+        "publish": [(XPATH, "//span[text()='Post']"), (CSS, "button.share-actions__primary-action")],
+        "success": [(XPATH, "//span[contains(text(), 'Post successful')]")],
+    },
+    "instagram": {
+        "new_post": [(XPATH, "//*[@aria-label='New post']"), (XPATH, "//span[text()='Create']")],
+        "file_input": [(XPATH, '//input[@type="file"]'), (CSS, "form[enctype='multipart/form-data'] input[type='file']")],
+        "crop_button": [(XPATH, "//*[name()='svg' and @aria-label='Select crop']")],
+        "crop_portrait": [(XPATH, "//*[name()='svg' and @aria-label='Crop portrait icon']"), (XPATH, "//span[text()='9:16']")],
+        "next": [(XPATH, "//*[text()='Next']"), (XPATH, "//div[@role='button' and normalize-space()='Next']")],
+        "caption": [(XPATH, "//*[@aria-label='Write a caption...']"), (CSS, "div[contenteditable='true'][role='textbox']")],
+        "share": [(XPATH, "//*[text()='Share']"), (XPATH, "//div[@role='button' and normalize-space()='Share']")],
+        "post_link": [(XPATH, "//a[contains(@href, '/reel/')]"), (XPATH, "//a[contains(@href, '/p/')]")],
+        "processing": [(CSS, "[role='progressbar']")],
+        "success": [(XPATH, "//*[contains(text(), 'Your reel has been shared')]"),
+                    (XPATH, "//*[contains(text(), 'Your post has been shared')]")],
+    },
+    "tiktok": {
+        "file_input": [(XPATH, "//input[@type='file']"), (CSS, "input[accept*='video']")],
+        "caption": [(XPATH, "//div[contains(@class, 'DraftEditor-editorContainer')]//div[contains(@class, 'public-DraftEditor-content')]"),
+                    (CSS, "div.public-DraftEditor-content[contenteditable='true']"),
+                    (CSS, "div[contenteditable='true'][role='combobox']")],
+        "uploaded": [(XPATH, "//span[text()='Uploaded']"), (XPATH, "//*[contains(@class, 'info-status') and contains(., 'Uploaded')]")],
+        "publish": [(XPATH, "//button[contains(@class, 'TUXButton') and .//div[text()='Post']]"),
+                    (CSS, "button[data-e2e='post_video_button']")],
+        "success": [(XPATH, "//div[text()='Your video has been uploaded']"),
+                    (XPATH, "//*[contains(text(), 'Your video has been uploaded')]")],
+    },
+    "snapchat": {
+        "file_input": [(CSS, "input[type='file'][accept='video/mp4,video/quicktime,video/webm,image/jpeg,image/png']"),
+                       (CSS, "input[type='file'][accept*='video']")],
+        "post_option": [(XPATH, "/html/body/div/main/div[2]/div[2]/div[2]/div[5]/div[1]/div[1]/div/div[2]/div/div/div/div[1]/div/div/div/div[1]"),
+                        (XPATH, "//main//*[normalize-space()='Spotlight']/ancestor-or-self::*[self::button or @role][1]")],
+        "caption": [(XPATH, "//textarea[@placeholder='Add a description and #topics']"), (CSS, "textarea[placeholder*='description']")],
+        "agree_terms": [(XPATH, "//button[contains(text(), 'Agree to Spotlight Terms')]")],
+        "accept_terms": [(XPATH, "/html/body/div[2]/div/div[2]/div/div[2]/div[3]/div/button[2]"),
+                         (XPATH, "//div[@role='dialog']//button[contains(., 'Accept')]")],
+        "publish": [(XPATH, "//button[contains(text(), 'Post to Snapchat')]")],
+        "processing": [(CSS, "[role='progressbar']"), (XPATH, "//*[contains(text(), 'Uploading')]")],
+        "success": [(XPATH, "//div[text()='Yay! Your post is now live!']"), (XPATH, "//*[contains(text(), 'Your post is now live')]")],
+    },
+    "youtube": {
+        "file_picker": [(CSS, "ytcp-uploads-file-picker")],
+        "file_input": [(CSS, "ytcp-uploads-file-picker input"), (XPATH, "//input[@type='file']")],
+        "title": [(CSS, "#title-textarea #textbox"), (XPATH, "(//*[@id='textbox'])[1]")],
+        "description": [(CSS, "#description-textarea #textbox"), (XPATH, "(//*[@id='textbox'])[2]")],
+        "not_for_kids": [(CSS, "[name='VIDEO_MADE_FOR_KIDS_NOT_MFK']"),
+                         (XPATH, "//tp-yt-paper-radio-button[@name='VIDEO_MADE_FOR_KIDS_NOT_MFK']")],
+        "audience_set": [(CSS, "tp-yt-paper-radio-button[name='VIDEO_MADE_FOR_KIDS_NOT_MFK'][aria-checked='true']")],
+        "next": [(CSS, "#next-button")],
+        "processing": [(CSS, "ytcp-uploads-dialog tp-yt-paper-spinner[active]")],
+        "stepper": [(CSS, "ytcp-uploads-dialog ytcp-stepper")],
+        "unlisted": [(CSS, "tp-yt-paper-radio-button[name='UNLISTED']"), (XPATH, "(//*[@id='radioLabel'])[2]")],
+        "done": [(CSS, "#done-button")],
+        "success": [(CSS, "ytcp-video-share-dialog")],
+        "video_row": [(CSS, "ytcp-video-row")],
+    },
+}
+
+# Returns [index, element] of the first candidate with a match (a visible,
+# enabled one when clickable is set), or null when none matches yet.
+PROBE_SCRIPT = """
+const [candidates, clickable] = arguments;
+const usable = el => !clickable || (el.getClientRects().length > 0 && !el.disabled
+    && getComputedStyle(el).visibility !== 'hidden' && el.getAttribute('aria-disabled') !== 'true');
+for (let i = 0; i < candidates.length; i++) {
+    const [kind, value] = candidates[i];
+    let matches = [];
+    try {
+        if (kind === 'xpath') {
+            const result = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let j = 0; j < result.snapshotLength; j++) matches.push(result.snapshotItem(j));
+        } else {
+            matches = Array.from(document.querySelectorAll(value));
+        }
+    } catch (e) {
+        continue;
+    }
+    const el = matches.find(node => node.nodeType === 1 && usable(node));
+    if (el) return [i, el];
+}
+return null;
+"""
+
+logger = logging.getLogger(__name__)
+
+class LocatorMissing(TimeoutException):
+    """Raised when none of an element's candidate locators matched in time.
+
+    streak is how many lookups of the element in a row, this one included
+    and across runs, found nothing.
+    """
+
+    def __init__(self, msg=None, name=None, streak=1):
+        super().__init__(msg)
+        self.name = name
+        self.streak = streak
+
+class LocatorStats:
+    """Per-candidate hit/miss counts, the last matching candidate and the miss streak of each element."""
+
+    def __init__(self, path=STATS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                self._data = json.load(file)
+        except (OSError, ValueError):
+            self._data = {}
+
+    def _entry(self, platform, name):
+        entry = self._data.setdefault(f"{platform}.{name}", {"last_hit": None, "hits": {}, "misses": {}})
+        entry.setdefault("streak", 0)
+        return entry
+
+    def ordered(self, platform, name):
+        """Return the element's candidates with the last matching one first."""
+        candidates = LOCATORS[platform][name]
+        with self._lock:
+            last_hit = self._entry(platform, name)["last_hit"]
+        return sorted(candidates, key=lambda candidate: candidate[1] != last_hit)
+
+    def record(self, platform, name, hit=None, missed=()):
+        """Count a lookup's outcome; returns True when the matching candidate changed."""
+        with self._lock:
+            entry = self._entry(platform, name)
+            for _, value in missed:
+                entry["misses"][value] = entry["misses"].get(value, 0) + 1
+            self._dirty = True
+            if not hit:
+                entry["streak"] += 1
+                return False
+            entry["streak"] = 0
+            entry["hits"][hit[1]] = entry["hits"].get(hit[1], 0) + 1
+            changed = entry["last_hit"] != hit[1]
+            entry["last_hit"] = hit[1]
+            return changed
+
+    def streak(self, platform, name):
+        """Return how many lookups of the element in a row found none of its candidates."""
+        with self._lock:
+            return self._entry(platform, name)["streak"]
+
+    def summary(self):
+        """Return {"platform.name": {"last_hit", "hits", "misses"}}."""
+        with self._lock:
+            return json.loads(json.dumps(self._data))
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._data, indent=1)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            partial = f"{self.path}.{os.getpid()}.tmp"
+            with open(partial, 'w', encoding='utf-8') as file:
+                file.write(data)
+            os.replace(partial, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save locator stats to {self.path}: {e}")
+
+stats = LocatorStats()
+atexit.register(stats.save)
+
+def locate(driver, platform, name, timeout=DEFAULT_TIMEOUT, clickable=False):
+    """Return the element, probing all its candidate locators at once until one matches.
+
+    Raises TimeoutException when no candidate matches within timeout. An
+    element whose lookups keep missing (see failures.LOCATOR_MISS_STREAK)
+    is given only BROKEN_TIMEOUT once the first probe finds nothing, so a
+    broken locator fails in moments instead of costing the whole timeout.
+    """
+    with span("locate", name, platform):
+        return _locate(driver, platform, name, timeout, clickable)
+
+def _locate(driver, platform, name, timeout, clickable):
+    candidates = stats.ordered(platform, name)
+    started = time.monotonic()
+    deadline = started + timeout
+    suspect = stats.streak(platform, name) >= LOCATOR_MISS_STREAK
+    while True:
+        try:
+            found = driver.execute_script(PROBE_SCRIPT, [list(candidate) for candidate in candidates], clickable)
+        except WebDriverException as e:
+            logger.debug(f"[{platform}] Probe for '{name}' failed: {e}")
+            found = None
+        if found:
+            index, element = found
+            if stats.record(platform, name, hit=candidates[index], missed=candidates[:index]):
+                stats.save()
+            if index:
+                logger.info(f"[{platform}] '{name}' matched fallback locator {candidates[index][1]}")
+            logger.debug(f"[{platform}] Located '{name}' in {(time.monotonic() - started) * 1000:.0f} ms")
+            return element
+        if suspect:
+            logger.info(f"[{platform}] '{name}' missed its last {stats.streak(platform, name)} lookups, "
+                        f"waiting only {BROKEN_TIMEOUT}s")
+            deadline = min(deadline, started + BROKEN_TIMEOUT)
+            timeout = min(timeout, BROKEN_TIMEOUT)
+            suspect = False
+        if time.monotonic() >= deadline:
+            stats.record(platform, name, missed=candidates)
+            raise LocatorMissing(f"[{platform}] No locator for '{name}' matched within {timeout}s", name,
+                                 stats.streak(platform, name))
+        time.sleep(POLL_INTERVAL)
+
+def present(driver, platform, name, clickable=False):
+    """Return True if any of the element's candidates matches right now; never waits."""
+    try:
+        return bool(driver.execute_script(PROBE_SCRIPT, [list(candidate) for candidate in stats.ordered(platform, name)],
+                                          clickable))
+    except WebDriverException as e:
+        logger.debug(f"[{platform}] Probe for '{name}' failed: {e}")
+        return False
+
+def union_xpath(platform, name):
+    """Return one XPath matching any of the element's XPath candidates, for the DOM watchers."""
+    return " | ".join(value for kind, value in stats.ordered(platform, name) if kind == XPATH)
+
+def log_stats():
+    """Log the elements whose preferred locator has stopped matching."""
+    for key, entry in sorted(stats.summary().items()):
+        platform, name = key.split(".", 1)
+        if platform not in LOCATORS or name not in LOCATORS[platform]:
+            continue
+        primary = LOCATORS[platform][name][0][1]
+        misses = entry["misses"].get(primary, 0)
+        if misses:
+            logger.info(f"[{platform}] '{name}': primary locator missed {misses}x, "
+                        f"hits {sum(entry['hits'].values())}, last match {entry['last_hit']}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(json.dumps(stats.summary(), indent=1))
+    log_stats()
@@ -0,0 +1,225 @@
+import os
+import argparse
+import logging
+import re
+import threading
+import unicodedata
+
+# Constants
+METADATA_SUFFIX = ".txt"
+ELLIPSIS = "…"
+
+# Caption rules per platform. max_length is measured with "length":
+# "chars" (code points), "weighted" (X counts most characters outside Latin
+# scripts, including emoji, as two) or "utf8" (bytes). Layout "full" puts
+# the title in the caption; "description" leaves it out because the
+# platform has a separate title field, limited to title_length.
+CAPTION_RULES = {
+    "youtube": {"layout": "description", "title_length": 100, "max_length": 5000, "length": "utf8",
+                "max_hashtags": 15, "forbidden": "<>"},
+    "tiktok": {"layout": "full", "max_length": 2200, "length": "chars"},
+    "instagram": {"layout": "full", "max_length": 2200, "length": "chars", "max_hashtags": 30, "bmp_only": True},
+    "snapchat": {"layout": "full", "max_length": 160, "length": "chars", "single_line": True},
+    "x": {"layout": "full", "max_length": 280, "length": "weighted"},
+    "linkedin": {"layout": "full", "max_length": 3000, "length": "chars"},
+}
+
+# Code point ranges X counts as one character; everything else counts as two
+X_LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+logger = logging.getLogger(__name__)
+
+def remove_non_bmp_characters(text):
+    return ''.join(c for c in text if ord(c) <= 0xFFFF)
+
+def _x_weight(text):
+    return sum(1 if any(low <= ord(c) <= high for low, high in X_LIGHT_RANGES) else 2 for c in text)
+
+LENGTHS = {
+    "chars": len,
+    "weighted": _x_weight,
+    "utf8": lambda text: len(text.encode("utf-8")),
+}
+
+def truncate(text, limit, measure=len):
+    """Shorten text to fit limit, cutting at a word boundary and ending with an ellipsis."""
+    if measure(text) <= limit:
+        return text
+    budget = limit - measure(ELLIPSIS)
+    used = cut = 0
+    for index, char in enumerate(text):
+        used += measure(char)
+        if used > budget:
+            break
+        cut = index + 1
+    head = text[:cut]
+    if cut < len(text) and not text[cut].isspace() and re.search(r"\s", head):
+        head = re.split(r"\s+(?=\S*$)", head)[0]
+    head = head.rstrip()
+    return head + ELLIPSIS if head else ""
+
+def _clean(text, rules):
+    """Drop control characters and whatever the platform will not accept."""
+    text = ''.join(c for c in text if c in "\n\t" or unicodedata.category(c)[0] != "C")
+    if rules.get("bmp_only"):
+        text = remove_non_bmp_characters(text)
+    for char in rules.get("forbidden", ""):
+        text = text.replace(char, "")
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    if rules.get("single_line"):
+        text = " ".join(text.split())
+    return text.strip()
+
+def _normalize_tag(tag):
+    """Reduce a tag to the characters hashtags may contain."""
+    return re.sub(r"[^\w]", "", tag.lstrip("#"))
+
+class Metadata:
+    """Title, description and tags of a video, with its per-platform captions.
+
+    Captions are rendered on first use and kept, so every platform's text is
+    built once no matter how many uploads or retries read it.
+    """
+
+    def __init__(self, title, description="", tags=(), path=None):
+        self.title = title
+        self.description = description
+        self.tags = []
+        for tag in tags:
+            tag = _normalize_tag(tag)
+            if tag and tag.lower() not in (seen.lower() for seen in self.tags):
+                self.tags.append(tag)
+        self.path = path
+        self._rendered = {}
+
+    def __repr__(self):
+        return f"Metadata(title={self.title!r}, tags={self.tags!r}, path={self.path!r})"
+
+    def hashtags(self, platform):
+        limit = CAPTION_RULES[platform].get("max_hashtags")
+        return ["#" + tag for tag in self.tags[:limit]]
+
+    def render(self, platform):
+        """Return {"title", "caption"} for the platform, rendering them on first use."""
+        rendered = self._rendered.get(platform)
+        if rendered is None:
+            rendered = self._rendered[platform] = self._render(platform)
+        return rendered
+
+    def title_for(self, platform):
+        return self.render(platform)["title"]
+
+    def caption(self, platform):
+        return self.render(platform)["caption"]
+
+    def _render(self, platform):
+        rules = CAPTION_RULES[platform]
+        measure = LENGTHS[rules["length"]]
+        separator = " " if rules.get("single_line") else "\n\n"
+        limit = rules["max_length"]
+        title = _clean(self.title, rules)
+        description = _clean(self.description, rules)
+        hashtags = self.hashtags(platform)
+
+        if rules["layout"] == "description":
+            rendered_title = truncate(title, rules["title_length"])
+            head = []
+        else:
+            rendered_title = title
+            head = [title] if title else []
+
+        # Title and hashtags first: drop hashtags, then shorten the title, until they fit
+        def join(parts):
+            return separator.join(part for part in parts if part)
+        while hashtags and measure(join(head + [" ".join(hashtags)])) > limit:
+            hashtags.pop()
+        tail = [" ".join(hashtags)] if hashtags else []
+        if head and measure(join(head + tail)) > limit:
+            spare = limit - measure(join(tail)) - (measure(separator) if tail else 0)
+            head = [truncate(head[0], max(spare, 0), measure)]
+
+        # The description gets whatever room is left
+        if description:
+            used = measure(join(head + tail))
+            spare = limit - used - measure(separator) * (2 if head and tail else 1 if head or tail else 0)
+            description = truncate(description, spare, measure) if spare > 0 else ""
+        caption = join(head + [description] + tail)
+        return {"title": rendered_title, "caption": caption}
+
+def parse_metadata(text, path=None):
+    """Parse a metadata file: the title, then the description, then a line of hashtags.
+
+    Blocks are separated by blank lines; the last line counts as tags only when
+    every word on it is a hashtag.
+    """
+    lines = [line.rstrip() for line in text.strip().splitlines()]
+    if not lines:
+        return Metadata("", path=path)
+    title = lines[0].strip()
+    body = lines[1:]
+    tags = []
+    if body:
+        words = [word for word in re.split(r"[\s,]+", body[-1]) if word]
+        if words and all(word.startswith("#") for word in words):
+            tags = words
+            body = body[:-1]
+    description = "\n".join(body).strip()
+    return Metadata(title, description, tags, path)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _load(path, stat):
+    key = (stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as file:
+        metadata = parse_metadata(file.read(), path)
+    with _cache_lock:
+        _cache[path] = (key, metadata)
+    return metadata
+
+def load_metadata(file_path):
+    """Return the parsed metadata file, reusing the cached parse while the file is unchanged."""
+    path = os.path.abspath(file_path)
+    metadata = _load(path, os.stat(path))
+    logger.info(f"Metadata from {path}: {metadata.title!r}, {len(metadata.tags)} tags")
+    return metadata
+
+def load_directory(directory, suffix=METADATA_SUFFIX):
+    """Parse every metadata file in a directory in one pass; returns {path: Metadata}.
+
+    Files that have not changed since they were last parsed come from the cache.
+    """
+    parsed = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(suffix) or not entry.is_file():
+                continue
+            path = os.path.abspath(entry.path)
+            try:
+                parsed[path] = _load(path, entry.stat())
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Could not read metadata file {path}: {e}")
+    logger.info(f"Loaded {len(parsed)} metadata files from {directory}")
+    return parsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the caption each platform gets from a metadata file")
+    parser.add_argument("metadata_path")
+    parser.add_argument("--platforms", nargs="+", choices=sorted(CAPTION_RULES), default=sorted(CAPTION_RULES))
+    args = parser.parse_args()
+
+    metadata = load_metadata(args.metadata_path)
+    for platform in args.platforms:
+        rendered = metadata.render(platform)
+        print(f"== {platform} ==")
+        if CAPTION_RULES[platform]["layout"] == "description":
+            print(f"[title] {rendered['title']}")
+        print(rendered["caption"])
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
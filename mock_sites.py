@@ -0,0 +1,414 @@
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Constants
+DEFAULT_PORT = 8800
+MOCK_CHANNEL_ID = "UCmockchannel0000000000"
+
+# Origins the uploaders navigate to; the mock serves each one under /<host>/
+ORIGINS = {
+    "x": ["https://twitter.com"],
+    "linkedin": ["https://www.linkedin.com"],
+    "instagram": ["https://www.instagram.com"],
+    "tiktok": ["https://www.tiktok.com"],
+    "snapchat": ["https://my.snapchat.com"],
+    "youtube": ["https://studio.youtube.com", "https://www.youtube.com"],
+}
+
+# Seconds each phase of a mock flow takes, before jitter:
+#   page:       server delay before a page is returned
+#   processing: from choosing the file until the video counts as processed
+#   transition: between the pages of a wizard (Instagram, YouTube)
+#   publish:    from clicking publish until the success message shows
+DEFAULT_DELAYS = {"page": 0.2, "processing": 2.0, "transition": 0.3, "publish": 1.0}
+DEFAULT_JITTER = 0.2  # Each delay is scaled by a random factor in [1 - jitter, 1 + jitter]
+
+# Where an injected failure happens:
+#   page:       the page answers 503
+#   processing: the video never finishes processing and an error shows instead
+#   publish:    publishing shows an error instead of the success message
+FAILURE_POINTS = ("page", "processing", "publish")
+
+# The API call each mock makes when the post is created, answered in the
+# shape result_capture.RESULT_PATTERNS reads the post ID from. YouTube
+# creates the video as soon as the file is chosen, the others on publish.
+MOCK_APIS = {
+    "twitter.com": ("/i/api/graphql/mock/CreateTweet",
+                    lambda post_id, number: {"data": {"create_tweet": {"tweet_results": {"result": {"rest_id": number}}}}}),
+    "www.linkedin.com": ("/voyager/api/contentcreation/normShares",
+                         lambda post_id, number: {"value": {"urn": f"urn:li:share:{number}"}}),
+    "www.instagram.com": ("/api/v1/media/configure_to_clips/",
+                          lambda post_id, number: {"media": {"pk": number, "code": post_id}, "status": "ok"}),
+    "www.tiktok.com": ("/tiktok/web/project/post/v1/",
+                       lambda post_id, number: {"single_post_resp_list": [{"item_id": number}], "status_code": 0}),
+    "my.snapchat.com": ("/spotlight/submit", lambda post_id, number: {"spotlightId": post_id}),
+    "www.youtube.com": ("/youtubei/v1/upload/createvideo",
+                        lambda post_id, number: {"videoId": post_id, "contents": {"uploadFeedbackItemRenderer": {}}}),
+}
+REPORT_ON_FILE = {"www.youtube.com"}
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Helpers shared by every mock page. MOCK is the page's configuration.
+PRELUDE = """
+const MOCK = %(config)s;
+function delay(name) {
+    const base = (MOCK.delays[name] || 0) * 1000;
+    return base * (1 + MOCK.jitter * (Math.random() * 2 - 1));
+}
+function later(name, fn) { setTimeout(fn, delay(name)); }
+function el(tag, attrs, ...children) {
+    const node = tag === 'svg' ? document.createElementNS('http://www.w3.org/2000/svg', 'svg') : document.createElement(tag);
+    for (const [key, value] of Object.entries(attrs || {})) {
+        if (key.startsWith('on')) { node.addEventListener(key.slice(2), value); }
+        else { node.setAttribute(key, value); }
+    }
+    if (tag === 'svg') { node.setAttribute('width', '24'); node.setAttribute('height', '24'); }
+    for (const child of children) { node.append(child); }
+    return node;
+}
+function mount(parent, ...nodes) { for (const node of nodes) { parent.appendChild(node); } return nodes[0]; }
+function enable(...nodes) { for (const node of nodes) { node.removeAttribute('aria-disabled'); } }
+function processing(parent, done) {
+    const bar = mount(parent, el('div', {role: 'progressbar'}, 'Uploading...'));
+    later('processing', () => {
+        bar.remove();
+        if (MOCK.fail === 'processing') { mount(parent, el('div', {}, 'Upload failed. Try again later.')); }
+        else { done(); }
+    });
+}
+function report() {
+    if (!MOCK.api) { return; }
+    fetch(MOCK.api, {method: 'POST', headers: {'Content-Type': 'application/json'},
+                     body: JSON.stringify({post_id: MOCK.post_id})}).catch(() => {});
+}
+function publish(parent, success) {
+    later('publish', () => {
+        if (MOCK.fail === 'publish') { mount(parent, el('div', {role: 'alert'}, 'Something went wrong. Please try again.')); }
+        else { if (!MOCK.report_on_file) { report(); } success(); }
+    });
+}
+function placeAt(path) {
+    let node = document.body;
+    for (const part of path.split('/')) {
+        const [, tag, index] = part.match(/^([\\w-]+)(?:\\[(\\d+)\\])?$/);
+        const kids = Array.from(node.children).filter(child => child.localName === tag);
+        while (kids.length < +(index || 1)) { kids.push(node.appendChild(document.createElement(tag))); }
+        node = kids[+(index || 1) - 1];
+    }
+    return node;
+}
+"""
+
+# One script per host, reproducing the ids, aria-labels, texts and page
+# structure that locators.LOCATORS, readiness.READINESS_STEPS and the
+# uploaders' success checks look for.
+SITE_SCRIPTS = {
+    "twitter.com": """
+const root = mount(document.body, el('div', {}));
+const label = el('span', {'aria-disabled': 'true'}, 'Tweet');
+const button = el('button', {'data-testid': 'tweetButton', 'aria-disabled': 'true', onclick: () => {
+    if (label.hasAttribute('aria-disabled')) { return; }
+    publish(root, () => mount(root, el('span', {}, 'Your post was sent.')));
+}}, label);
+mount(root,
+    el('div', {role: 'textbox', contenteditable: 'true', 'data-testid': 'tweetTextarea_0'}),
+    el('input', {type: 'file', 'data-testid': 'fileInput', onchange: () => processing(root, () => enable(button, label))}),
+    button);
+""",
+    "www.linkedin.com": """
+const root = mount(document.body, el('div', {}));
+mount(root, el('button', {class: 'share-box-feed-entry__trigger'}, el('span', {onclick: () => {
+    if (root.querySelector('[role=dialog]')) { return; }
+    const dialog = mount(root, el('div', {role: 'dialog'}));
+    const label = el('span', {'aria-disabled': 'true'}, 'Post');
+    const button = el('button', {class: 'share-actions__primary-action', onclick: () => {
+        if (label.hasAttribute('aria-disabled')) { return; }
+        publish(dialog, () => mount(root, el('span', {}, 'Post successful. View post')));
+    }}, label);
+    mount(dialog,
+        el('input', {type: 'file', onchange: () => processing(dialog, () => enable(label))}),
+        el('div', {role: 'textbox', contenteditable: 'true', class: 'ql-editor'}),
+        button);
+}}, 'Start a post')));
+""",
+    "www.instagram.com": """
+const root = mount(document.body, el('div', {}));
+function stage(...nodes) {
+    const next = el('div', {role: 'button'}, 'Next');
+    const page = mount(dialog, el('div', {}, ...nodes, next));
+    return [page, next];
+}
+const dialog = el('div', {role: 'dialog'});
+mount(root, el('a', {href: '#', onclick: event => {
+    event.preventDefault();
+    mount(root, dialog);
+    const form = mount(dialog, el('form', {enctype: 'multipart/form-data'}));
+    mount(form, el('input', {type: 'file', onchange: () => processing(dialog, () => {
+        form.remove();
+        const crop = el('div', {});
+        const [cropPage, next] = stage(el('svg', {'aria-label': 'Select crop', onclick: () => {
+            mount(crop, el('svg', {'aria-label': 'Crop portrait icon', onclick: () => crop.replaceChildren()}));
+        }}), crop);
+        next.addEventListener('click', () => { cropPage.remove(); later('transition', () => {
+            const [editPage, next] = stage(el('div', {}, 'Filters'));
+            next.addEventListener('click', () => { editPage.remove(); later('transition', () => {
+                const share = el('div', {role: 'button'}, 'Share');
+                mount(dialog,
+                    el('div', {'aria-label': 'Write a caption...', role: 'textbox', contenteditable: 'true'}),
+                    share);
+                share.addEventListener('click', () => publish(dialog, () => {
+                    dialog.remove();
+                    mount(root, el('div', {}, 'Your reel has been shared.'),
+                        el('a', {href: '/www.instagram.com/reel/' + MOCK.post_id + '/'}, 'View reel'));
+                }));
+            }); });
+        }); });
+    })}));
+}}, el('svg', {'aria-label': 'New post'})));
+""",
+    "www.tiktok.com": """
+const root = mount(document.body, el('div', {}));
+mount(root, el('input', {type: 'file', accept: 'video/*', onchange: () => {
+    const status = mount(root, el('div', {}));
+    const button = el('button', {class: 'TUXButton', 'data-e2e': 'post_video_button', 'aria-disabled': 'true', onclick: () => {
+        if (button.hasAttribute('aria-disabled')) { return; }
+        publish(root, () => mount(root, el('div', {}, 'Your video has been uploaded')));
+    }}, el('div', {}, 'Post'));
+    mount(root,
+        el('div', {class: 'DraftEditor-editorContainer'},
+            el('div', {class: 'public-DraftEditor-content', contenteditable: 'true', role: 'combobox'})),
+        button);
+    processing(status, () => { mount(status, el('span', {}, 'Uploaded')); enable(button); });
+}}));
+""",
+    "my.snapchat.com": """
+const SPOTLIGHT = 'div/main/div[2]/div[2]/div[2]/div[5]/div[1]/div[1]/div/div[2]/div/div/div/div[1]/div/div/div/div[1]';
+const upload = placeAt('div/main/div[1]');
+mount(upload, el('input', {type: 'file', accept: 'video/mp4,video/quicktime,video/webm,image/jpeg,image/png', onchange: () => {
+    processing(upload, () => {
+        placeAt(SPOTLIGHT).textContent = 'Spotlight';
+        placeAt('div/main/div[2]').addEventListener('click', () => {
+            const form = placeAt('div/main/div[3]');
+            if (form.childElementCount) { return; }
+            const dialog = el('div', {role: 'dialog'});
+            dialog.append(el('button', {onclick: () => dialog.remove()}, 'Accept'));
+            mount(form,
+                el('textarea', {placeholder: 'Add a description and #topics'}),
+                dialog,
+                el('button', {onclick: () => publish(form, () => mount(form, el('div', {}, 'Yay! Your post is now live!')))},
+                    'Post to Snapchat'));
+        });
+    });
+}}));
+""",
+    "www.youtube.com": """
+const root = mount(document.body, el('div', {}));
+const picker = mount(root, el('ytcp-uploads-file-picker', {}));
+mount(picker, el('input', {type: 'file', onchange: () => {
+    report();
+    picker.remove();
+    const dialog = mount(root, el('ytcp-uploads-dialog', {}));
+    // Checks run in the background while the details are filled in; Save waits for them
+    let processed = false;
+    let save = null;
+    processing(mount(dialog, el('div', {})), () => { processed = true; if (save) { enable(save); } });
+    const details = mount(dialog, el('div', {},
+        el('div', {id: 'title-textarea'}, el('div', {id: 'textbox', contenteditable: 'true', style: 'min-height: 1em'})),
+        el('div', {id: 'description-textarea'}, el('div', {id: 'textbox', contenteditable: 'true', style: 'min-height: 1em'})),
+        el('tp-yt-paper-radio-button', {name: 'VIDEO_MADE_FOR_KIDS_NOT_MFK'}, "No, it's not made for kids")));
+    let page = 0;
+    const next = el('button', {id: 'next-button', onclick: () => {
+        const spinner = mount(dialog, el('tp-yt-paper-spinner', {active: '', style: 'display: inline-block; width: 8px; height: 8px'}));
+        next.setAttribute('aria-disabled', 'true');
+        later('transition', () => {
+            spinner.remove();
+            enable(next);
+            page += 1;
+            if (page < 3) { return; }
+            details.remove();
+            next.style.display = 'none';
+            save = el('button', {id: 'done-button', onclick: () => {
+                if (save.hasAttribute('aria-disabled')) { return; }
+                publish(dialog, () => {
+                    dialog.remove();
+                    mount(root, el('ytcp-video-share-dialog', {}, 'Video published'));
+                });
+            }}, 'Save');
+            if (!processed) { save.setAttribute('aria-disabled', 'true'); }
+            mount(dialog,
+                el('tp-yt-paper-radio-button', {name: 'PRIVATE'}, el('div', {id: 'radioLabel'}, 'Private')),
+                el('tp-yt-paper-radio-button', {name: 'UNLISTED'}, el('div', {id: 'radioLabel'}, 'Unlisted')),
+                save);
+        });
+    }}, 'Next');
+    mount(dialog, next);
+}}));
+""",
+    "studio.youtube.com": """
+const root = mount(document.body, el('div', {}));
+if (location.pathname.includes('/videos/')) {
+    mount(root, el('ytcp-video-row', {},
+        el('a', {href: 'https://studio.youtube.com/video/' + MOCK.post_id + '/edit'}, 'Mock upload')));
+} else {
+    mount(root, el('h1', {}, 'Channel dashboard'));
+}
+""",
+}
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>%(host)s (mock)</title></head>
+<body><script>%(prelude)s
+%(script)s</script></body></html>
+"""
+
+class MockSites:
+    """Configuration and counters shared by the mock site handlers.
+
+    ``platforms`` maps a platform name to overrides of "delays" (merged into
+    DEFAULT_DELAYS), "jitter", "fail_rate" and "fail_at" (one of
+    FAILURE_POINTS); a "*" entry applies to every platform.
+    """
+
+    def __init__(self, platforms=None, seed=None):
+        self.platforms = platforms or {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def settings(self, platform):
+        merged = {"delays": dict(DEFAULT_DELAYS), "jitter": DEFAULT_JITTER, "fail_rate": 0.0, "fail_at": "publish"}
+        for overrides in (self.platforms.get("*", {}), self.platforms.get(platform, {})):
+            merged["delays"].update(overrides.get("delays", {}))
+            merged.update({key: value for key, value in overrides.items() if key != "delays"})
+        return merged
+
+    def draw(self, platform, settings):
+        """Decide whether this page load gets the platform's injected failure; returns its point or None."""
+        with self._lock:
+            failed = settings["fail_rate"] > 0 and self._random.random() < settings["fail_rate"]
+            post_id = f"mock{self._random.getrandbits(28):07x}"
+        return (settings["fail_at"] if failed else None), post_id
+
+    def count(self, platform, event):
+        with self._lock:
+            key = f"{platform}.{event}"
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+HOST_PLATFORMS = {urlsplit(origin).netloc: platform for platform, origins in ORIGINS.items() for origin in origins}
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    """Serve /<host>/<path> as the mock page of that host's platform."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _reply(self, status, body=b"", headers=None, content_type="text/html; charset=utf-8"):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        host, _, rest = path.lstrip("/").partition("/")
+        if path == "/__stats":
+            self._reply(200, json.dumps(self.server.sites.counters).encode(), content_type="application/json")
+            return
+        platform = HOST_PLATFORMS.get(host)
+        if not platform:
+            self._reply(404, b"unknown mock host")
+            return
+        if host == "studio.youtube.com" and not rest.strip("/"):
+            # Studio sends the dashboard to the signed-in channel's page
+            self._reply(302, headers={"Location": f"/{host}/channel/{MOCK_CHANNEL_ID}"})
+            return
+
+        sites = self.server.sites
+        settings = sites.settings(platform)
+        fail, post_id = sites.draw(platform, settings)
+        time.sleep(max(0.0, settings["delays"]["page"] * (1 + settings["jitter"] * (random.random() * 2 - 1))))
+        sites.count(platform, "pages")
+        if fail:
+            sites.count(platform, f"fail_{fail}")
+        if fail == "page":
+            self._reply(503, b"<html><body>Service unavailable</body></html>")
+            return
+        api = MOCK_APIS.get(host)
+        config = {"platform": platform, "delays": settings["delays"], "jitter": settings["jitter"],
+                  "fail": fail, "post_id": post_id, "api": f"/{host}{api[0]}" if api else None,
+                  "report_on_file": host in REPORT_ON_FILE}
+        body = PAGE % {
+            "host": host,
+            "prelude": PRELUDE % {"config": json.dumps(config)},
+            "script": SITE_SCRIPTS[host],
+        }
+        self._reply(200, body.encode("utf-8"))
+
+    def do_POST(self):
+        host, _, rest = urlsplit(self.path).path.lstrip("/").partition("/")
+        api = MOCK_APIS.get(host)
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        if not api or f"/{rest}" != api[0]:
+            self._reply(404, b"unknown mock API")
+            return
+        try:
+            post_id = json.loads(body or b"{}").get("post_id") or "mock0000000"
+        except ValueError:
+            post_id = "mock0000000"
+        self.server.sites.count(HOST_PLATFORMS[host], "created")
+        response = api[1](post_id, str(int(post_id[4:], 16) if post_id[4:].isalnum() else 0))
+        self._reply(200, json.dumps(response).encode(), content_type="application/json")
+
+def start_mock_sites(sites=None, host="127.0.0.1", port=0):
+    """Serve the mock sites from a background thread; returns the server.
+
+    ``server.url_overrides`` maps each real origin to its mock, in the form
+    AllInOne.URL_OVERRIDES expects. Stop the server with ``shutdown()``.
+    """
+    server = ThreadingHTTPServer((host, port), MockSiteHandler)
+    server.daemon_threads = True
+    server.sites = sites or MockSites()
+    bound_host, bound_port = server.server_address[:2]
+    server.url_overrides = {
+        origin: f"http://{bound_host}:{bound_port}/{urlsplit(origin).netloc}"
+        for origins in ORIGINS.values() for origin in origins
+    }
+    threading.Thread(target=server.serve_forever, name="mock-sites", daemon=True).start()
+    logger.info(f"Mock sites listening on http://{bound_host}:{bound_port}")
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local mock versions of the platforms' upload pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--config", help="JSON file with per-platform delays and failure injection (see MockSites)")
+    args = parser.parse_args()
+
+    platforms = None
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as file:
+            platforms = json.load(file)
+    server = start_mock_sites(MockSites(platforms), args.host, args.port)
+    print(f"UPS_URL_OVERRIDES='{json.dumps(server.url_overrides)}'")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
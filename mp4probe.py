@@ -0,0 +1,126 @@
+import os
+import struct
+import sys
+
+# Boxes that only contain other boxes
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"mvex"}
+
+class ProbeError(Exception):
+    """Raised when a file is not a readable MP4/MOV container."""
+
+def _iter_boxes(file, start, end):
+    """Yield (type, payload offset, payload size) for the boxes between start and end."""
+    offset = start
+    while offset + 8 <= end:
+        file.seek(offset)
+        header = file.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            raise ProbeError(f"Corrupt box {box_type!r} at offset {offset}")
+        yield box_type, offset + header_size, size - header_size
+        offset += size
+
+def _read(file, offset, size):
+    file.seek(offset)
+    return file.read(size)
+
+def _parse_mvhd(data):
+    version = data[0]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", data[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", data[12:20])
+    return timescale, duration
+
+def _parse_tkhd(data):
+    version = data[0]
+    base = 4 + (32 if version == 1 else 20)
+    # reserved(8) layer(2) alternate_group(2) volume(2) reserved(2) matrix(36) width(4) height(4)
+    matrix = struct.unpack(">9i", data[base + 16:base + 52])
+    width, height = struct.unpack(">II", data[base + 52:base + 60])
+    a, b = matrix[0], matrix[1]
+    rotation = 0
+    if a == 0 and b > 0:
+        rotation = 90
+    elif a < 0 and b == 0:
+        rotation = 180
+    elif a == 0 and b < 0:
+        rotation = 270
+    return width / 65536, height / 65536, rotation
+
+def _parse_mdhd(data):
+    return _parse_mvhd(data)
+
+def _parse_track(file, offset, size):
+    track = {}
+    for box_type, payload, payload_size in _iter_boxes(file, offset, offset + size):
+        if box_type == b"tkhd":
+            track["width"], track["height"], track["rotation"] = _parse_tkhd(_read(file, payload, min(payload_size, 96)))
+        elif box_type in CONTAINER_BOXES:
+            track.update(_parse_track(file, payload, payload_size))
+        elif box_type == b"mdhd":
+            track["timescale"], track["duration"] = _parse_mdhd(_read(file, payload, min(payload_size, 32)))
+        elif box_type == b"hdlr":
+            track["handler"] = _read(file, payload + 8, 4).decode("latin-1")
+        elif box_type == b"stsd":
+            entry = _read(file, payload + 8, 8)
+            if len(entry) == 8:
+                track["codec"] = entry[4:8].decode("latin-1")
+        elif box_type == b"stsz":
+            track["sample_count"] = struct.unpack(">I", _read(file, payload + 8, 4))[0]
+    return track
+
+def probe(path):
+    """Read duration, dimensions, codecs and frame rate from the MP4 boxes without decoding.
+
+    Only the box headers and the small moov boxes (mvhd, tkhd, mdhd, hdlr,
+    stsd, stsz) are read; the media data is skipped.
+    """
+    size = os.path.getsize(path)
+    info = {"size_bytes": size, "major_brand": None, "duration": None, "width": None, "height": None,
+            "rotation": 0, "video_codec": None, "audio_codec": None, "fps": None, "bitrate_kbps": None,
+            "faststart": None}
+    seen_moov = False
+    with open(path, 'rb') as file:
+        for box_type, payload, payload_size in _iter_boxes(file, 0, size):
+            if box_type == b"ftyp":
+                info["major_brand"] = _read(file, payload, 4).decode("latin-1")
+            elif box_type == b"mdat" and info["faststart"] is None:
+                info["faststart"] = seen_moov
+            elif box_type == b"moov":
+                seen_moov = True
+                for child, child_payload, child_size in _iter_boxes(file, payload, payload + payload_size):
+                    if child == b"mvhd":
+                        timescale, duration = _parse_mvhd(_read(file, child_payload, min(child_size, 32)))
+                        if timescale:
+                            info["duration"] = duration / timescale
+                    elif child == b"trak":
+                        track = _parse_track(file, child_payload, child_size)
+                        if track.get("handler") == "vide" and info["video_codec"] is None:
+                            info["video_codec"] = track.get("codec")
+                            width, height = track.get("width"), track.get("height")
+                            if track.get("rotation") in (90, 270):
+                                width, height = height, width
+                            info["width"], info["height"] = width, height
+                            info["rotation"] = track.get("rotation", 0)
+                            if track.get("timescale") and track.get("duration") and track.get("sample_count"):
+                                info["fps"] = track["sample_count"] / (track["duration"] / track["timescale"])
+                        elif track.get("handler") == "soun" and info["audio_codec"] is None:
+                            info["audio_codec"] = track.get("codec")
+    if not seen_moov:
+        raise ProbeError(f"No moov box in {path}; not an MP4/MOV file or a fragmented one")
+    if info["duration"]:
+        info["bitrate_kbps"] = size * 8 / info["duration"] / 1000
+    return info
+
+if __name__ == "__main__":
+    for video in sys.argv[1:]:
+        print(video, probe(video))
@@ -0,0 +1,142 @@
+import sys
+import logging
+import sqlite3
+
+from ledger import get_ledger
+from mp4probe import ProbeError, probe
+from tracing import span
+
+# Per-platform upload limits, from each platform's published upload requirements.
+# Durations are in seconds, sizes in MB and aspect ratios are width / height.
+PLATFORM_LIMITS = {
+    "youtube": {
+        # 12 h is the limit of verified accounts; others are held to 15 min by YouTube itself
+        "min_duration": 1, "max_duration": 12 * 3600, "max_size_mb": 256 * 1024,
+        "video_codecs": {"avc1", "avc3", "hvc1", "hev1", "vp09", "av01", "mp4v"},
+    },
+    "tiktok": {
+        "min_duration": 3, "max_duration": 600, "max_size_mb": 4096,
+        "min_width": 360, "min_height": 360,
+        "video_codecs": {"avc1", "avc3", "hvc1", "hev1"},
+    },
+    "instagram": {
+        "min_duration": 3, "max_duration": 900, "max_size_mb": 4096,
+        "min_aspect": 0.01, "max_aspect": 100, "max_fps": 60, "min_fps": 23,
+        "video_codecs": {"avc1", "avc3", "hvc1", "hev1"},
+    },
+    "snapchat": {
+        "min_duration": 5, "max_duration": 60, "max_size_mb": 1024,
+        "max_aspect": 1.0,
+        "video_codecs": {"avc1", "avc3", "hvc1", "hev1"},
+    },
+    "x": {
+        "min_duration": 0.5, "max_duration": 140, "max_size_mb": 512,
+        "min_aspect": 1 / 3, "max_aspect": 3.0, "max_fps": 60,
+        "max_width": 1920, "max_height": 1920,
+        "video_codecs": {"avc1", "avc3"},
+        "audio_codecs": {"mp4a"},
+    },
+    "linkedin": {
+        "min_duration": 3, "max_duration": 1800, "max_size_mb": 5120,
+        "min_aspect": 1 / 2.4, "max_aspect": 2.4, "min_fps": 10, "max_fps": 60,
+        "video_codecs": {"avc1", "avc3", "hvc1", "hev1", "mp4v", "vp08", "vp09"},
+    },
+}
+
+# YouTube treats square and vertical videos up to this long as Shorts,
+# which Studio lists apart from other uploads
+SHORTS_MAX_DURATION = 180
+
+logger = logging.getLogger(__name__)
+
+def probe_cached(video_path):
+    """Probe a video once per content hash; later calls read the probe from the ledger."""
+    ledger = get_ledger()
+    sha256 = ledger.content_hash(video_path)
+    info = ledger.cached_probe(sha256)
+    if info is None:
+        info = probe(video_path)
+        ledger.store_probe(sha256, info)
+    return info
+
+def check_limits(info, platform):
+    """Return the list of problems that keep the probed video off the platform."""
+    limits = PLATFORM_LIMITS[platform]
+    problems = []
+    duration, size_mb = info["duration"], info["size_bytes"] / (1024 * 1024)
+    width, height, fps = info["width"], info["height"], info["fps"]
+
+    if duration is None:
+        problems.append("duration unknown")
+    else:
+        if duration < limits.get("min_duration", 0):
+            problems.append(f"duration {duration:.1f}s is under {limits['min_duration']}s")
+        if "max_duration" in limits and duration > limits["max_duration"]:
+            problems.append(f"duration {duration:.1f}s is over {limits['max_duration']}s")
+    if "max_size_mb" in limits and size_mb > limits["max_size_mb"]:
+        problems.append(f"size {size_mb:.0f} MB is over {limits['max_size_mb']} MB")
+
+    if not width or not height:
+        problems.append("no video track")
+    else:
+        aspect = width / height
+        if aspect < limits.get("min_aspect", 0):
+            problems.append(f"aspect ratio {aspect:.2f} is under {limits['min_aspect']:.2f}")
+        if "max_aspect" in limits and aspect > limits["max_aspect"]:
+            problems.append(f"aspect ratio {aspect:.2f} is over {limits['max_aspect']:.2f}")
+        for name, value in (("width", width), ("height", height)):
+            if value < limits.get(f"min_{name}", 0):
+                problems.append(f"{name} {value:.0f}px is under {limits[f'min_{name}']}px")
+            if f"max_{name}" in limits and value > limits[f"max_{name}"]:
+                problems.append(f"{name} {value:.0f}px is over {limits[f'max_{name}']}px")
+
+    if fps:
+        if fps < limits.get("min_fps", 0):
+            problems.append(f"frame rate {fps:.1f} is under {limits['min_fps']}")
+        if "max_fps" in limits and fps > limits["max_fps"] + 0.5:
+            problems.append(f"frame rate {fps:.1f} is over {limits['max_fps']}")
+
+    if "video_codecs" in limits and info["video_codec"] and info["video_codec"] not in limits["video_codecs"]:
+        problems.append(f"video codec {info['video_codec']} is not accepted")
+    if "audio_codecs" in limits and info["audio_codec"] and info["audio_codec"] not in limits["audio_codecs"]:
+        problems.append(f"audio codec {info['audio_codec']} is not accepted")
+    return problems
+
+def is_youtube_short(video_path):
+    """Return True if YouTube will list the video as a Short; False when it cannot be probed."""
+    try:
+        info = probe_cached(video_path)
+    except (OSError, ProbeError, sqlite3.Error):
+        return False
+    width, height, duration = info["width"], info["height"], info["duration"]
+    return bool(width and height and duration and width <= height and duration <= SHORTS_MAX_DURATION)
+
+def preflight(video_path, platform, source=None):
+    """Return the list of reasons the video cannot go to the platform (empty when it can).
+
+    When the video is a rendition, pass the file it was made from as
+    source: its duration is what gets checked, so a source too long for
+    the platform is rejected rather than published cut short.
+    """
+    try:
+        with span("preflight", platform=platform):
+            info = probe_cached(video_path)
+            if source:
+                info = dict(info, duration=probe_cached(source)["duration"])
+    except (OSError, ProbeError, sqlite3.Error) as e:
+        return [f"could not probe video: {e}"]
+    problems = check_limits(info, platform)
+    if problems:
+        logger.error(f"[{platform}] Preflight rejected {video_path}: {'; '.join(problems)}")
+    else:
+        logger.info(
+            f"[{platform}] Preflight passed: {info['width']:.0f}x{info['height']:.0f}, "
+            f"{info['duration']:.1f}s, {info['video_codec']}/{info['audio_codec']}"
+        )
+    return problems
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for video in sys.argv[1:]:
+        for name in PLATFORM_LIMITS:
+            preflight(video, name)
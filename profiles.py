@@ -0,0 +1,222 @@
+import os
+import argparse
+import errno
+import json
+import logging
+import shutil
+import sqlite3
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows has no reflinks; plain copies are used there
+    fcntl = None
+
+# Constants
+TEMPLATE_MANIFEST = "ups-template.json"
+FICLONE = 0x40049409  # Linux ioctl that makes a copy-on-write clone (btrfs, XFS, ...)
+
+# Sites whose login state a session profile needs
+PLATFORM_DOMAINS = {
+    "youtube": ["youtube.com", "google.com"],
+    "instagram": ["instagram.com", "facebook.com"],
+    "tiktok": ["tiktok.com"],
+    "x": ["twitter.com", "x.com"],
+    "linkedin": ["linkedin.com"],
+    "snapchat": ["snapchat.com"],
+}
+
+# Profile files that only matter for the chosen sites and are filtered by host
+COOKIES_DB = "cookies.sqlite"
+LEGACY_STORAGE_DB = "webappsstore.sqlite"
+# Profile files copied as they are when present
+PASSTHROUGH_FILES = ["cert9.db", "pkcs11.txt", "containers.json", "handlers.json"]
+
+logger = logging.getLogger(__name__)
+
+def _domains(platforms):
+    domains = []
+    for platform in platforms or PLATFORM_DOMAINS:
+        domains.extend(PLATFORM_DOMAINS[platform])
+    return domains
+
+def _host_matches(host, domains):
+    host = host.lstrip(".").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+def copy_sqlite(source, dest):
+    """Copy a SQLite database consistently, even while Firefox holds it open."""
+    uri = "file:" + os.path.abspath(source).replace("\\", "/") + "?mode=ro"
+    with sqlite3.connect(uri, uri=True) as src, sqlite3.connect(dest) as dst:
+        src.backup(dst)
+
+def _filter_cookies(path, domains):
+    with sqlite3.connect(path) as conn:
+        hosts = [row[0] for row in conn.execute("SELECT DISTINCT host FROM moz_cookies")]
+        dropped = [host for host in hosts if not _host_matches(host, domains)]
+        conn.executemany("DELETE FROM moz_cookies WHERE host = ?", [(host,) for host in dropped])
+        kept = conn.execute("SELECT COUNT(*) FROM moz_cookies").fetchone()[0]
+    with sqlite3.connect(path) as conn:
+        conn.execute("VACUUM")
+    return kept
+
+def _filter_legacy_storage(path, domains):
+    with sqlite3.connect(path) as conn:
+        # originKey stores the reversed host, e.g. "moc.margatsni.www.:https:443"
+        keys = [row[0] for row in conn.execute("SELECT DISTINCT originKey FROM webappsstore2")]
+        for key in keys:
+            host = key.split(":", 1)[0][::-1]
+            if not _host_matches(host, domains):
+                conn.execute("DELETE FROM webappsstore2 WHERE originKey = ?", (key,))
+    with sqlite3.connect(path) as conn:
+        conn.execute("VACUUM")
+
+def _origin_host(origin_dir):
+    """Return the host of a storage/default origin directory such as "https+++www.instagram.com"."""
+    name = origin_dir.split("^", 1)[0]
+    if "+++" not in name:
+        return None
+    return name.split("+++", 1)[1].split("+", 1)[0]
+
+def build_template(source_profile, dest, platforms=None):
+    """Extract the login state of the platforms from a full profile into a small template.
+
+    Keeps cookies, local storage and IndexedDB for PLATFORM_DOMAINS only;
+    history, caches, extensions and everything else are left behind.
+    """
+    started = time.monotonic()
+    domains = _domains(platforms)
+    if os.path.exists(dest):
+        shutil.rmtree(dest)
+    os.makedirs(dest)
+
+    cookies = os.path.join(source_profile, COOKIES_DB)
+    if os.path.exists(cookies):
+        copy_sqlite(cookies, os.path.join(dest, COOKIES_DB))
+        kept = _filter_cookies(os.path.join(dest, COOKIES_DB), domains)
+        logger.info(f"Kept {kept} cookies for {', '.join(domains)}")
+    else:
+        logger.warning(f"No {COOKIES_DB} in {source_profile}")
+
+    legacy_storage = os.path.join(source_profile, LEGACY_STORAGE_DB)
+    if os.path.exists(legacy_storage):
+        copy_sqlite(legacy_storage, os.path.join(dest, LEGACY_STORAGE_DB))
+        _filter_legacy_storage(os.path.join(dest, LEGACY_STORAGE_DB), domains)
+
+    storage_root = os.path.join(source_profile, "storage", "default")
+    if os.path.isdir(storage_root):
+        for origin_dir in os.listdir(storage_root):
+            host = _origin_host(origin_dir)
+            if host and _host_matches(host, domains):
+                shutil.copytree(
+                    os.path.join(storage_root, origin_dir),
+                    os.path.join(dest, "storage", "default", origin_dir),
+                    ignore=shutil.ignore_patterns("*-wal", "*-shm", "*.lock"),
+                )
+
+    for name in PASSTHROUGH_FILES:
+        path = os.path.join(source_profile, name)
+        if os.path.isfile(path):
+            shutil.copy2(path, os.path.join(dest, name))
+
+    with open(os.path.join(dest, TEMPLATE_MANIFEST), 'w', encoding='utf-8') as file:
+        json.dump({"source": os.path.abspath(source_profile), "domains": domains, "created_at": time.time()}, file)
+
+    logger.info(
+        f"Built session template {dest} ({directory_size(dest) / (1024 * 1024):.1f} MB) "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return dest
+
+def is_template(profile_path):
+    """Return True if the profile was made by build_template."""
+    return os.path.isfile(os.path.join(profile_path, TEMPLATE_MANIFEST))
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def _reflink(source, dest):
+    """Make a copy-on-write clone of a file; returns False where the filesystem cannot."""
+    if fcntl is None:
+        return False
+    with open(source, 'rb') as src, open(dest, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EBADF):
+                return False
+            raise
+    shutil.copystat(source, dest)
+    return True
+
+def _is_immutable(relative_path):
+    """IndexedDB blob files under "<db>.files" are written once and never modified in place."""
+    return any(part.endswith(".files") for part in relative_path.split(os.sep)[:-1])
+
+def clone_profile(source, dest, ignore=None):
+    """Make a private working copy of a profile as cheaply as the filesystem allows.
+
+    Immutable blobs are hardlinked, everything else is reflinked
+    (copy-on-write) where supported and copied otherwise, so workers never
+    write into each other's files.
+    """
+    started = time.monotonic()
+    counts = {"hardlink": 0, "reflink": 0, "copy": 0}
+    for root, dirs, files in os.walk(source):
+        relative_root = os.path.relpath(root, source)
+        if ignore:
+            ignored = ignore(root, dirs + files)
+            dirs[:] = [name for name in dirs if name not in ignored]
+            files = [name for name in files if name not in ignored]
+        os.makedirs(os.path.join(dest, relative_root), exist_ok=True)
+        for name in files:
+            relative_path = os.path.normpath(os.path.join(relative_root, name))
+            src = os.path.join(source, relative_path)
+            dst = os.path.join(dest, relative_path)
+            if _is_immutable(relative_path):
+                try:
+                    os.link(src, dst)
+                    counts["hardlink"] += 1
+                    continue
+                except OSError:
+                    pass
+            if _reflink(src, dst):
+                counts["reflink"] += 1
+            else:
+                shutil.copy2(src, dst)
+                counts["copy"] += 1
+    logger.info(
+        f"Cloned profile to {dest} in {(time.monotonic() - started) * 1000:.0f} ms "
+        f"({counts['reflink']} reflinked, {counts['hardlink']} hardlinked, {counts['copy']} copied)"
+    )
+    return dest
+
+def main():
+    parser = argparse.ArgumentParser(description="Build slim session profiles for upload workers")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Extract a session template from a full Firefox profile")
+    build.add_argument("source_profile")
+    build.add_argument("dest")
+    build.add_argument("--platforms", nargs="+", choices=sorted(PLATFORM_DOMAINS))
+
+    clone = commands.add_parser("clone", help="Make a per-worker copy of a template")
+    clone.add_argument("template")
+    clone.add_argument("dest")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_template(args.source_profile, args.dest, args.platforms)
+    elif args.command == "clone":
+        clone_profile(args.template, args.dest)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,173 @@
+import os
+import logging
+import time
+from selenium.common.exceptions import WebDriverException
+from locators import LOCATORS
+from tracing import span
+
+# "adaptive" watches the page for readiness, "fixed" restores the old fixed sleeps
+READINESS_MODE = os.environ.get("UPS_READINESS_MODE", "adaptive")
+POLL_INTERVAL = 0.25
+TEXT_PREFIX = 60  # Characters of the expected text that must show, enough to tell it was committed
+
+# Per-platform readiness steps. Indicators are names of the platform's
+# elements in locators.LOCATORS; any of an element's candidates will do.
+#   ready:     the page is ready once any of these elements is displayed
+#   busy:      ...and none of these progress/processing indicators is displayed
+#   clickable: require the ready element to also be enabled
+#   text:      require the ready element to show this text (given per call)
+#   changes:   the first displayed of these must look different from the
+#              snapshot() taken before the action (given per call as before)
+#   deadline:  seconds to watch the page before giving up on the step
+#   fallback:  the fixed sleep used before, kept for "fixed" mode and for when
+#              the indicators cannot be evaluated
+READINESS_STEPS = {
+    ("instagram", "media_processed"): {
+        "ready": ["crop_button"],
+        "busy": ["processing"],
+        "deadline": 180,
+        "fallback": 15,
+    },
+    ("instagram", "post_link"): {
+        "ready": ["post_link"],
+        "deadline": 30,
+        "fallback": 10,
+    },
+    ("snapchat", "media_processed"): {
+        "ready": ["post_option"],
+        "busy": ["processing"],
+        "clickable": True,
+        "deadline": 180,
+        "fallback": 10,
+    },
+    ("youtube", "file_accepted"): {
+        "ready": ["title"],
+        "deadline": 60,
+        "fallback": 5,
+    },
+    ("youtube", "details_entered"): {
+        # Called with text=<what was typed>: ready once the field shows it
+        "ready": ["title", "description"],
+        "deadline": 10,
+        "fallback": 3,
+    },
+    ("youtube", "audience_set"): {
+        "ready": ["audience_set"],
+        "deadline": 10,
+        "fallback": 3,
+    },
+    ("youtube", "wizard_step"): {
+        # The Next button is always clickable; the stepper shows the dialog moved on
+        "ready": ["next", "done"],
+        "busy": ["processing"],
+        "changes": ["stepper"],
+        "clickable": True,
+        "deadline": 20,
+        "fallback": 3,
+    },
+    ("youtube", "visibility_set"): {
+        "ready": ["done"],
+        "clickable": True,
+        "deadline": 10,
+        "fallback": 3,
+    },
+    ("youtube", "video_list"): {
+        "ready": ["video_row"],
+        "deadline": 20,
+        "fallback": 2,
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+def _normalize(text):
+    return " ".join((text or "").split())
+
+def _elements(driver, platform, name):
+    for kind, value in LOCATORS[platform][name]:
+        yield from driver.find_elements(kind, value)
+
+def _displayed(driver, platform, name, clickable=False, text=None):
+    for element in _elements(driver, platform, name):
+        if element.is_displayed() and (not clickable or element.is_enabled()):
+            if text is None or _normalize(text)[:TEXT_PREFIX] in _normalize(element.text):
+                return True
+    return False
+
+def _signature(driver, platform, names):
+    """Return the markup of the first displayed of the named elements, or None."""
+    for name in names:
+        for element in _elements(driver, platform, name):
+            if element.is_displayed():
+                return element.get_attribute("outerHTML")
+    return None
+
+def page_is_ready(driver, platform, ready=(), busy=(), clickable=False, text=None, changes=(), before=None):
+    """Return True if any ready element of the platform is displayed and no busy one is.
+
+    With a before snapshot, the changes elements must also differ from it.
+    """
+    if ready and not any(_displayed(driver, platform, name, clickable, text) for name in ready):
+        return False
+    if any(_displayed(driver, platform, name) for name in busy):
+        return False
+    return before is None or _signature(driver, platform, changes) != before
+
+def _check(driver, platform, config):
+    return page_is_ready(driver, platform, config.get("ready", ()), config.get("busy", ()),
+                         config.get("clickable", False), config.get("text"), config.get("changes", ()),
+                         config.get("before"))
+
+def snapshot(driver, platform, step):
+    """Capture a step's changes indicators before the action; pass the result to wait_until_ready as before.
+
+    Returns None when the step has none or they cannot be read, which waives the check.
+    """
+    changes = READINESS_STEPS[(platform, step)].get("changes")
+    if not changes or READINESS_MODE == "fixed":
+        return None
+    try:
+        return _signature(driver, platform, changes)
+    except WebDriverException:
+        return None
+
+def is_ready(driver, platform, step):
+    """Check a platform step's readiness once, without waiting; False when it cannot be evaluated."""
+    try:
+        return _check(driver, platform, READINESS_STEPS[(platform, step)])
+    except WebDriverException:
+        return False
+
+def wait_until_ready(driver, platform, step, **overrides):
+    """Block until the page for a platform step is ready, or its deadline passes.
+
+    Returns True as soon as the page is ready and False when the deadline was
+    reached or the fixed fallback sleep was used instead. Keyword arguments
+    override the entries of READINESS_STEPS for a single call.
+    """
+    with span("wait", step, platform) as trace:
+        ready = _wait_until_ready(driver, platform, step, dict(READINESS_STEPS[(platform, step)], **overrides))
+        trace.set(ready=ready)
+    return ready
+
+def _wait_until_ready(driver, platform, step, config):
+    fallback = config.get("fallback", 0)
+    if READINESS_MODE == "fixed":
+        time.sleep(fallback)
+        return False
+
+    started = time.monotonic()
+    deadline = started + config.get("deadline", 30)
+    while True:
+        try:
+            if _check(driver, platform, config):
+                logger.info(f"[{platform}] {step} ready after {time.monotonic() - started:.1f}s")
+                return True
+        except WebDriverException as e:
+            logger.warning(f"[{platform}] Could not evaluate readiness for {step}, falling back to {fallback}s: {e}")
+            time.sleep(max(0, fallback - (time.monotonic() - started)))
+            return False
+        if time.monotonic() >= deadline:
+            logger.warning(f"[{platform}] {step} not ready after {config.get('deadline', 30)}s, continuing")
+            return False
+        time.sleep(POLL_INTERVAL)
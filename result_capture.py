@@ -0,0 +1,223 @@
+import base64
+import logging
+import re
+import threading
+import time
+
+# Constants
+MAX_BODY_BYTES = 1024 * 1024
+POLL_INTERVAL = 0.25
+
+# The request that creates each platform's post, the post ID in its
+# response (body, URL or headers) and the public URL built from that ID.
+# These follow the platforms' web clients and need updating when those
+# change; mock_sites.py answers the same paths with the same shapes.
+RESULT_PATTERNS = {
+    "youtube": {"response": r"/youtubei/v1/upload/createvideo", "id": r'"videoId"\s*:\s*"([\w-]{11})"',
+                "url": "https://www.youtube.com/watch?v={id}"},
+    "tiktok": {"response": r"/tiktok/web/project/post/", "id": r'"item_id"\s*:\s*"(\d+)"',
+               "url": "https://m.tiktok.com/v/{id}.html"},
+    "instagram": {"response": r"/api/v1/media/configure", "id": r'"code"\s*:\s*"([\w-]+)"',
+                  "url": "https://www.instagram.com/reel/{id}/"},
+    "x": {"response": r"/CreateTweet", "id": r'"rest_id"\s*:\s*"(\d+)"',
+          "url": "https://x.com/i/status/{id}"},
+    "linkedin": {"response": r"/voyager/api/contentcreation/normShares", "id": r"(urn:li:(?:share|activity|ugcPost):\d+)",
+                 "url": "https://www.linkedin.com/feed/update/{id}/"},
+    "snapchat": {"response": r"/spotlight/submit", "id": r'"(?:snapId|storyId|spotlightId)"\s*:\s*"([\w-]+)"',
+                 "url": "https://www.snapchat.com/spotlight/{id}"},
+}
+
+# Fallback when there is no BiDi connection: wraps fetch and XMLHttpRequest
+# in the page and keeps the bodies of responses whose URL matches a pattern.
+# Only requests made after the hook is installed are seen.
+HOOK_SCRIPT = """
+const patterns = arguments[0].map(pattern => new RegExp(pattern));
+if (window.__upsCapture) { return; }
+window.__upsCapture = [];
+const keep = (url, body) => {
+    if (url && patterns.some(pattern => pattern.test(url))) {
+        window.__upsCapture.push({url: String(url), body: String(body || '').slice(0, %d)});
+    }
+};
+const originalFetch = window.fetch;
+window.fetch = function(...args) {
+    return originalFetch.apply(this, args).then(response => {
+        if (patterns.some(pattern => pattern.test(response.url))) {
+            response.clone().text().then(body => keep(response.url, body), () => {});
+        }
+        return response;
+    });
+};
+const originalOpen = XMLHttpRequest.prototype.open;
+XMLHttpRequest.prototype.open = function(method, url, ...rest) {
+    this.__upsUrl = url;
+    return originalOpen.call(this, method, url, ...rest);
+};
+const originalSend = XMLHttpRequest.prototype.send;
+XMLHttpRequest.prototype.send = function(...args) {
+    this.addEventListener('load', () => {
+        try {
+            const body = this.responseType === 'json' ? JSON.stringify(this.response)
+                : (this.responseType === '' || this.responseType === 'text') ? this.responseText : '';
+            keep(this.responseURL || this.__upsUrl, body);
+        } catch (e) {}
+    });
+    return originalSend.apply(this, args);
+};
+""" % MAX_BODY_BYTES
+
+READ_SCRIPT = "return (window.__upsCapture || []).splice(0);"
+
+logger = logging.getLogger(__name__)
+
+def _command(method, params):
+    """A BiDi command in the generator form selenium's WebSocketConnection.execute expects."""
+    result = yield {"method": method, "params": params}
+    return result
+
+class _ResponseCompleted:
+    event_class = "network.responseCompleted"
+
+    @classmethod
+    def from_json(cls, params):
+        return params
+
+def bidi_connection(driver):
+    """Return the driver's BiDi WebSocket connection, or None when the session has none."""
+    if not (getattr(driver, "caps", None) or {}).get("webSocketUrl"):
+        return None
+    try:
+        if not getattr(driver, "_websocket_connection", None):
+            driver._start_bidi()
+        connection = driver._websocket_connection
+        if not getattr(driver, "ups_bidi_network", False):
+            connection.execute(_command("session.subscribe", {"events": [_ResponseCompleted.event_class]}))
+            try:
+                # Keeps response bodies retrievable with network.getData (recent Firefox only)
+                connection.execute(_command("network.addDataCollector",
+                                            {"dataTypes": ["response"], "maxEncodedDataSize": MAX_BODY_BYTES}))
+                driver.ups_bidi_bodies = True
+            except Exception as e:
+                logger.debug(f"BiDi response bodies unavailable, matching on URLs and headers: {e}")
+                driver.ups_bidi_bodies = False
+            driver.ups_bidi_network = True
+        return connection
+    except Exception as e:
+        logger.debug(f"No BiDi connection: {e}")
+        return None
+
+class ResultCapture:
+    """Pick up the URL of a new post from the responses the platform's page receives.
+
+    arm() starts listening, before the action that creates the post; url()
+    then returns the post's URL, or None if no matching response arrived in
+    time. Responses are read from BiDi network events when the session has a
+    BiDi connection and from an in-page fetch/XHR hook otherwise, so no page
+    has to be loaded to find the result. Only the tab current at arm() is
+    watched. url() can be called again, e.g. by a retried step; close()
+    stops listening once the flow is over.
+    """
+
+    def __init__(self, driver, platform):
+        self.driver = driver
+        self.platform = platform
+        self.pattern = RESULT_PATTERNS[platform]
+        self._response = re.compile(self.pattern["response"])
+        self._id = re.compile(self.pattern["id"])
+        self._lock = threading.Lock()
+        self._responses = []
+        self._connection = None
+        self._callback_id = None
+        self._context = None
+        self.found = None
+
+    def arm(self):
+        """Start capturing; safe to call again, e.g. when a step is retried."""
+        if self.found:
+            return self
+        try:
+            self._context = self.driver.current_window_handle
+            self.driver.execute_script(HOOK_SCRIPT, [self.pattern["response"]])
+        except Exception as e:
+            logger.debug(f"[{self.platform}] Could not install the response hook: {e}")
+        if self._callback_id is None:
+            self._connection = bidi_connection(self.driver)
+            if self._connection:
+                try:
+                    self._callback_id = self._connection.add_callback(_ResponseCompleted, self._on_response)
+                except Exception as e:
+                    logger.debug(f"[{self.platform}] Could not listen for BiDi network events: {e}")
+                    self._connection = None
+        return self
+
+    def _on_response(self, params):
+        # Runs on the WebSocket reader thread; bodies are fetched later from the caller's thread
+        if self._context and params.get("context") not in (None, self._context):
+            return
+        url = params.get("response", {}).get("url") or params.get("request", {}).get("url", "")
+        if not self._response.search(url):
+            return
+        headers = " ".join(f"{header.get('name')}: {header.get('value', {}).get('value', '')}"
+                           for header in params.get("response", {}).get("headers", []))
+        with self._lock:
+            self._responses.append((params.get("request", {}).get("request"), url, headers))
+
+    def _body(self, request_id):
+        if not request_id or not getattr(self.driver, "ups_bidi_bodies", False):
+            return ""
+        try:
+            data = self._connection.execute(_command("network.getData", {"dataType": "response", "request": request_id}))
+        except Exception as e:
+            logger.debug(f"[{self.platform}] Could not read response body of {request_id}: {e}")
+            return ""
+        value = data.get("bytes", {})
+        if value.get("type") == "base64":
+            return base64.b64decode(value.get("value", "")).decode("utf-8", errors="replace")
+        return value.get("value", "")
+
+    def _match(self, *texts):
+        for text in texts:
+            match = self._id.search(text or "")
+            if match:
+                return self.pattern["url"].format(id=match.group(1))
+        return None
+
+    def _poll(self):
+        with self._lock:
+            responses, self._responses = self._responses, []
+        for request_id, url, headers in responses:
+            found = self._match(url, headers) or self._match(self._body(request_id))
+            if found:
+                return found
+        try:
+            captured = self.driver.execute_script(READ_SCRIPT) or []
+        except Exception:
+            captured = []
+        for entry in captured:
+            found = self._match(entry.get("url"), entry.get("body"))
+            if found:
+                return found
+        return None
+
+    def url(self, timeout=5):
+        """Return the captured post URL, waiting up to timeout seconds for the response."""
+        deadline = time.monotonic() + timeout
+        while not self.found:
+            self.found = self._poll()
+            if self.found or time.monotonic() >= deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+        if self.found:
+            logger.info(f"[{self.platform}] Captured post URL from the network: {self.found}")
+        else:
+            logger.warning(f"[{self.platform}] No post ID in the captured responses")
+        return self.found
+
+    def close(self):
+        """Stop listening for BiDi network events; safe to call more than once."""
+        if self._connection and self._callback_id is not None:
+            try:
+                self._connection.remove_callback(_ResponseCompleted, self._callback_id)
+            except Exception:
+                pass
+            self._callback_id = None
@@ -0,0 +1,312 @@
+import os
+import argparse
+import bisect
+import itertools
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future
+
+from ledger import DEFAULT_ACCOUNT
+from metadata import load_metadata
+from tracing import span
+
+# Constants
+DEFAULT_WORKERS = 3  # Browsers to run at once when no pool is given
+DEFAULT_PRIORITY = 0  # Higher runs first; ties run in submission order
+
+# Posting cadence per platform as token buckets: "per_hour" uploads refill
+# the platform-wide bucket, which holds at most "burst"; "account_per_hour"
+# and "account_burst" do the same for each account on the platform. A job
+# needs a token from both buckets. Override or extend with UPS_RATE_LIMITS:
+#   {"youtube": {"account_per_hour": 2}, "x": {"per_hour": 300}}
+RATE_LIMITS = {
+    "youtube": {"per_hour": 60, "burst": 10, "account_per_hour": 6, "account_burst": 3},
+    "tiktok": {"per_hour": 30, "burst": 5, "account_per_hour": 4, "account_burst": 2},
+    "instagram": {"per_hour": 30, "burst": 5, "account_per_hour": 5, "account_burst": 2},
+    "x": {"per_hour": 120, "burst": 20, "account_per_hour": 20, "account_burst": 5},
+    "linkedin": {"per_hour": 30, "burst": 5, "account_per_hour": 3, "account_burst": 1},
+    "snapchat": {"per_hour": 30, "burst": 5, "account_per_hour": 4, "account_burst": 2},
+}
+for _platform, _limits in json.loads(os.environ.get("UPS_RATE_LIMITS") or "{}").items():
+    RATE_LIMITS[_platform] = dict(RATE_LIMITS.get(_platform, {}), **_limits)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Up to burst tokens, refilled continuously at per_hour tokens an hour.
+
+    Not thread-safe on its own; the Scheduler only touches buckets under its lock.
+    """
+
+    def __init__(self, per_hour, burst=1):
+        self.rate = per_hour / 3600
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        # A now taken before the bucket was created must not drain it
+        if now <= self.updated:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available; 0 if one is available now."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+class Job:
+    """One upload of a video to a platform as an account, and its progress."""
+
+    def __init__(self, seq, video_path, platform, metadata, account=DEFAULT_ACCOUNT, priority=DEFAULT_PRIORITY,
+                 job_id=None):
+        self.seq = seq
+        self.job_id = job_id  # ID of the job in a JobQueue, if it came from one
+        self.video_path = video_path
+        self.platform = platform
+        self.metadata = metadata
+        self.account = account
+        self.priority = priority
+        self.state = QUEUED
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.future = Future()
+
+    @property
+    def key(self):
+        return (-self.priority, self.seq)
+
+    def result(self, timeout=None):
+        """Wait for the job and return its AllInOne result record."""
+        return self.future.result(timeout)
+
+def run_upload(job, pool=None):
+    """Execute a job with the AllInOne uploaders and return its result record."""
+    import AllInOne
+
+    if pool:
+        return AllInOne.run_platform_upload(job.platform, job.video_path, job.metadata, pool=pool, account=job.account)
+    return AllInOne.run_platform_upload(job.platform, job.video_path, job.metadata, account=job.account)
+
+class Scheduler:
+    """Run upload jobs on a fixed set of browser workers within each platform's posting cadence.
+
+    Jobs go out by priority, then submission order, but a job whose
+    platform or account bucket is empty is passed over for the next one
+    that can run, so a free worker only waits when no queued job can start.
+
+    Accounts run on the browser pool mapped to them in ``pools`` (each
+    account needs its own logged-in session), and other accounts on
+    ``pool``. Each pool gets as many workers as it has browsers. Without any
+    pool, ``workers`` jobs run at once, each in a freshly launched browser.
+    ``executor(job, pool)`` must return a dict like
+    AllInOne.run_platform_upload; uploads that were skipped, rejected or
+    blocked by a circuit breaker before reaching the platform give their
+    tokens back. Finished jobs are kept for jobs() unless retain is off,
+    as a long-running caller that tracks its own jobs would want.
+    """
+
+    def __init__(self, pool=None, pools=None, workers=DEFAULT_WORKERS, executor=run_upload, rate_limits=None,
+                 retain=True):
+        self.pool = pool
+        self.retain = retain
+        self.pools = dict(pools or {})
+        self.executor = executor
+        self.rate_limits = RATE_LIMITS if rate_limits is None else rate_limits
+        self._capacity = {}
+        for lane_pool in [pool, *self.pools.values()]:
+            if lane_pool is not None:
+                self._capacity[id(lane_pool)] = lane_pool.size
+        if not self._capacity:
+            self._capacity[id(None)] = workers
+        self._busy = dict.fromkeys(self._capacity, 0)
+        self._buckets = {}
+        self._queue = []  # (key, job), sorted
+        self._jobs = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._accepting = True
+        self._stopping = False
+
+    def _lane(self, account):
+        return id(self.pools.get(account, self.pool))
+
+    def _bucket(self, platform, account=None):
+        key = (platform, account)
+        if key not in self._buckets:
+            limits = self.rate_limits.get(platform) or {}
+            if account is None:
+                per_hour, burst = limits.get("per_hour"), limits.get("burst", 1)
+            else:
+                per_hour, burst = limits.get("account_per_hour"), limits.get("account_burst", 1)
+            self._buckets[key] = TokenBucket(per_hour, burst) if per_hour is not None else None
+        return self._buckets[key]
+
+    def _buckets_for(self, job):
+        return [bucket for bucket in (self._bucket(job.platform), self._bucket(job.platform, job.account)) if bucket]
+
+    def submit(self, video_path, platform, metadata, account=DEFAULT_ACCOUNT, priority=DEFAULT_PRIORITY, job_id=None):
+        """Queue an upload and return its Job."""
+        if self._lane(account) not in self._capacity:
+            raise ValueError(f"No browser pool for account {account!r}")
+        job = Job(next(self._seq), os.path.abspath(video_path), platform, metadata, account, priority, job_id)
+        with self._cond:
+            if not self._accepting:
+                raise RuntimeError("Scheduler is shutting down")
+            bisect.insort(self._queue, (job.key, job))
+            self._jobs.append(job)
+            self._cond.notify_all()
+        return job
+
+    def jobs(self):
+        with self._cond:
+            return list(self._jobs)
+
+    def start(self):
+        """Start one worker thread per browser slot."""
+        for _ in range(sum(self._capacity.values())):
+            thread = threading.Thread(target=self._worker, name=f"scheduler-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        logger.info(f"Scheduler started with {len(self._threads)} workers")
+        return self
+
+    def _next_job(self):
+        """Block until a queued job can start on a free browser; None once the scheduler stops."""
+        with self._cond:
+            while True:
+                if self._stopping or (not self._accepting and not self._queue):
+                    return None
+                now = time.monotonic()
+                wait = math.inf
+                for index, (_, job) in enumerate(self._queue):
+                    lane = self._lane(job.account)
+                    if self._busy[lane] >= self._capacity[lane]:
+                        continue
+                    buckets = self._buckets_for(job)
+                    job_wait = max((bucket.wait_time(now) for bucket in buckets), default=0.0)
+                    if job_wait > 0:
+                        wait = min(wait, job_wait)
+                        continue
+                    for bucket in buckets:
+                        bucket.take(now)
+                    del self._queue[index]
+                    self._busy[lane] += 1
+                    job.state = RUNNING
+                    job.started = now
+                    return job
+                # Woken early by submissions and finished jobs, which can change what is runnable
+                self._cond.wait(None if wait == math.inf else wait)
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if not job:
+                return
+            self._run(job)
+
+    def _run(self, job):
+        pool = self.pools.get(job.account, self.pool)
+        queued = job.started - job.submitted
+        logger.info(f"[{job.platform}] Starting {job.account} upload of {job.video_path} "
+                    f"(priority {job.priority}, queued {queued:.1f}s)")
+        with span("job", platform=job.platform, account=job.account, priority=job.priority,
+                  queued_ms=round(queued * 1000, 1)) as trace:
+            try:
+                result = self.executor(job, pool)
+            except Exception as e:
+                result = {"platform": job.platform, "ok": False, "result": None, "error": str(e)}
+            trace.set(ok=result["ok"])
+        with self._cond:
+            if result.get("skipped") or result.get("rejected") or result.get("blocked"):
+                for bucket in self._buckets_for(job):
+                    bucket.refund()
+            self._busy[self._lane(job.account)] -= 1
+            job.state = DONE if result["ok"] else FAILED
+            job.finished = time.monotonic()
+            if not self.retain:
+                self._jobs.remove(job)
+            self._cond.notify_all()
+        job.future.set_result(result)
+
+    def wait(self):
+        """Block until every job submitted so far has finished."""
+        for job in self.jobs():
+            job.future.result()
+
+    def shutdown(self, cancel_pending=False):
+        """Stop taking jobs and wait for the workers to exit.
+
+        Queued jobs still run unless cancel_pending is set, in which case
+        they are cancelled and only the running ones finish.
+        """
+        with self._cond:
+            self._accepting = False
+            if cancel_pending:
+                self._stopping = True
+                cancelled, self._queue = self._queue, []
+                for _, job in cancelled:
+                    job.state = CANCELLED
+                    job.future.cancel()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload a video for many accounts within each platform's posting cadence")
+    parser.add_argument("video_path")
+    parser.add_argument("metadata_path")
+    parser.add_argument("--platforms", nargs="+", help="Defaults to every AllInOne platform")
+    parser.add_argument("--accounts", nargs="+", default=[f"{DEFAULT_ACCOUNT}="],
+                        help="account=profile_path pairs; an empty path uses the default session")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="browsers per account")
+    parser.add_argument("--priority", type=int, default=DEFAULT_PRIORITY)
+    args = parser.parse_args()
+
+    import AllInOne
+    from sessions import check_sessions
+
+    platforms = args.platforms or list(AllInOne.PLATFORM_UPLOADERS)
+    pools = {}
+    for pair in args.accounts:
+        account, _, profile_path = pair.partition("=")
+        pools[account] = AllInOne.create_browser_pool(profile_path or AllInOne.WORKER_PROFILE_PATH,
+                                                      size=args.workers).start()
+    for pool in pools.values():
+        # Warm the session cache so signed-out jobs are held back without waiting on a check
+        check_sessions(pool.profile_path, platforms)
+    scheduler = Scheduler(pools=pools).start()
+    try:
+        metadata = load_metadata(args.metadata_path)
+        for account in pools:
+            for platform in platforms:
+                scheduler.submit(args.video_path, platform, metadata, account, args.priority)
+        scheduler.shutdown()
+    finally:
+        for pool in pools.values():
+            pool.close()
+    for job in scheduler.jobs():
+        result = job.result()
+        detail = result["result"] if result["ok"] else result["error"]
+        logger.info(f"  {job.platform:<10} {job.account:<12} {job.state:<8} {detail or ''}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,136 @@
+import os
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from failures import on_login_page
+from http_upload import ConnectionPool, load_profile_cookies
+from profiles import PLATFORM_DOMAINS
+from tracing import span
+
+# Constants
+SESSION_TTL = float(os.environ.get("UPS_SESSION_TTL", 300))  # Seconds a login check stays valid
+SESSION_PROBE = os.environ.get("UPS_SESSION_PROBE", "1") != "0"  # Also ask the platform, not just the cookie jar
+PROBE_TIMEOUT = 10
+PROBE_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+
+# Cookies that only exist while an account is signed in; any one of them will do
+SESSION_COOKIES = {
+    "youtube": ["SAPISID", "__Secure-3PSID", "SID"],
+    "tiktok": ["sessionid", "sessionid_ss", "sid_tt"],
+    "instagram": ["sessionid"],
+    "x": ["auth_token"],
+    "linkedin": ["li_at"],
+    "snapchat": ["__Host-sc-a-auth-session", "sc-a-session"],
+}
+
+# Pages that redirect to the platform's sign-in page (see failures.LOGIN_PAGES)
+# or answer 401/403 when the session is no longer valid. X serves the same
+# page either way, so only its cookie is checked.
+PROBE_URLS = {
+    "youtube": "https://studio.youtube.com/",
+    "tiktok": "https://www.tiktok.com/tiktokstudio/upload",
+    "instagram": "https://www.instagram.com/accounts/edit/",
+    "linkedin": "https://www.linkedin.com/feed/",
+    "snapchat": "https://my.snapchat.com/",
+}
+
+logger = logging.getLogger(__name__)
+
+_cache = {}
+_cache_lock = threading.Lock()
+_connections = ConnectionPool(timeout=PROBE_TIMEOUT)
+
+def _probe(platform, cookies):
+    """Ask the platform whether the cookies are still signed in; returns a problem, or None if they are or it is unclear."""
+    url = PROBE_URLS.get(platform)
+    if not url:
+        return None
+    headers = {"Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items()),
+               "User-Agent": PROBE_USER_AGENT}
+    try:
+        status, response_headers, _ = _connections.request("GET", url, headers=headers)
+    except Exception as e:
+        logger.debug(f"[{platform}] Session probe failed, trusting the cookies: {e}")
+        return None
+    if status in (401, 403):
+        return f"{url} answered {status}"
+    if 300 <= status < 400 and on_login_page(platform, response_headers.get("location")):
+        return f"{url} redirects to the sign-in page"
+    return None
+
+def check_session(profile_path, platform, probe=SESSION_PROBE):
+    """Return whether the profile is signed in to the platform, as {"ok", "reason", "checked_at"}.
+
+    The profile's cookie jar is read for the platform's session cookies and,
+    with probe set, a page that needs a session is requested with them.
+    "ok" is None when the cookies cannot be read at all. Results are cached
+    for SESSION_TTL seconds.
+    """
+    key = (os.path.abspath(profile_path), platform, probe)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached and now - cached["checked_at"] < SESSION_TTL:
+        return cached
+    with span("session", platform=platform, probe=probe) as trace:
+        status = {"platform": platform, "ok": True, "reason": None, "checked_at": now}
+        try:
+            cookies = load_profile_cookies(profile_path, platform)
+        except Exception as e:
+            logger.warning(f"[{platform}] Could not read the session cookies of {profile_path}: {e}")
+            status.update(ok=None, reason=f"cookies unreadable: {e}")
+            cookies = None
+        if cookies is not None:
+            if not any(name in cookies for name in SESSION_COOKIES[platform]):
+                status.update(ok=False, reason=f"no session cookie for {', '.join(PLATFORM_DOMAINS[platform])}")
+            elif probe:
+                problem = _probe(platform, cookies)
+                if problem:
+                    status.update(ok=False, reason=problem)
+        trace.set(ok=status["ok"])
+    with _cache_lock:
+        _cache[key] = status
+    return status
+
+def check_sessions(profile_path, platforms=None, probe=SESSION_PROBE):
+    """Check the profile's login state on every platform in parallel; returns {platform: status}."""
+    platforms = list(platforms or SESSION_COOKIES)
+    with ThreadPoolExecutor(max_workers=len(platforms), thread_name_prefix="session") as executor:
+        statuses = dict(zip(platforms, executor.map(lambda platform: check_session(profile_path, platform, probe),
+                                                    platforms)))
+    dead = [f"{platform} ({status['reason']})" for platform, status in statuses.items() if status["ok"] is False]
+    if dead:
+        logger.warning(f"Signed out of {', '.join(dead)}; those uploads will be held back")
+    return statuses
+
+def session_problem(profile_path, platform):
+    """Return why the profile cannot upload to the platform, or None if it is signed in or it is unknown."""
+    if not profile_path:
+        return None
+    status = check_session(profile_path, platform)
+    return status["reason"] if status["ok"] is False else None
+
+def forget(profile_path=None, platform=None):
+    """Drop cached results, e.g. after signing in again; all of them by default."""
+    with _cache_lock:
+        for key in list(_cache):
+            if (profile_path is None or key[0] == os.path.abspath(profile_path)) and platform in (None, key[1]):
+                del _cache[key]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check which platforms a Firefox profile is signed in to")
+    parser.add_argument("profile_path")
+    parser.add_argument("--platforms", nargs="+", choices=sorted(SESSION_COOKIES))
+    parser.add_argument("--no-probe", action="store_true", help="only look at the cookies")
+    args = parser.parse_args()
+
+    for platform, status in check_sessions(args.profile_path, args.platforms, probe=not args.no_probe).items():
+        state = {True: "OK", False: "SIGNED OUT", None: "UNKNOWN"}[status["ok"]]
+        logger.info(f"  {platform:<10} {state:<10} {status['reason'] or ''}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
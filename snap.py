@@ -1,12 +1,15 @@
-import time
 import logging
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.firefox import GeckoDriverManager
+from launcher import build_options, start_firefox
+from ledger import already_published, record_published
+from metadata import load_metadata
+from text_entry import enter_text
+from locators import locate, union_xpath
+from preflight import preflight
+from readiness import wait_until_ready
+from dom_watch import wait_for_selector
+from result_capture import ResultCapture
+from delays import pause
+from transcode import cached_rendition
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,86 +17,86 @@ logger = logging.getLogger(__name__)
 
 def setup_firefox_profile(profile_path):
     logger.info(f"Setting up Firefox profile from {profile_path}")
-    options = Options()
-    options.add_argument("-profile")
-    options.add_argument(profile_path)
-    service = Service(GeckoDriverManager().install())
-    driver = webdriver.Firefox(service=service, options=options)
+    options = build_options(profile_path, platform="snapchat")
+    driver = start_firefox(options)
     logger.info("Firefox browser initialized with custom profile")
     return driver
 
-def read_description(file_path):
-    logger.info(f"Reading description from {file_path}")
-    with open(file_path, 'r', encoding='utf-8') as file:
-        description = file.readline().strip()
-    logger.info(f"Description read: {description[:50]}...")
-    return description
-
 def upload_video(driver, video_path, description):
     logger.info("Starting Snapchat upload process")
+    video_path = cached_rendition(video_path, "snapchat") or video_path
+    capture = ResultCapture(driver, "snapchat")
     
     try:
         driver.get('https://my.snapchat.com/')
         logger.info("Navigated to Snapchat")
 
-        file_input = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='file'][accept='video/mp4,video/quicktime,video/webm,image/jpeg,image/png']"))
-        )
+        file_input = locate(driver, "snapchat", "file_input", 10)
         file_input.send_keys(video_path)
         logger.info("Video file uploaded")
-        time.sleep(10)
+        wait_until_ready(driver, "snapchat", "media_processed")
 
-        post_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/div/main/div[2]/div[2]/div[2]/div[5]/div[1]/div[1]/div/div[2]/div/div/div/div[1]/div/div/div/div[1]"))
-        )
+        post_button = locate(driver, "snapchat", "post_option", 10, clickable=True)
+        pause("click", "snapchat")
         post_button.click()
         logger.info("Clicked post button")
 
-        description_textarea = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//textarea[@placeholder='Add a description and #topics']"))
-        )
-        description_textarea.send_keys(description)
+        description_textarea = locate(driver, "snapchat", "caption", 10)
+        enter_text(driver, description_textarea, description, "snapchat", "caption", clear=True)
         logger.info("Added description")
 
-        agree_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Agree to Spotlight Terms')]"))
-        )
+        agree_button = locate(driver, "snapchat", "agree_terms", 10, clickable=True)
+        pause("click", "snapchat")
         agree_button.click()
         logger.info("Agreed to Spotlight Terms")
 
-        accept_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/div[2]/div/div[2]/div/div[2]/div[3]/div/button[2]"))
-        )
+        accept_button = locate(driver, "snapchat", "accept_terms", 10, clickable=True)
+        pause("click", "snapchat")
         accept_button.click()
         logger.info("Accepted terms")
 
-        post_final_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Post to Snapchat')]"))
-        )
+        post_final_button = locate(driver, "snapchat", "publish", 10, clickable=True)
+        capture.arm()
+        pause("click", "snapchat")
         post_final_button.click()
         logger.info("Clicked final post button")
 
-        WebDriverWait(driver, 120).until(
-            EC.presence_of_element_located((By.XPATH, "//div[text()='Yay! Your post is now live!']"))
-        )
+        wait_for_selector(driver, xpath=union_xpath("snapchat", "success"), timeout=120, name="success")
         logger.info("Upload success message detected")
+        return capture.url() or True
 
     except Exception as e:
         logger.error(f"An error occurred during Snapchat upload: {e}")
         raise
+    finally:
+        capture.close()
 
-def main(profile_path, video_path, metadata_path):
+def main(profile_path, video_path, metadata_path, pool=None):
     logger.info("Starting main process")
-    description = read_description(metadata_path)
-    driver = setup_firefox_profile(profile_path)
+    description = load_metadata(metadata_path).caption("snapchat")
+    if already_published(video_path, "snapchat"):
+        return
+    if preflight(video_path, "snapchat"):
+        return
+    if pool:
+        logger.info("Borrowing a warm browser from the pool")
+        driver = pool.checkout()
+    else:
+        driver = setup_firefox_profile(profile_path)
 
     try:
-        upload_video(driver, video_path, description)
+        url = upload_video(driver, video_path, description)
+        if url:
+            record_published(video_path, "snapchat", url if isinstance(url, str) else None)
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
     finally:
-        logger.info("Closing the browser")
-        driver.quit()
+        if pool:
+            logger.info("Returning the browser to the pool")
+            pool.checkin(driver, pool.is_healthy(driver))
+        else:
+            logger.info("Closing the browser")
+            driver.quit()
 
 if __name__ == "__main__":
     profile_path = r"C:\Users\user\AppData\Roaming\Mozilla\Firefox\Profiles\me97qgzd.default-release"
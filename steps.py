@@ -0,0 +1,136 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from tracing import span
+
+# Constants
+DEFAULT_STEP_TIMEOUT = 20
+DEFAULT_RETRY_DELAY = 2
+
+logger = logging.getLogger(__name__)
+
+_listener = contextvars.ContextVar("ups_step_listener", default=None)
+
+class StepFailed(Exception):
+    """Raised when a required step runs out of retries."""
+
+    def __init__(self, platform, step, cause):
+        super().__init__(f"[{platform}] Step '{step}' failed: {cause}")
+        self.platform = platform
+        self.step = step
+        self.cause = cause
+
+class Step:
+    """A named unit of an upload flow with its own timeout and retry policy.
+
+    ``func(timeout)`` performs the step on the current page and may return a
+    value, which is kept in the checkpoint under the step name. Optional steps
+    (``required=False``) are logged and skipped when they fail.
+
+    ``ready()``, if given, is a quick non-blocking check that the step would
+    not have to wait, e.g. that the platform finished processing. step_runner
+    uses it to hand control to other flows until the step can run.
+    """
+
+    def __init__(self, name, func, timeout=DEFAULT_STEP_TIMEOUT, retries=0,
+                 retry_delay=DEFAULT_RETRY_DELAY, required=True, ready=None):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.required = required
+        self.ready = ready
+
+@contextmanager
+def step_listener(callback):
+    """Report the steps run in the enclosed block as callback(platform, step_name, event).
+
+    event is "started", "done" or "failed". Callback errors are logged and
+    never break the flow.
+    """
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+def _notify(platform, step, event):
+    callback = _listener.get()
+    if callback:
+        try:
+            callback(platform, step.name, event)
+        except Exception as e:
+            logger.debug(f"[{platform}] Step listener failed: {e}")
+
+def new_checkpoint():
+    """Return an empty checkpoint: the completed step names and their results."""
+    return {"done": [], "results": {}}
+
+def run_steps(platform, steps, checkpoint=None):
+    """Run the steps in order, resuming after the last step recorded in checkpoint.
+
+    The checkpoint is updated in place as steps complete, so calling run_steps
+    again with the same checkpoint on the same page picks up at the step that
+    failed instead of starting the flow over. Returns the step results.
+    """
+    if checkpoint is None:
+        checkpoint = new_checkpoint()
+    for step in steps:
+        if step.name in checkpoint["done"]:
+            logger.info(f"[{platform}] Skipping completed step '{step.name}'")
+            continue
+        _run_step(platform, step, checkpoint)
+    return checkpoint["results"]
+
+def step_runner(platform, steps, checkpoint=None):
+    """Run the steps like run_steps, as a generator that yields while the next step is not ready.
+
+    Each yield (of the waiting step's name) lets the caller drive other flows
+    in the meantime; the caller must restore this flow's page, e.g. its tab,
+    before resuming the generator. A step whose ready() is still false after
+    its timeout is run anyway, so it fails or succeeds the usual way. The
+    generator returns the step results.
+    """
+    if checkpoint is None:
+        checkpoint = new_checkpoint()
+    for step in steps:
+        if step.name in checkpoint["done"]:
+            logger.info(f"[{platform}] Skipping completed step '{step.name}'")
+            continue
+        if step.ready:
+            deadline = time.monotonic() + step.timeout
+            while time.monotonic() < deadline and not _is_ready(platform, step):
+                yield step.name
+        _run_step(platform, step, checkpoint)
+    return checkpoint["results"]
+
+def _is_ready(platform, step):
+    try:
+        return bool(step.ready())
+    except Exception as e:
+        logger.debug(f"[{platform}] Readiness check of '{step.name}' failed: {e}")
+        return False
+
+def _run_step(platform, step, checkpoint):
+    results = checkpoint["results"]
+    _notify(platform, step, "started")
+    for attempt in range(step.retries + 1):
+        try:
+            with span("step", step.name, platform, attempt=attempt + 1):
+                results[step.name] = step.func(step.timeout)
+            break
+        except Exception as e:
+            if attempt < step.retries:
+                logger.warning(f"[{platform}] Step '{step.name}' failed (attempt {attempt + 1}), retrying: {e}")
+                time.sleep(step.retry_delay)
+            elif step.required:
+                _notify(platform, step, "failed")
+                raise StepFailed(platform, step.name, e) from e
+            else:
+                logger.warning(f"[{platform}] Optional step '{step.name}' failed, continuing: {e}")
+                results[step.name] = None
+    checkpoint["done"].append(step.name)
+    _notify(platform, step, "done")
@@ -0,0 +1,129 @@
+import pytest
+
+import failures
+from failures import (CLOSED, HALF_OPEN, LOGIN_EXPIRED, MAX_OPEN_SECONDS, OPEN, OPEN_SECONDS, PERMANENT, TRANSIENT,
+                      Breakers, CircuitBreaker, on_login_page)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(failures.time, "monotonic", lambda: clock["now"])
+    return clock
+
+def _open(breaker, kind=TRANSIENT, now=0.0):
+    for _ in range(failures.FAILURE_THRESHOLDS[kind]):
+        breaker.failure(kind, now)
+
+def test_circuit_opens_at_the_threshold_of_its_kind():
+    breaker = CircuitBreaker("x")
+    for _ in range(failures.FAILURE_THRESHOLDS[TRANSIENT] - 1):
+        breaker.failure(TRANSIENT, 0.0)
+    assert breaker.state == CLOSED
+    breaker.failure(TRANSIENT, 0.0)
+    assert (breaker.state, breaker.kind, breaker.open_for) == (OPEN, TRANSIENT, OPEN_SECONDS[TRANSIENT])
+
+def test_open_circuit_refuses_until_its_wait_passes_then_lets_one_probe_through():
+    breaker = CircuitBreaker("x")
+    _open(breaker)
+    assert not breaker.acquire(1.0)
+    assert breaker.retry_in(1.0) == OPEN_SECONDS[TRANSIENT] - 1
+    later = OPEN_SECONDS[TRANSIENT]
+    assert breaker.acquire(later)
+    assert breaker.state == HALF_OPEN
+    assert breaker.retry_in(later) is None
+    assert not breaker.acquire(later)
+
+def test_successful_probe_closes_the_circuit():
+    breaker = CircuitBreaker("x")
+    _open(breaker)
+    breaker.acquire(OPEN_SECONDS[TRANSIENT])
+    breaker.success()
+    assert (breaker.state, breaker.kind, breaker.open_for) == (CLOSED, None, 0)
+    assert breaker.failures[TRANSIENT] == 0
+
+def test_failed_probe_reopens_for_twice_as_long_up_to_the_maximum():
+    breaker = CircuitBreaker("x")
+    _open(breaker, PERMANENT)
+    now = 0.0
+    waits = []
+    for _ in range(6):
+        now += breaker.open_for
+        assert breaker.acquire(now)
+        breaker.failure(PERMANENT, now)
+        waits.append(breaker.open_for)
+    assert waits[0] == 2 * OPEN_SECONDS[PERMANENT]
+    assert waits[-1] == MAX_OPEN_SECONDS
+    assert breaker.state == OPEN
+
+def test_released_probe_can_be_retried():
+    breaker = CircuitBreaker("x")
+    _open(breaker)
+    now = OPEN_SECONDS[TRANSIENT]
+    assert breaker.acquire(now)
+    breaker.release()
+    assert breaker.acquire(now)
+
+def test_login_expired_opens_only_the_account_circuit(clock):
+    breakers = Breakers()
+    assert breakers.acquire("x", "first") is None
+    breakers.record("x", "first", LOGIN_EXPIRED)
+    assert "x/first" in breakers.acquire("x", "first")
+    assert breakers.acquire("x", "second") is None
+    assert breakers.states() == {"x/first": OPEN}
+
+def test_platform_failures_block_every_account(clock):
+    breakers = Breakers()
+    for account in ("first", "second"):
+        assert breakers.acquire("x", account) is None
+        breakers.record("x", account, PERMANENT)
+    assert breakers.states() == {"x": OPEN}
+    assert breakers.blocked("x", "third").startswith("x is open after permanent failures")
+    assert breakers.acquire("tiktok", "third") is None
+
+def test_probe_is_shared_between_accounts(clock):
+    breakers = Breakers()
+    for account in ("first", "second"):
+        breakers.acquire("x", account)
+        breakers.record("x", account, PERMANENT)
+    clock["now"] += OPEN_SECONDS[PERMANENT]
+    assert breakers.acquire("x", "first") is None
+    assert breakers.acquire("x", "second") == "x is being probed"
+    breakers.record("x", "first")
+    assert breakers.states() == {}
+    assert breakers.acquire("x", "second") is None
+
+def test_reset_closes_every_circuit(clock):
+    breakers = Breakers()
+    breakers.acquire("x", "first")
+    breakers.record("x", "first", LOGIN_EXPIRED)
+    breakers.reset()
+    assert breakers.states() == {}
+    assert breakers.acquire("x", "first") is None
+
+@pytest.mark.parametrize("platform, url, expected", [
+    ("youtube", "https://accounts.google.com/v3/signin", True),
+    ("x", "https://x.com/i/flow/login", True),
+    ("linkedin", "https://www.linkedin.com/authwall?trk=", True),
+    ("x", "https://x.com/compose/post", False),
+    ("tiktok", None, False),
+    ("unknown", "https://example.com/login", False),
+])
+def test_on_login_page(platform, url, expected):
+    assert on_login_page(platform, url) is expected
+
+def test_classify():
+    pytest.importorskip("selenium")
+    from http_upload import UploadRejected
+    from locators import LocatorMissing
+    from steps import StepFailed
+
+    class Driver:
+        current_url = "https://www.instagram.com/accounts/login/"
+
+    assert failures.classify("instagram", TimeoutError(), Driver()) == LOGIN_EXPIRED
+    assert failures.classify("x", UploadRejected("413")) == PERMANENT
+    broken = LocatorMissing("no match", "caption", failures.LOCATOR_MISS_STREAK)
+    assert failures.classify("x", StepFailed("x", "fill_caption", broken)) == PERMANENT
+    if failures.LOCATOR_MISS_STREAK > 1:
+        assert failures.classify("x", StepFailed("x", "fill_caption", LocatorMissing("no match", "caption"))) == TRANSIENT
+    assert failures.classify("x", TimeoutError()) == TRANSIENT
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+import http_upload
+from http_upload import ResumableUploader, UploadError, load_endpoints
+from upload_server import UploadServer
+
+@pytest.fixture
+def server():
+    server = UploadServer(("127.0.0.1", 0)).start_background()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(os.urandom(10 * 1024 + 123))
+    return str(path)
+
+def _sha256(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def test_upload_sends_the_file_in_chunks(server, video):
+    result = ResumableUploader(chunk_size=4096).upload(server.init_url, video)
+    assert result["size"] == os.path.getsize(video)
+    assert result["sha256"] == _sha256(video)
+    assert [request[0] for request in server.requests] == ["init", "chunk", "chunk", "chunk"]
+
+def test_upload_resumes_after_dropped_chunks(server, video):
+    server.fail_every = 2
+    result = ResumableUploader(chunk_size=4096, backoff=0).upload(server.init_url, video)
+    assert result["sha256"] == _sha256(video)
+    assert ("query",) in server.requests
+    assert len(server.sessions) == 1
+
+def test_upload_gives_up_after_max_retries(server, video):
+    server.fail_every = 1
+    with pytest.raises(UploadError):
+        ResumableUploader(chunk_size=4096, max_retries=2, backoff=0).upload(server.init_url, video)
+
+def test_saved_session_is_resumed_by_a_new_uploader(server, video, tmp_path):
+    state_path = str(tmp_path / "upload.json")
+    first = ResumableUploader(chunk_size=4096, max_retries=0, backoff=0)
+    server.fail_every = 2
+    with pytest.raises(UploadError):
+        first.upload(server.init_url, video, state_path=state_path)
+    with open(state_path, 'r', encoding='utf-8') as file:
+        session_url = json.load(file)["session_url"]
+    server.fail_every = 0
+    result = ResumableUploader(chunk_size=4096).upload(server.init_url, video, state_path=state_path)
+    assert result["sha256"] == _sha256(video)
+    assert len(server.sessions) == 1
+    assert session_url.endswith(result["upload_id"])
+    assert not os.path.exists(state_path)
+
+def test_saved_session_of_a_changed_file_is_not_resumed(server, video, tmp_path):
+    state_path = str(tmp_path / "upload.json")
+    with open(state_path, 'w', encoding='utf-8') as file:
+        json.dump({"session_url": f"{server.init_url}/stale", "size": 1, "mtime_ns": 0}, file)
+    ResumableUploader(chunk_size=4096).upload(server.init_url, video, state_path=state_path)
+    assert server.requests[0][0] == "init"
+
+def test_upload_for_platform_uses_the_configured_endpoint(server, video, monkeypatch, tmp_path):
+    monkeypatch.setitem(http_upload.HTTP_ENDPOINTS, "youtube", {"init_url": server.init_url, "chunk_size": 4096})
+    monkeypatch.setattr(http_upload.tempfile, "gettempdir", lambda: str(tmp_path))
+    result = http_upload.upload_for_platform("youtube", video, None, account="second")
+    assert result["sha256"] == _sha256(video)
+    assert len([request for request in server.requests if request[0] == "chunk"]) == 3
+    assert os.listdir(tmp_path) == ["video.mp4"]
+
+def test_unreadable_endpoints_file_is_ignored(tmp_path):
+    path = tmp_path / "endpoints.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert load_endpoints(str(path)) == {}
+    assert load_endpoints(str(tmp_path / "missing.json")) == {}
+    path.write_text('{"youtube": {"init_url": "http://127.0.0.1:1/upload/init"}}', encoding="utf-8")
+    assert load_endpoints(str(path)) == {"youtube": {"init_url": "http://127.0.0.1:1/upload/init"}}
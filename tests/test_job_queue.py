@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+import job_queue
+from job_queue import DONE, FAILED, PENDING, RUNNING, JobQueue, drain
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+def test_enqueue_is_idempotent_per_platform_and_account(queue):
+    assert queue.enqueue("a.mp4", "meta.json", ["x", "tiktok"]) == 2
+    assert queue.enqueue("a.mp4", "meta.json", ["x", "tiktok"]) == 0
+    assert queue.enqueue("a.mp4", "meta.json", ["x"], account="second") == 1
+    assert queue.counts() == {PENDING: 3}
+
+def test_claim_takes_the_most_urgent_then_oldest_job(queue):
+    queue.enqueue("a.mp4", "meta.json", ["x"])
+    queue.enqueue("b.mp4", "meta.json", ["x"], priority=5)
+    queue.enqueue("c.mp4", "meta.json", ["x"], priority=5)
+    claimed = [queue.claim()["video_path"] for _ in range(3)]
+    assert [os.path.basename(path) for path in claimed] == ["b.mp4", "c.mp4", "a.mp4"]
+    assert queue.claim() is None
+
+def test_claim_marks_the_job_running_and_owned(queue):
+    queue.enqueue("a.mp4", "meta.json", ["x"])
+    job = queue.claim()
+    assert job["state"] == RUNNING
+    assert job["attempts"] == 1
+    assert job["owner"] == job_queue._owner()
+    assert queue.get(job["id"])["state"] == RUNNING
+
+def test_claim_passes_over_excluded_pairs_and_other_platforms(queue):
+    queue.enqueue("a.mp4", "meta.json", ["x", "tiktok"])
+    queue.enqueue("a.mp4", "meta.json", ["x"], account="second")
+    assert queue.claim(platforms=["linkedin"]) is None
+    job = queue.claim(exclude=[("x", "default"), ("tiktok", "default")])
+    assert (job["platform"], job["account"]) == ("x", "second")
+
+def test_fail_returns_the_job_to_pending_after_the_retry_delay(queue):
+    queue.enqueue("a.mp4", "meta.json", ["x"])
+    job = queue.claim()
+    queue.fail(job["id"], "timeout", delay=60)
+    assert queue.get(job["id"])["state"] == PENDING
+    assert queue.claim() is None
+    assert 0 < queue.retry_wait() <= 60
+    queue.fail(job["id"], "timeout", delay=0)
+    assert queue.claim()["id"] == job["id"]
+
+def test_fail_gives_up_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    queue.enqueue("a.mp4", "meta.json", ["x"])
+    for _ in range(2):
+        job = queue.claim()
+        queue.fail(job["id"], "timeout", delay=0)
+    assert queue.get(job["id"])["state"] == FAILED
+    assert queue.retry_failed() == 1
+    assert queue.claim()["attempts"] == 1
+
+def test_permanent_failure_fails_the_job_at_once(queue):
+    queue.enqueue("a.mp4", "meta.json", ["x"])
+    job = queue.claim()
+    queue.fail(job["id"], "rejected", permanent=True)
+    assert queue.get(job["id"])["state"] == FAILED
+
+def test_defer_does_not_count_the_attempt(queue):
+    queue.enqueue("a.mp4", "meta.json", ["x"])
+    job = queue.claim()
+    queue.defer(job["id"], "circuit open")
+    assert queue.get(job["id"])["attempts"] == 0
+    assert queue.claim()["attempts"] == 1
+
+def _set_running(queue, job_id, owner, updated_at):
+    queue._execute("UPDATE jobs SET state = ?, owner = ?, updated_at = ? WHERE id = ?",
+                   (RUNNING, owner, updated_at, job_id))
+
+def test_recover_returns_jobs_of_dead_owners_and_expired_leases(queue, monkeypatch):
+    queue.enqueue("a.mp4", "meta.json", ["x", "tiktok", "linkedin", "instagram"])
+    jobs = {job["platform"]: job["id"] for job in queue.jobs()}
+    host = job_queue.socket.gethostname()
+    now = time.time()
+    _set_running(queue, jobs["x"], f"{host}:1234567", now)
+    _set_running(queue, jobs["tiktok"], job_queue._owner(), now)
+    _set_running(queue, jobs["linkedin"], "elsewhere:42", now)
+    _set_running(queue, jobs["instagram"], "elsewhere:43", now - 7200)
+    monkeypatch.setattr(job_queue, "_owner_alive", lambda owner: {f"{host}:1234567": False}.get(
+        owner, True if owner == job_queue._owner() else None))
+    assert queue.recover(lease=3600) == 2
+    states = {job["platform"]: job["state"] for job in queue.jobs()}
+    assert states == {"x": PENDING, "tiktok": RUNNING, "linkedin": RUNNING, "instagram": PENDING}
+
+def test_queue_created_without_the_newer_columns_is_upgraded(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, video_path TEXT NOT NULL, "
+                 "metadata_path TEXT NOT NULL, platform TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'pending', "
+                 "attempts INTEGER NOT NULL DEFAULT 0, result_url TEXT, last_error TEXT, "
+                 "created_at REAL NOT NULL, updated_at REAL NOT NULL, UNIQUE (video_path, platform))")
+    conn.execute("INSERT INTO jobs (video_path, metadata_path, platform, created_at, updated_at) "
+                 "VALUES ('/a.mp4', '/meta.json', 'x', 0, 0)")
+    conn.commit()
+    conn.close()
+    queue = JobQueue(path)
+    job = queue.claim()
+    assert (job["account"], job["owner"], job["not_before"]) == ("default", job_queue._owner(), None)
+    queue.close()
+
+def test_drain_retries_failed_jobs_once_their_delay_passes(queue):
+    queue.retry_delay = 0.05
+    queue.enqueue("a.mp4", "meta.json", ["x", "tiktok"])
+    attempts = []
+
+    def executor(job, pool):
+        attempts.append(job["platform"])
+        if job["platform"] == "x" and attempts.count("x") == 1:
+            return {"ok": False, "result": None, "error": "timeout"}
+        return {"ok": True, "result": f"https://example.com/{job['platform']}", "error": None}
+
+    assert drain(queue, executor) == 3
+    assert sorted(attempts) == ["tiktok", "x", "x"]
+    assert queue.counts() == {DONE: 2}
+
+def test_drain_leaves_blocked_pairs_pending(queue):
+    queue.enqueue("a.mp4", "meta.json", ["x"])
+    queue.enqueue("b.mp4", "meta.json", ["x"])
+    calls = []
+
+    def executor(job, pool):
+        calls.append(job["id"])
+        return {"ok": False, "result": None, "error": "circuit open", "blocked": True}
+
+    assert drain(queue, executor) == 0
+    assert len(calls) == 1
+    assert queue.counts() == {PENDING: 2}
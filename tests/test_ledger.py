@@ -0,0 +1,61 @@
+import hashlib
+import os
+
+import pytest
+
+import ledger
+from ledger import Ledger, already_published, hash_file, record_published
+
+@pytest.fixture
+def book(tmp_path, monkeypatch):
+    book = Ledger(str(tmp_path / "ledger.db"))
+    monkeypatch.setattr(ledger, "_ledger", book)
+    yield book
+    book.close()
+
+def _write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+@pytest.mark.parametrize("size", [0, 1, 1000, 3 * 1024 + 7])
+def test_hash_file_matches_hashlib_across_chunks(tmp_path, size):
+    data = os.urandom(size)
+    path = _write(tmp_path / "video.mp4", data)
+    assert hash_file(path, chunk_size=1024) == hashlib.sha256(data).hexdigest()
+
+def test_content_hash_is_cached_until_the_file_changes(book, tmp_path, monkeypatch):
+    path = _write(tmp_path / "video.mp4", b"first")
+    first = book.content_hash(path)
+    hashed = []
+    monkeypatch.setattr(ledger, "hash_file", lambda path: hashed.append(path) or "rehashed")
+    assert book.content_hash(path) == first
+    assert hashed == []
+    _write(tmp_path / "video.mp4", b"second version")
+    assert book.content_hash(path) == "rehashed"
+
+def test_published_videos_are_found_by_content_not_path(book, tmp_path):
+    original = _write(tmp_path / "original.mp4", b"same video")
+    copy = _write(tmp_path / "copy.mp4", b"same video")
+    other = _write(tmp_path / "other.mp4", b"another video")
+    record_published(original, "x", "https://x.com/i/status/1")
+    assert already_published(copy, "x")["url"] == "https://x.com/i/status/1"
+    assert already_published(copy, "x")["video_path"] == original
+    assert already_published(other, "x") is None
+
+def test_published_records_are_per_platform_and_account(book, tmp_path):
+    path = _write(tmp_path / "video.mp4", b"video")
+    record_published(path, "x", "https://x.com/i/status/1", account="first")
+    assert already_published(path, "x", account="second") is None
+    assert already_published(path, "tiktok", account="first") is None
+    record_published(path, "x", "https://x.com/i/status/2", account="first")
+    assert already_published(path, "x", account="first")["url"] == "https://x.com/i/status/2"
+
+def test_ledger_errors_do_not_break_uploads(book, tmp_path):
+    missing = str(tmp_path / "missing.mp4")
+    assert already_published(missing, "x") is None
+    record_published(missing, "x", "https://x.com/i/status/1")
+
+def test_probes_are_stored_by_hash(book):
+    assert book.cached_probe("abc") is None
+    book.store_probe("abc", {"duration": 1.5})
+    assert book.cached_probe("abc") == {"duration": 1.5}
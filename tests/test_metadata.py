@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+import metadata
+from metadata import CAPTION_RULES, ELLIPSIS, LENGTHS, Metadata, load_metadata, parse_metadata, truncate
+
+weighted = LENGTHS["weighted"]
+
+def test_truncate_leaves_text_that_fits():
+    assert truncate("short caption", 13) == "short caption"
+
+def test_truncate_cuts_at_a_word_boundary():
+    assert truncate("the quick brown fox", 12) == "the quick" + ELLIPSIS
+
+def test_truncate_cuts_a_single_long_word():
+    assert truncate("abcdefghij", 5) == "abcd" + ELLIPSIS
+
+def test_truncate_to_nothing():
+    assert truncate("abc def", 1) == ""
+
+def test_x_weights_emoji_and_cjk_as_two():
+    assert weighted("hello") == 5
+    assert weighted("日本") == 4
+    assert weighted("👍") == 2
+    assert weighted("café — “quoted”") == len("café — “quoted”")
+
+def test_weighted_truncation_stays_within_the_x_limit():
+    text = "日本語 " * 100
+    cut = truncate(text, 280, weighted)
+    assert weighted(cut) <= 280
+    assert cut.endswith(ELLIPSIS)
+    assert len(cut) < 280
+
+def test_x_caption_fits_its_weighted_length():
+    meta = Metadata("タイトル " * 10, "説明 " * 200, ["tag1", "tag2"])
+    caption = meta.caption("x")
+    assert weighted(caption) <= CAPTION_RULES["x"]["max_length"]
+    assert caption.endswith(ELLIPSIS + "\n\n#tag1 #tag2")
+
+def test_x_caption_keeps_text_that_only_fits_by_code_points():
+    # 200 code points but 400 weighted: too long for X even though len() fits
+    meta = Metadata("😀" * 200)
+    caption = meta.caption("x")
+    assert weighted(caption) <= 280
+    assert caption.endswith(ELLIPSIS)
+
+def test_snapchat_caption_is_a_single_line_of_at_most_160_characters():
+    meta = Metadata("A title", "First line\nsecond line " + "word " * 100, ["snap", "spotlight"])
+    caption = meta.caption("snapchat")
+    assert len(caption) <= 160
+    assert "\n" not in caption
+    assert caption.startswith("A title First line second line")
+    assert caption.endswith("#snap #spotlight")
+
+def test_hashtags_are_dropped_before_the_title_is_shortened():
+    meta = Metadata("t" * 152, tags=["one", "two"])
+    assert meta.caption("snapchat") == "t" * 152 + " #one"
+    assert Metadata("t" * 170, tags=["one"]).caption("snapchat") == "t" * 159 + ELLIPSIS
+
+def test_youtube_title_is_truncated_and_kept_out_of_the_description():
+    meta = Metadata("word " * 40 + "<b>", "A description", ["tag"])
+    assert len(meta.title_for("youtube")) <= 100
+    assert meta.title_for("youtube").endswith(ELLIPSIS)
+    assert meta.caption("youtube") == "A description\n\n#tag"
+
+def test_youtube_description_is_measured_in_utf8_bytes():
+    meta = Metadata("Title", "é" * 3000)
+    assert len(meta.caption("youtube").encode("utf-8")) <= 5000
+
+def test_instagram_drops_characters_outside_the_bmp():
+    assert Metadata("Launch 🚀 day").caption("instagram") == "Launch day"
+
+def test_hashtag_limits_and_duplicates():
+    meta = Metadata("Title", tags=[f"#tag{n}" for n in range(40)] + ["#TAG1", "bad-tag"])
+    assert len(meta.hashtags("instagram")) == 30
+    assert "#TAG1" not in meta.hashtags("tiktok")
+    assert "#badtag" in meta.hashtags("tiktok")
+
+def test_captions_are_rendered_once(monkeypatch):
+    meta = Metadata("Title")
+    first = meta.render("x")
+    monkeypatch.setattr(meta, "_render", lambda platform: pytest.fail("rendered twice"))
+    assert meta.render("x") is first
+
+def test_parse_metadata_splits_title_description_and_tags():
+    meta = parse_metadata("My title\n\nLine one\nLine two\n#a #b, #c\n")
+    assert meta.title == "My title"
+    assert meta.description == "Line one\nLine two"
+    assert meta.tags == ["a", "b", "c"]
+
+def test_parse_metadata_keeps_a_last_line_that_is_not_all_hashtags():
+    meta = parse_metadata("Title\nUse #tags wisely")
+    assert meta.description == "Use #tags wisely"
+    assert meta.tags == []
+
+def test_load_metadata_reuses_the_parse_until_the_file_changes(tmp_path):
+    path = tmp_path / "video.txt"
+    path.write_text("First\n#one", encoding="utf-8")
+    first = load_metadata(str(path))
+    assert load_metadata(str(path)) is first
+    path.write_text("Second title\n#two", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert load_metadata(str(path)).title == "Second title"
+    assert metadata.load_directory(str(tmp_path))[str(path)].tags == ["two"]
@@ -0,0 +1,105 @@
+import os
+import struct
+
+import pytest
+
+import ledger
+import preflight
+from mp4probe import ProbeError, probe
+from preflight import PLATFORM_LIMITS, check_limits, is_youtube_short
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "3.mp4")
+
+@pytest.fixture(autouse=True)
+def book(tmp_path, monkeypatch):
+    book = ledger.Ledger(str(tmp_path / "ledger.db"))
+    monkeypatch.setattr(ledger, "_ledger", book)
+    yield book
+    book.close()
+
+def _info(**overrides):
+    info = {"size_bytes": 50 * 1024 * 1024, "major_brand": "isom", "duration": 30.0, "width": 1080.0,
+            "height": 1920.0, "rotation": 0, "video_codec": "avc1", "audio_codec": "mp4a", "fps": 30.0,
+            "bitrate_kbps": 13000.0, "faststart": True}
+    info.update(overrides)
+    return info
+
+def test_probe_reads_the_bundled_sample():
+    info = probe(SAMPLE)
+    assert info["size_bytes"] == os.path.getsize(SAMPLE)
+    assert info["major_brand"] == "isom"
+    assert info["duration"] == pytest.approx(24.634)
+    assert (info["width"], info["height"], info["rotation"]) == (576, 1024, 0)
+    assert (info["video_codec"], info["audio_codec"]) == ("avc1", "mp4a")
+    assert info["fps"] == pytest.approx(30.0)
+    assert info["faststart"] is True
+
+def test_probe_rejects_files_without_a_moov_box(tmp_path):
+    path = tmp_path / "not_a_video.mp4"
+    path.write_bytes(struct.pack(">I4s", 16, b"ftyp") + b"isom\0\0\0\0")
+    with pytest.raises(ProbeError):
+        probe(str(path))
+
+def test_probe_rejects_corrupt_box_sizes(tmp_path):
+    path = tmp_path / "corrupt.mp4"
+    path.write_bytes(struct.pack(">I4s", 4, b"ftyp") + b"\0" * 8)
+    with pytest.raises(ProbeError):
+        probe(str(path))
+
+def test_probe_is_cached_by_content_hash(monkeypatch):
+    first = preflight.probe_cached(SAMPLE)
+    monkeypatch.setattr(preflight, "probe", lambda path: pytest.fail("probed twice"))
+    assert preflight.probe_cached(SAMPLE) == first
+
+@pytest.mark.parametrize("platform", sorted(PLATFORM_LIMITS))
+def test_the_bundled_sample_passes_every_platform(platform):
+    assert preflight.preflight(SAMPLE, platform) == []
+
+@pytest.mark.parametrize("platform, overrides, problem", [
+    ("x", {"duration": 141.0}, "duration 141.0s is over 140s"),
+    ("snapchat", {"duration": 4.0}, "duration 4.0s is under 5s"),
+    ("x", {"size_bytes": 600 * 1024 * 1024}, "size 600 MB is over 512 MB"),
+    ("snapchat", {"width": 1920.0, "height": 1080.0}, "aspect ratio 1.78 is over 1.00"),
+    ("linkedin", {"width": 400.0, "height": 1920.0}, "aspect ratio 0.21 is under 0.42"),
+    ("tiktok", {"width": 320.0, "height": 568.0}, "width 320px is under 360px"),
+    ("x", {"width": 1080.0, "height": 2160.0}, "height 2160px is over 1920px"),
+    ("instagram", {"fps": 15.0}, "frame rate 15.0 is under 23"),
+    ("instagram", {"fps": 120.0}, "frame rate 120.0 is over 60"),
+    ("x", {"video_codec": "hvc1"}, "video codec hvc1 is not accepted"),
+    ("x", {"audio_codec": "opus"}, "audio codec opus is not accepted"),
+    ("youtube", {"duration": None}, "duration unknown"),
+    ("youtube", {"width": None, "height": None}, "no video track"),
+])
+def test_check_limits_reports_each_broken_limit(platform, overrides, problem):
+    assert check_limits(_info(**overrides), platform) == [problem]
+
+def test_youtube_is_held_to_its_own_limits_not_the_shorts_ones():
+    long_landscape = _info(duration=3600.0, width=1920.0, height=1080.0, size_bytes=8 * 1024 ** 3)
+    assert check_limits(long_landscape, "youtube") == []
+    assert check_limits(_info(duration=13 * 3600.0), "youtube") == ["duration 46800.0s is over 43200s"]
+
+def test_x_accepts_its_frame_rate_limit_with_rounding():
+    assert check_limits(_info(fps=60.3), "x") == []
+
+def test_rendition_is_checked_against_its_source_duration(tmp_path, monkeypatch):
+    source = tmp_path / "source.mp4"
+    source.write_bytes(b"source")
+    probes = {SAMPLE: probe(SAMPLE), str(source): _info(duration=200.0)}
+    monkeypatch.setattr(preflight, "probe", lambda path: probes[path])
+    assert preflight.preflight(SAMPLE, "x", source=str(source)) == ["duration 200.0s is over 140s"]
+
+def test_unreadable_video_is_rejected(tmp_path):
+    problems = preflight.preflight(str(tmp_path / "missing.mp4"), "x")
+    assert len(problems) == 1 and problems[0].startswith("could not probe video")
+
+def test_youtube_shorts_are_vertical_or_square_and_short(tmp_path, monkeypatch):
+    assert is_youtube_short(SAMPLE)
+    assert not is_youtube_short(str(tmp_path / "missing.mp4"))
+    info = {}
+    monkeypatch.setattr(preflight, "probe_cached", lambda path: info)
+    info.update(_info(duration=181.0))
+    assert not is_youtube_short(SAMPLE)
+    info.update(_info(width=1920.0, height=1080.0))
+    assert not is_youtube_short(SAMPLE)
+    info.update(_info(width=1080.0, height=1080.0, duration=180.0))
+    assert is_youtube_short(SAMPLE)
@@ -0,0 +1,115 @@
+import math
+import threading
+
+import pytest
+
+from scheduler import CANCELLED, DONE, FAILED, Scheduler, TokenBucket
+
+def test_bucket_starts_full_and_empties():
+    bucket = TokenBucket(per_hour=3600, burst=2)
+    now = bucket.updated
+    assert bucket.wait_time(now) == 0.0
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.wait_time(now) == pytest.approx(1.0)
+
+def test_bucket_is_not_drained_by_an_earlier_now():
+    bucket = TokenBucket(per_hour=1, burst=1)
+    assert bucket.wait_time(bucket.updated - 10) == 0.0
+
+def test_bucket_refills_at_its_rate_up_to_its_burst():
+    bucket = TokenBucket(per_hour=3600, burst=2)
+    bucket.updated = 0.0
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.wait_time(0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(1.0) == 0.0
+    bucket.wait_time(100.0)
+    assert bucket.tokens == 2
+
+def test_bucket_refund_is_capped_at_the_burst():
+    bucket = TokenBucket(per_hour=60, burst=1)
+    bucket.refund()
+    assert bucket.tokens == 1
+    bucket.take(bucket.updated)
+    bucket.refund()
+    assert bucket.wait_time(bucket.updated) == 0.0
+
+def test_bucket_without_a_rate_never_refills():
+    bucket = TokenBucket(per_hour=0, burst=0)
+    bucket.take(bucket.updated)
+    assert bucket.wait_time(bucket.updated + 3600) == math.inf
+
+def _scheduler(rate_limits, results=None, workers=1):
+    started = []
+    lock = threading.Lock()
+
+    def executor(job, pool):
+        with lock:
+            started.append((job.platform, job.account, job.video_path.rsplit("/", 1)[-1]))
+        return dict({"platform": job.platform, "ok": True, "result": "url", "error": None},
+                    **(results or {}).get(job.platform, {}))
+
+    return Scheduler(workers=workers, executor=executor, rate_limits=rate_limits), started
+
+def test_jobs_run_by_priority_then_submission_order():
+    scheduler, started = _scheduler({})
+    scheduler.submit("a.mp4", "x", None)
+    scheduler.submit("b.mp4", "x", None, priority=5)
+    scheduler.submit("c.mp4", "x", None)
+    scheduler.start()
+    scheduler.shutdown()
+    assert [name for _, _, name in started] == ["b.mp4", "a.mp4", "c.mp4"]
+
+def test_a_job_with_an_empty_bucket_is_passed_over():
+    scheduler, started = _scheduler({"x": {"per_hour": 1, "burst": 1}})
+    first = scheduler.submit("a.mp4", "x", None, priority=5)
+    held = scheduler.submit("b.mp4", "x", None, priority=5)
+    other = scheduler.submit("c.mp4", "tiktok", None)
+    scheduler.start()
+    first.result(5)
+    other.result(5)
+    assert [name for _, _, name in started] == ["a.mp4", "c.mp4"]
+    assert held.state not in (DONE, FAILED)
+    scheduler.shutdown(cancel_pending=True)
+    assert held.state == CANCELLED
+
+def test_account_buckets_are_separate():
+    scheduler, started = _scheduler({"x": {"account_per_hour": 1, "account_burst": 1}})
+    jobs = [scheduler.submit("a.mp4", "x", None, account=account) for account in ("first", "second", "first")]
+    scheduler.start()
+    jobs[0].result(5)
+    jobs[1].result(5)
+    assert sorted(account for _, account, _ in started) == ["first", "second"]
+    scheduler.shutdown(cancel_pending=True)
+    assert jobs[2].state == CANCELLED
+
+def test_skipped_uploads_give_their_tokens_back():
+    scheduler, started = _scheduler({"x": {"per_hour": 1, "burst": 1}}, {"x": {"skipped": True}})
+    jobs = [scheduler.submit(f"{name}.mp4", "x", None) for name in ("a", "b")]
+    scheduler.start()
+    for job in jobs:
+        assert job.result(5)["skipped"]
+    scheduler.shutdown()
+    assert len(started) == 2
+
+def test_failed_executor_fails_only_its_job():
+    def executor(job, pool):
+        if job.platform == "x":
+            raise RuntimeError("browser crashed")
+        return {"platform": job.platform, "ok": True, "result": None, "error": None}
+
+    scheduler = Scheduler(workers=2, executor=executor, rate_limits={}).start()
+    failed = scheduler.submit("a.mp4", "x", None)
+    done = scheduler.submit("a.mp4", "tiktok", None)
+    scheduler.shutdown()
+    assert failed.result()["error"] == "browser crashed"
+    assert (failed.state, done.state) == (FAILED, DONE)
+
+def test_unknown_account_pool_is_refused():
+    class Pool:
+        size = 1
+
+    scheduler = Scheduler(pools={"first": Pool()}, executor=lambda job, pool: None, rate_limits={})
+    with pytest.raises(ValueError):
+        scheduler.submit("a.mp4", "x", None, account="second")
@@ -0,0 +1,116 @@
+import logging
+import re
+import time
+from selenium.webdriver import ActionChains
+from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import WebDriverException
+from tracing import span
+from delays import pause
+
+# Inserts text into a form field in one step and returns what the field
+# holds afterwards. Methods:
+#   "insert" - document.execCommand('insertText'); fires beforeinput/input
+#              like typing, which React, Draft.js and Polymer all listen to
+#   "value"  - the native value setter plus input/change events, for
+#              <input>/<textarea> whose value React tracks
+#   "paste"  - a synthetic paste event carrying the text, for rich editors
+#              (Draft.js, Lexical) that ignore execCommand
+INSERT_SCRIPT = """
+const [el, text, method, clear] = arguments;
+const isField = el.tagName === 'INPUT' || el.tagName === 'TEXTAREA';
+const read = () => isField ? el.value : el.innerText;
+el.focus();
+if (method === 'value') {
+    const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    const setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+    setter.call(el, clear ? text : el.value + text);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    return read();
+}
+if (isField) {
+    if (clear) { el.select(); } else { el.setSelectionRange(el.value.length, el.value.length); }
+} else {
+    const range = document.createRange();
+    range.selectNodeContents(el);
+    if (!clear) { range.collapse(false); }
+    const selection = window.getSelection();
+    selection.removeAllRanges();
+    selection.addRange(range);
+}
+if (method === 'insert') {
+    document.execCommand('insertText', false, text);
+} else {
+    const data = new DataTransfer();
+    data.setData('text/plain', text);
+    el.dispatchEvent(new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true}));
+}
+return read();
+"""
+
+READ_SCRIPT = """
+const el = arguments[0];
+return el.tagName === 'INPUT' || el.tagName === 'TEXTAREA' ? el.value : el.innerText;
+"""
+
+FIELD_METHODS = ("insert", "value")
+EDITOR_METHODS = ("insert", "paste")
+
+logger = logging.getLogger(__name__)
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", (text or "").replace("\u200b", "").replace("\xa0", " ")).strip()
+
+def _type(driver, element, text, clear):
+    """Type the text key by key, the slow path kept for fields the scripts cannot fill."""
+    if clear:
+        if element.tag_name in ("input", "textarea"):
+            element.clear()
+        else:
+            element.send_keys(Keys.CONTROL, "a")
+            element.send_keys(Keys.DELETE)
+    try:
+        element.send_keys(text)
+    except WebDriverException:
+        ActionChains(driver).move_to_element(element).click().send_keys(text).perform()
+    return driver.execute_script(READ_SCRIPT, element)
+
+def enter_text(driver, element, text, platform="", field="text", clear=False):
+    """Put text into an input, textarea or contenteditable editor and return the method used.
+
+    The insertion scripts are tried in turn and the field's content is read
+    back after each; typing with send_keys is the last resort. With
+    clear=True the field's current content is replaced, otherwise the text
+    is appended. Each field's timing is logged. The delay policy's "type"
+    pause comes first.
+    """
+    pause("type", platform)
+    with span("type", field, platform) as trace:
+        used = _enter_text(driver, element, text, platform, field, clear)
+        trace.set(method=used, chars=len(text))
+    return used
+
+def _enter_text(driver, element, text, platform, field, clear):
+    started = time.monotonic()
+    methods = FIELD_METHODS if element.tag_name in ("input", "textarea") else EDITOR_METHODS
+    # What the field should hold afterwards; a method that leaves it in any
+    # other state is undone by the next one replacing the whole content
+    expected = text if clear else (driver.execute_script(READ_SCRIPT, element) or "") + text
+    used = None
+    for method in methods:
+        try:
+            actual = driver.execute_script(INSERT_SCRIPT, element, text, method, clear)
+        except WebDriverException as e:
+            logger.debug(f"[{platform}] {method} failed for {field}: {e}")
+            continue
+        if _normalize(actual) == _normalize(expected):
+            used = method
+            break
+        text, clear = expected, True
+    if used is None:
+        actual = _type(driver, element, text, clear)
+        used = "keys"
+        if _normalize(actual) != _normalize(expected):
+            logger.warning(f"[{platform}] {field} does not match the intended text after typing")
+    logger.info(f"[{platform}] Entered {field} ({len(text)} chars) via {used} in {(time.monotonic() - started) * 1000:.0f} ms")
+    return used
@@ -0,0 +1,153 @@
+import os
+import atexit
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Constants
+TRACING = os.environ.get("UPS_TRACING", "1") != "0"
+TRACE_FILE = os.environ.get("UPS_TRACE_FILE", "ups_traces.jsonl")
+METRICS_FILE = os.environ.get("UPS_METRICS_FILE", "ups_metrics.prom")
+FLUSH_EVERY = 500  # Spans buffered before they are written out, when no job finishes first
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("ups_span", default=None)
+
+class Span:
+    """One timed operation; spans opened inside it become its children."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "kind", "name", "platform", "attrs", "start", "_started")
+
+    def __init__(self, kind, name, platform, attrs, parent):
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.name = name
+        self.platform = platform or (parent.platform if parent else None)
+        self.attrs = attrs
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    def set(self, **attrs):
+        """Attach attributes discovered while the span runs (e.g. a result URL)."""
+        self.attrs.update(attrs)
+
+class _DisabledSpan:
+    def set(self, **attrs):
+        pass
+
+class Tracer:
+    """Collect finished spans; write them as JSONL and keep Prometheus histograms per platform and span."""
+
+    def __init__(self, trace_file=TRACE_FILE, metrics_file=METRICS_FILE):
+        self.trace_file = trace_file
+        self.metrics_file = metrics_file
+        self._lock = threading.Lock()
+        self._pending = []
+        self._metrics = {}  # (platform, kind, name) -> [bucket counts..., count, sum, errors]
+        self._metrics_dirty = False
+
+    def finish(self, span, duration, error):
+        record = {
+            "trace_id": span.trace_id, "span_id": span.span_id, "parent_id": span.parent_id,
+            "kind": span.kind, "name": span.name, "platform": span.platform,
+            "start": round(span.start, 6), "duration_ms": round(duration * 1000, 3),
+            "status": "error" if error else "ok",
+        }
+        if error:
+            record["error"] = f"{type(error).__name__}: {error}"[:500]
+        if span.attrs:
+            record["attrs"] = span.attrs
+        key = (span.platform or "", span.kind, span.name or "")
+        with self._lock:
+            self._pending.append(record)
+            series = self._metrics.get(key)
+            if series is None:
+                series = self._metrics[key] = [0] * (len(BUCKETS) + 3)
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    series[index] += 1
+            series[-3] += 1
+            series[-2] += duration
+            series[-1] += 1 if error else 0
+            self._metrics_dirty = True
+            flush = span.parent_id is None or len(self._pending) >= FLUSH_EVERY
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Append buffered spans to the trace file and rewrite the metrics file."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            metrics = {key: list(series) for key, series in self._metrics.items()} if self._metrics_dirty else None
+            self._metrics_dirty = False
+        try:
+            if pending and self.trace_file:
+                with open(self.trace_file, 'a', encoding='utf-8') as file:
+                    file.write("".join(json.dumps(record, default=str) + "\n" for record in pending))
+            if metrics is not None and self.metrics_file:
+                partial = f"{self.metrics_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(partial, 'w', encoding='utf-8') as file:
+                    file.write(render_metrics(metrics))
+                os.replace(partial, self.metrics_file)
+        except OSError as e:
+            logger.warning(f"Could not write traces: {e}")
+
+def _escape(value):
+    """Escape a label value as the Prometheus text format requires."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(platform, kind, name, extra=""):
+    return f'platform="{_escape(platform)}",span="{_escape(kind)}",name="{_escape(name)}"{extra}'
+
+def render_metrics(metrics):
+    """Render span histograms in the Prometheus text exposition format."""
+    lines = [
+        "# HELP ups_span_duration_seconds Duration of traced upload operations.",
+        "# TYPE ups_span_duration_seconds histogram",
+    ]
+    for (platform, kind, name), series in sorted(metrics.items()):
+        # Bucket counts are kept cumulative, as the format expects
+        for bound, count in zip(BUCKETS + ("+Inf",), series[:len(BUCKETS)] + [series[-3]]):
+            le = f',le="{bound}"'
+            lines.append(f"ups_span_duration_seconds_bucket{{{_labels(platform, kind, name, le)}}} {count}")
+        lines.append(f"ups_span_duration_seconds_sum{{{_labels(platform, kind, name)}}} {series[-2]:.6f}")
+        lines.append(f"ups_span_duration_seconds_count{{{_labels(platform, kind, name)}}} {series[-3]}")
+    lines += [
+        "# HELP ups_span_errors_total Traced upload operations that raised.",
+        "# TYPE ups_span_errors_total counter",
+    ]
+    for (platform, kind, name), series in sorted(metrics.items()):
+        lines.append(f"ups_span_errors_total{{{_labels(platform, kind, name)}}} {series[-1]}")
+    return "\n".join(lines) + "\n"
+
+tracer = Tracer()
+atexit.register(tracer.flush)
+
+@contextmanager
+def span(kind, name=None, platform=None, **attrs):
+    """Time the enclosed block as a span of the given kind, e.g. span("click", "publish", "x").
+
+    The span nests under the span open in the current thread, inherits its
+    platform, and is marked as an error if the block raises.
+    """
+    if not TRACING:
+        yield _DisabledSpan()
+        return
+    current = Span(kind, name, platform, attrs, _current.get())
+    token = _current.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        tracer.finish(current, time.perf_counter() - current._started, error)
@@ -0,0 +1,226 @@
+import os
+import argparse
+import hashlib
+import json
+import logging
+import math
+import shutil
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ledger import get_ledger
+from tracing import span
+
+# Constants
+FFMPEG = os.environ.get("UPS_FFMPEG") or shutil.which("ffmpeg")
+CACHE_DIR = os.environ.get("UPS_RENDITION_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "ups", "renditions"))
+CACHE_BUDGET_MB = int(os.environ.get("UPS_RENDITION_BUDGET_MB", 20 * 1024))
+TRANSCODE_TIMEOUT = 30 * 60
+
+# Rendition of each platform, made only for sources that break one of its
+# limits (see rendition_reasons). Videos are scaled down to fit a
+# width x height box, turned sideways for landscape sources, keeping their
+# aspect ratio; they are never scaled up, cropped, padded or trimmed.
+# Bitrates are caps; they are lowered further when needed to stay under
+# max_size_mb. Changing a profile changes its cache key, so stale renditions
+# are never reused.
+RENDITION_PROFILES = {
+    "youtube": {"width": 1080, "height": 1920, "max_fps": 60, "video_kbps": 8000, "audio_kbps": 192},
+    "tiktok": {"width": 1080, "height": 1920, "max_fps": 60, "video_kbps": 6000, "audio_kbps": 128,
+               "max_size_mb": 4096},
+    "instagram": {"width": 1080, "height": 1920, "max_fps": 30, "video_kbps": 5000, "audio_kbps": 128,
+                  "max_size_mb": 4096},
+    "snapchat": {"width": 1080, "height": 1920, "max_fps": 30, "video_kbps": 4000, "audio_kbps": 128,
+                 "max_size_mb": 1024},
+    "x": {"width": 1080, "height": 1920, "max_fps": 60, "video_kbps": 5000, "audio_kbps": 128,
+          "max_size_mb": 512},
+    "linkedin": {"width": 1080, "height": 1920, "max_fps": 30, "video_kbps": 5000, "audio_kbps": 128,
+                 "max_size_mb": 5120},
+}
+
+logger = logging.getLogger(__name__)
+
+def profile_key(profile):
+    """Short stable hash of a rendition profile."""
+    return hashlib.sha256(json.dumps(profile, sort_keys=True).encode()).hexdigest()[:12]
+
+def rendition_path(sha256, platform, cache_dir=CACHE_DIR):
+    """Cache location of a source hash rendered with the platform's profile."""
+    return os.path.join(cache_dir, f"{sha256}-{platform}-{profile_key(RENDITION_PROFILES[platform])}.mp4")
+
+def cached_rendition(video_path, platform, cache_dir=CACHE_DIR):
+    """Return the cached rendition of the video for the platform, or None.
+
+    A hit refreshes the file's mtime, which is what eviction orders by.
+    """
+    if platform not in RENDITION_PROFILES:
+        return None
+    try:
+        path = rendition_path(get_ledger().content_hash(video_path), platform, cache_dir)
+        os.utime(path)
+    except (OSError, sqlite3.Error):
+        return None
+    return path
+
+def rendition_reasons(info, platform):
+    """Return the limits the probed source breaks that a rendition fixes; empty when it can go as is.
+
+    Those are its codecs, size, frame rate, bitrate and dimensions. A source
+    that is too long or too short, or has the wrong aspect ratio, is left
+    for preflight to reject.
+    """
+    from preflight import PLATFORM_LIMITS
+
+    profile, limits = RENDITION_PROFILES[platform], PLATFORM_LIMITS[platform]
+    reasons = []
+    for kind in ("video", "audio"):
+        codec = info[f"{kind}_codec"]
+        if codec and f"{kind}_codecs" in limits and codec not in limits[f"{kind}_codecs"]:
+            reasons.append(f"{kind} codec {codec}")
+    max_size_mb = min(profile.get("max_size_mb", math.inf), limits.get("max_size_mb", math.inf))
+    if info["size_bytes"] / (1024 * 1024) > max_size_mb:
+        reasons.append("size")
+    if info["fps"] and info["fps"] > min(profile["max_fps"], limits.get("max_fps", math.inf)) + 0.5:
+        reasons.append("frame rate")
+    if info["bitrate_kbps"] and info["bitrate_kbps"] > profile["video_kbps"] + profile["audio_kbps"]:
+        reasons.append("bitrate")
+    if info["width"] and info["height"] and (info["width"] > limits.get("max_width", math.inf)
+                                             or info["height"] > limits.get("max_height", math.inf)):
+        reasons.append("dimensions")
+    return reasons
+
+def build_command(source, dest, profile, duration=None, threads=0):
+    """Return the ffmpeg command line rendering source into dest with the profile."""
+    long_side, short_side = max(profile["width"], profile["height"]), min(profile["width"], profile["height"])
+    # Fit the box in the source's orientation without scaling up; dimensions stay even for yuv420p
+    scale = (f"scale=w='min(iw,if(gt(iw,ih),{long_side},{short_side}))'"
+             f":h='min(ih,if(gt(iw,ih),{short_side},{long_side}))'"
+             f":force_original_aspect_ratio=decrease:force_divisible_by=2")
+    video_kbps = profile["video_kbps"]
+    if profile.get("max_size_mb") and duration:
+        # Leave ~5% for container overhead
+        budget_kbps = profile["max_size_mb"] * 8 * 1024 * 0.95 / duration
+        video_kbps = int(min(video_kbps, budget_kbps - profile["audio_kbps"]))
+    return [
+        FFMPEG, "-hide_banner", "-loglevel", "error", "-y", "-i", source,
+        "-vf", f"{scale},setsar=1,fps=fps='min(source_fps,{profile['max_fps']})'",
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "high", "-pix_fmt", "yuv420p",
+        "-b:v", f"{video_kbps}k", "-maxrate", f"{video_kbps}k", "-bufsize", f"{video_kbps * 2}k",
+        "-c:a", "aac", "-b:a", f"{profile['audio_kbps']}k", "-ac", "2",
+        "-threads", str(threads), "-movflags", "+faststart", "-f", "mp4", dest,
+    ]
+
+def _render(source, dest, profile, duration, threads):
+    """Run ffmpeg in a pool process; the output appears under dest only when complete."""
+    started = time.monotonic()
+    partial = f"{dest}.{os.getpid()}.part"
+    try:
+        subprocess.run(build_command(source, partial, profile, duration, threads), check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=TRANSCODE_TIMEOUT)
+        os.replace(partial, dest)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg exited with {e.returncode}: {e.stderr.decode(errors='replace').strip()[-500:]}") from None
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return time.monotonic() - started
+
+def prepare_renditions(video_path, platforms=None, max_workers=None, cache_dir=CACHE_DIR):
+    """Render the video for each platform whose limits it breaks and that has no cached rendition yet.
+
+    Missing renditions are rendered in parallel in a process pool sized to
+    the available cores. Returns {platform: rendition path} for every
+    platform whose rendition is available; platforms the source already
+    suits, and platforms that failed, are left out, so their uploads use
+    the source file.
+    """
+    from preflight import probe_cached
+
+    platforms = [platform for platform in (platforms or RENDITION_PROFILES) if platform in RENDITION_PROFILES]
+    try:
+        info = probe_cached(video_path)
+    except Exception as e:
+        logger.warning(f"Could not probe {video_path}, uploading it as is: {e}")
+        return {}
+    renditions = {}
+    missing = []
+    for platform in platforms:
+        path = cached_rendition(video_path, platform, cache_dir)
+        if path:
+            renditions[platform] = path
+            continue
+        reasons = rendition_reasons(info, platform)
+        if reasons:
+            logger.info(f"[{platform}] Source needs a rendition: {', '.join(reasons)}")
+            missing.append(platform)
+    if not missing:
+        return renditions
+    if not FFMPEG:
+        logger.warning("ffmpeg not found; uploading the source file as is")
+        return renditions
+
+    duration = info["duration"]
+    sha256 = get_ledger().content_hash(video_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    cores = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cores, len(missing)))
+    threads = max(1, cores // max_workers)
+    logger.info(f"Rendering {', '.join(missing)} with {max_workers} ffmpeg processes")
+    with span("transcode", ",".join(missing)), ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_render, video_path, rendition_path(sha256, platform, cache_dir),
+                            RENDITION_PROFILES[platform], duration, threads): platform
+            for platform in missing
+        }
+        for future in as_completed(futures):
+            platform = futures[future]
+            try:
+                elapsed = future.result()
+            except Exception as e:
+                logger.error(f"[{platform}] Rendition failed, the source file will be uploaded: {e}")
+                continue
+            renditions[platform] = rendition_path(sha256, platform, cache_dir)
+            logger.info(f"[{platform}] Rendition ready in {elapsed:.1f}s: {renditions[platform]}")
+    evict(keep=set(renditions.values()), cache_dir=cache_dir)
+    return renditions
+
+def evict(budget_mb=CACHE_BUDGET_MB, keep=(), cache_dir=CACHE_DIR):
+    """Delete the least recently used renditions until the cache fits the disk budget."""
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".mp4") and entry.is_file()]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    total = sum(entry.stat().st_size for entry in entries)
+    budget = budget_mb * 1024 * 1024
+    removed = 0
+    for entry in entries:
+        if total <= budget:
+            break
+        if entry.path in keep:
+            continue
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+        logger.info(f"Evicted rendition {entry.name}")
+    return removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Render and cache per-platform versions of a video")
+    parser.add_argument("video_path")
+    parser.add_argument("--platforms", nargs="+", choices=sorted(RENDITION_PROFILES))
+    parser.add_argument("--workers", type=int, help="ffmpeg processes to run at once (default: one per core)")
+    args = parser.parse_args()
+
+    for platform, path in sorted(prepare_renditions(args.video_path, args.platforms, args.workers).items()):
+        logger.info(f"  {platform:<10} {path}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
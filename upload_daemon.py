@@ -0,0 +1,428 @@
+import os
+import argparse
+import collections
+import json
+import logging
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from job_queue import DB_PATH, PENDING, RETRY_DELAY, JobQueue
+from ledger import DEFAULT_ACCOUNT
+from metadata import load_metadata
+from scheduler import DEFAULT_PRIORITY, Scheduler, run_upload
+from steps import step_listener
+
+# Constants
+DEFAULT_HOST = "127.0.0.1"  # The API has no authentication; keep it on the loopback interface
+DEFAULT_PORT = int(os.environ.get("UPS_DAEMON_PORT", 8766))
+DEFAULT_WORKERS = 2  # Warm browsers per account
+DEFER_DELAY = 300  # Seconds before a job held back by a circuit breaker or a signed-out session is tried again
+EVENT_HISTORY = 10000  # Events kept for clients that reconnect with ?since=
+STREAM_HEARTBEAT = 15  # Seconds between keep-alive lines on an idle event stream
+
+logger = logging.getLogger(__name__)
+
+class EventLog:
+    """Numbered job events, kept in memory for streaming to API clients."""
+
+    def __init__(self, history=EVENT_HISTORY):
+        self._events = collections.deque(maxlen=history)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def emit(self, event, job_id=None, **fields):
+        with self._cond:
+            self._seq += 1
+            self._events.append(dict(fields, seq=self._seq, time=time.time(), event=event, job=job_id))
+            self._cond.notify_all()
+
+    def since(self, seq, timeout=None):
+        """Return the events after seq, waiting up to timeout seconds for one if there are none yet."""
+        with self._cond:
+            if timeout and self._seq <= seq and not self.closed:
+                self._cond.wait(timeout)
+            return [event for event in self._events if event["seq"] > seq]
+
+    @property
+    def last(self):
+        with self._cond:
+            return self._seq
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class UploadDaemon:
+    """Keep warm browsers per account and run queued uploads as they are submitted.
+
+    Jobs live in a JobQueue, so nothing is lost across restarts: jobs left
+    pending are scheduled again on start, and jobs a crashed daemon left
+    running are recovered first. A drain stops taking jobs, lets running
+    uploads finish and leaves queued ones pending for the next start.
+    accounts maps each account to the profile with its logged-in sessions.
+    """
+
+    def __init__(self, accounts=None, db_path=DB_PATH, workers=DEFAULT_WORKERS):
+        import AllInOne
+
+        self.accounts = accounts or {DEFAULT_ACCOUNT: AllInOne.WORKER_PROFILE_PATH}
+        self.db_path = db_path
+        self.workers = workers
+        self.events = EventLog()
+        self.queue = None
+        self.pools = {}
+        self.scheduler = None
+        self.started = None
+        self.draining = False
+        self.drained = threading.Event()
+        self._lock = threading.Lock()
+        self._scheduled = set()  # Queue IDs handed to the scheduler and not settled yet
+        self._running = {}  # Queue ID -> {"platform", "account", "step"}
+        self._timers = {}
+
+    def start(self):
+        """Warm every account's browsers and sessions, then schedule the queued jobs."""
+        import AllInOne
+        from sessions import check_sessions
+
+        self.started = time.time()
+        self.queue = JobQueue(self.db_path)
+        for account, profile_path in self.accounts.items():
+            self.pools[account] = AllInOne.create_browser_pool(profile_path, size=self.workers).start()
+            check_sessions(profile_path)
+        self.scheduler = Scheduler(pools=self.pools, executor=self._execute, retain=False).start()
+        self.queue.recover()
+        for job in self.queue.jobs(PENDING):
+            self._schedule(job)
+        logger.info(f"Upload daemon ready with {len(self.pools)} account(s): {self.queue.counts()}")
+        return self
+
+    def submit(self, video_path, metadata_path, platforms=None, account=DEFAULT_ACCOUNT, priority=DEFAULT_PRIORITY):
+        """Queue a video for the platforms and schedule it; returns the job rows."""
+        import AllInOne
+
+        if self.draining:
+            raise RuntimeError("Daemon is draining")
+        if account not in self.pools:
+            raise ValueError(f"Unknown account {account!r}")
+        platforms = list(platforms or AllInOne.PLATFORM_UPLOADERS)
+        unknown = [platform for platform in platforms if platform not in AllInOne.PLATFORM_UPLOADERS]
+        if unknown:
+            raise ValueError(f"Unknown platform(s): {', '.join(unknown)}")
+        for path in (video_path, metadata_path):
+            if not os.path.isfile(path):
+                raise ValueError(f"No such file: {path}")
+        load_metadata(metadata_path)  # Reject unreadable metadata now rather than at upload time
+        self.queue.enqueue(video_path, metadata_path, platforms, account, priority)
+        jobs = [job for job in self.queue.find(video_path, account) if job["platform"] in platforms]
+        for job in jobs:
+            if job["state"] == PENDING:
+                self._schedule(job)
+        return jobs
+
+    def _schedule(self, job, delay=0):
+        """Hand a pending queue row to the scheduler, after delay seconds if given."""
+        if self.draining:
+            return
+        if delay:
+            timer = threading.Timer(delay, self._reschedule, (job["id"],))
+            timer.daemon = True
+            with self._lock:
+                self._timers[job["id"]] = timer
+            timer.start()
+            return
+        if job["account"] not in self.pools:
+            logger.warning(f"Job {job['id']} is for account {job['account']!r}, which this daemon does not serve")
+            return
+        with self._lock:
+            if self.draining or job["id"] in self._scheduled:
+                return
+            self._scheduled.add(job["id"])
+        try:
+            metadata = load_metadata(job["metadata_path"])
+        except Exception as e:
+            self._settle(job["id"], job["platform"], {"ok": False, "rejected": True, "error": f"Bad metadata: {e}"})
+            return
+        try:
+            self.scheduler.submit(job["video_path"], job["platform"], metadata, job["account"], job["priority"],
+                                  job_id=job["id"])
+        except RuntimeError:
+            # Drain started meanwhile; the job stays pending for the next start
+            with self._lock:
+                self._scheduled.discard(job["id"])
+            return
+        self.events.emit("queued", job["id"], platform=job["platform"], account=job["account"])
+
+    def _reschedule(self, job_id):
+        with self._lock:
+            self._timers.pop(job_id, None)
+            if self.draining:
+                return
+        job = self.queue.get(job_id)
+        if job and job["state"] == PENDING:
+            self._schedule(job)
+
+    def _execute(self, scheduled, pool):
+        """Scheduler executor: run one upload and settle its queue row."""
+        job_id = scheduled.job_id
+        self.queue.start(job_id)
+        with self._lock:
+            self._running[job_id] = {"platform": scheduled.platform, "account": scheduled.account, "step": None}
+        self.events.emit("started", job_id, platform=scheduled.platform, account=scheduled.account)
+
+        def progress(platform, step, status):
+            with self._lock:
+                self._running[job_id]["step"] = step
+            self.events.emit("step", job_id, platform=platform, step=step, status=status)
+
+        try:
+            with step_listener(progress):
+                result = run_upload(scheduled, pool)
+        except Exception as e:
+            result = {"platform": scheduled.platform, "ok": False, "result": None, "error": str(e)}
+        self._settle(job_id, scheduled.platform, result)
+        return result
+
+    def _settle(self, job_id, platform, result):
+        from failures import PERMANENT
+
+        with self._lock:
+            self._running.pop(job_id, None)
+            self._scheduled.discard(job_id)
+        if result["ok"]:
+            url = result["result"] if isinstance(result["result"], str) else None
+            self.queue.complete(job_id, url)
+            self.events.emit("done", job_id, platform=platform, url=url, skipped=result.get("skipped", False))
+            return
+        if result.get("blocked"):
+            self.queue.defer(job_id, result["error"])
+            self.events.emit("deferred", job_id, platform=platform, error=result["error"], retry_in=DEFER_DELAY)
+            self._schedule(self.queue.get(job_id), DEFER_DELAY)
+            return
+        permanent = result.get("rejected", False) or result.get("failure") == PERMANENT
+        self.queue.fail(job_id, result.get("error") or "upload failed", permanent)
+        job = self.queue.get(job_id)
+        if job["state"] == PENDING:
+            self.events.emit("retrying", job_id, platform=platform, error=job["last_error"], retry_in=RETRY_DELAY,
+                             failure=result.get("failure"))
+            self._schedule(job, RETRY_DELAY)
+        else:
+            self.events.emit("failed", job_id, platform=platform, error=job["last_error"], failure=result.get("failure"))
+
+    def status(self):
+        from failures import breakers
+
+        with self._lock:
+            running = {str(job_id): dict(state) for job_id, state in self._running.items()}
+            waiting = len(self._scheduled) - len(running)
+            delayed = len(self._timers)
+        return {"started": self.started, "draining": self.draining, "accounts": sorted(self.pools),
+                "jobs": self.queue.counts(), "running": running, "waiting": waiting, "delayed": delayed,
+                "breakers": breakers.states(), "last_event": self.events.last}
+
+    def drain(self):
+        """Stop taking jobs, wait for running uploads and release the browsers; queued jobs stay pending."""
+        with self._lock:
+            if self.draining:
+                return
+            self.draining = True
+            timers, self._timers = list(self._timers.values()), {}
+        logger.info("Draining: waiting for running uploads to finish")
+        self.events.emit("draining")
+        for timer in timers:
+            timer.cancel()
+        self.scheduler.shutdown(cancel_pending=True)
+        for pool in self.pools.values():
+            pool.close()
+        self.events.emit("drained", jobs=self.queue.counts())
+        self.events.close()
+        self.queue.close()
+        logger.info("Drained; queued jobs will resume on the next start")
+        self.drained.set()
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """JSON API of an UploadDaemon.
+
+    POST /jobs     {"video_path", "metadata_path", "platforms"?, "account"?, "priority"?}
+    GET  /jobs     ?state=; GET /jobs/<id>
+    GET  /status
+    GET  /events   ?since=<seq>&job=<id>&follow=0; newline-delimited JSON, streamed until the daemon drains
+    POST /drain
+    """
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    @property
+    def upload_daemon(self):
+        return self.server.upload_daemon
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path == "/status":
+            return self._reply(200, self.upload_daemon.status())
+        if url.path == "/jobs":
+            return self._reply(200, self.upload_daemon.queue.jobs(query.get("state")))
+        if url.path.startswith("/jobs/"):
+            job = self.upload_daemon.queue.get(url.path[len("/jobs/"):]) if url.path[len("/jobs/"):].isdigit() else None
+            return self._reply(200, job) if job else self._reply(404, {"error": "no such job"})
+        if url.path == "/events":
+            return self._stream(int(query.get("since", 0)), query.get("job"), query.get("follow", "1") != "0")
+        self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path == "/drain":
+            threading.Thread(target=self.upload_daemon.drain, name="drain", daemon=True).start()
+            return self._reply(202, {"draining": True})
+        if self.path != "/jobs":
+            return self._reply(404, {"error": "not found"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            jobs = self.upload_daemon.submit(request["video_path"], request["metadata_path"], request.get("platforms"),
+                                      request.get("account", DEFAULT_ACCOUNT),
+                                      int(request.get("priority", DEFAULT_PRIORITY)))
+        except RuntimeError as e:
+            return self._reply(503, {"error": str(e)})
+        except (KeyError, TypeError, ValueError) as e:
+            return self._reply(400, {"error": f"Bad job: {e}"})
+        self._reply(202, {"jobs": jobs})
+
+    def _stream(self, since, job_id, follow):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        events = self.upload_daemon.events
+        try:
+            while True:
+                batch = events.since(since, STREAM_HEARTBEAT if follow else None)
+                for event in batch:
+                    since = event["seq"]
+                    if job_id is None or str(event["job"]) == job_id:
+                        self.wfile.write(json.dumps(event, default=str).encode() + b"\n")
+                if not batch and follow:
+                    self.wfile.write(b"\n")
+                self.wfile.flush()
+                if not follow or (events.closed and not events.since(since)):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+class DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, daemon, address=(DEFAULT_HOST, DEFAULT_PORT)):
+        super().__init__(address, DaemonHandler)
+        self.upload_daemon = daemon
+
+def serve(daemon, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run the daemon's API until it has drained, e.g. after SIGTERM or POST /drain."""
+    server = DaemonServer(daemon, (host, port))
+    daemon.start()
+    threading.Thread(target=server.serve_forever, name="daemon-api", daemon=True).start()
+    logger.info(f"Upload daemon listening on http://{host}:{server.server_address[1]}")
+
+    def on_signal(signum, frame):
+        logger.info(f"Received signal {signum}, draining")
+        threading.Thread(target=daemon.drain, name="drain", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    # Waiting in short slices keeps the main thread responsive to signals
+    while not daemon.drained.wait(1):
+        pass
+    server.shutdown()
+    server.server_close()
+
+def _call(url, method="GET", payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise SystemExit(f"{e.code}: {json.load(e).get('error')}")
+
+def watch(base_url, job_ids=None, since=0):
+    """Print a daemon's events as they happen; returns once the given jobs have all settled."""
+    pending = set(job_ids or ())
+    with urllib.request.urlopen(f"{base_url}/events?since={since}") as response:
+        for line in response:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if job_ids and event["job"] not in job_ids:
+                continue
+            logger.info(" ".join(f"{key}={value}" for key, value in event.items() if key not in ("seq", "time")))
+            if event["event"] in ("done", "failed"):
+                pending.discard(event["job"])
+                if job_ids and not pending:
+                    return
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident upload daemon with a localhost job API")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("serve", help="Start the daemon")
+    run.add_argument("--db", default=DB_PATH, help="Path of the SQLite queue database")
+    run.add_argument("--accounts", nargs="+", help="account=profile_path pairs (default: the worker profile)")
+    run.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="warm browsers per account")
+
+    submit = commands.add_parser("submit", help="Queue a video on a running daemon")
+    submit.add_argument("video_path")
+    submit.add_argument("metadata_path")
+    submit.add_argument("--platforms", nargs="+")
+    submit.add_argument("--account", default=DEFAULT_ACCOUNT)
+    submit.add_argument("--priority", type=int, default=DEFAULT_PRIORITY)
+    submit.add_argument("--watch", action="store_true", help="stream the jobs' progress until they settle")
+
+    commands.add_parser("status", help="Show the daemon's state")
+    commands.add_parser("watch", help="Stream every job event")
+    commands.add_parser("drain", help="Finish running uploads and stop the daemon")
+
+    args = parser.parse_args()
+    base_url = f"http://{args.host}:{args.port}"
+    if args.command == "serve":
+        accounts = None
+        if args.accounts:
+            accounts = dict(pair.partition("=")[::2] for pair in args.accounts)
+        serve(UploadDaemon(accounts, args.db, args.workers), args.host, args.port)
+    elif args.command == "submit":
+        since = _call(f"{base_url}/status")["last_event"]
+        reply = _call(f"{base_url}/jobs", "POST", {
+            "video_path": os.path.abspath(args.video_path), "metadata_path": os.path.abspath(args.metadata_path),
+            "platforms": args.platforms, "account": args.account, "priority": args.priority,
+        })
+        for job in reply["jobs"]:
+            logger.info(f"  #{job['id']} {job['platform']:<10} {job['state']}")
+        pending = {job["id"] for job in reply["jobs"] if job["state"] == PENDING}
+        if args.watch and pending:
+            watch(base_url, pending, since)
+    elif args.command == "status":
+        print(json.dumps(_call(f"{base_url}/status"), indent=1))
+    elif args.command == "watch":
+        watch(base_url)
+    elif args.command == "drain":
+        _call(f"{base_url}/drain", "POST", {})
+        logger.info("Daemon is draining")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
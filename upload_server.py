@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import json
+import logging
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Constants
+DEFAULT_PORT = 8765
+CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+)")
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class UploadSession:
+    """Server-side state of one resumable upload."""
+
+    def __init__(self, total, metadata):
+        self.id = uuid.uuid4().hex
+        self.total = total
+        self.metadata = metadata
+        self.received = 0
+        self.sha256 = hashlib.sha256()
+        self.lock = threading.Lock()
+
+    def result(self, base_url):
+        return {
+            "upload_id": self.id,
+            "size": self.total,
+            "sha256": self.sha256.hexdigest(),
+            "metadata": self.metadata,
+            "form_url": f"{base_url}/form/{self.id}",
+        }
+
+class UploadHandler(BaseHTTPRequestHandler):
+    """Stand-in for a platform's resumable-upload endpoint (see http_upload.ResumableUploader)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _reply(self, status, body=b"", headers=None, content_type="application/json"):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        if self.path != "/upload/init":
+            return self._reply(404)
+        body = self._read_body()
+        try:
+            total = int(self.headers["X-Upload-Content-Length"])
+        except (TypeError, ValueError):
+            return self._reply(400, b'{"error": "missing X-Upload-Content-Length"}')
+        session = UploadSession(total, json.loads(body or b"{}"))
+        self.server.sessions[session.id] = session
+        self.server.requests.append(("init", session.id))
+        self._reply(200, b"{}", {"Location": f"/upload/session/{session.id}"})
+
+    def do_PUT(self):
+        match = re.fullmatch(r"/upload/session/(\w+)", self.path)
+        session = self.server.sessions.get(match.group(1)) if match else None
+        if not session:
+            return self._reply(404)
+        content_range = CONTENT_RANGE.fullmatch(self.headers.get("Content-Range", ""))
+        if not content_range:
+            return self._reply(400, b'{"error": "bad Content-Range"}')
+        body = self._read_body()
+        with session.lock:
+            if content_range.group(1) is not None:
+                start, end = int(content_range.group(1)), int(content_range.group(2))
+                self.server.requests.append(("chunk", start, end))
+                if self.server.should_fail():
+                    # Simulate a dropped connection mid-transfer: the chunk is lost
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                if start == session.received and end - start + 1 == len(body):
+                    session.sha256.update(body)
+                    session.received = end + 1
+            else:
+                self.server.requests.append(("query",))
+            if session.received >= session.total:
+                return self._reply(201, json.dumps(session.result(self.base_url)).encode())
+            headers = {"Range": f"bytes=0-{session.received - 1}"} if session.received else {}
+            self._reply(308, b"", headers)
+
+    def do_GET(self):
+        match = re.fullmatch(r"/form/(\w+)", self.path)
+        session = self.server.sessions.get(match.group(1)) if match else None
+        if not session:
+            return self._reply(404)
+        page = (
+            "<!DOCTYPE html><html><body>"
+            f"<p>Upload {session.id} received ({session.received} bytes)</p>"
+            "<div role='textbox' contenteditable='true'></div>"
+            "</body></html>"
+        )
+        self._reply(200, page.encode(), content_type="text/html; charset=utf-8")
+
+class UploadServer(ThreadingHTTPServer):
+    """Local resumable-upload server with failure injection for testing the HTTP engine.
+
+    fail_every=N drops the connection on every Nth chunk request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", DEFAULT_PORT), fail_every=0):
+        super().__init__(address, UploadHandler)
+        self.sessions = {}
+        self.requests = []
+        self.fail_every = fail_every
+        self._chunks = 0
+        self._lock = threading.Lock()
+
+    def should_fail(self):
+        with self._lock:
+            self._chunks += 1
+            return bool(self.fail_every) and self._chunks % self.fail_every == 0
+
+    @property
+    def init_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/upload/init"
+
+    def start_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in resumable-upload server")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fail-every", type=int, default=0, help="Drop every Nth chunk request")
+    args = parser.parse_args()
+
+    server = UploadServer(("127.0.0.1", args.port), fail_every=args.fail_every)
+    logger.info(f"Resumable upload server listening on {server.init_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()